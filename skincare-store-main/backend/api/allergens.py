@@ -0,0 +1,213 @@
+"""
+Allergen matching against product ingredients.
+
+An allergy matches an ingredient when, after lowercasing and stripping, either
+string contains the other (the rule used by the allergy-check endpoints). That
+rule only depends on the distinct ingredient strings in the catalog, so
+api.ingredient_index keeps a vocabulary of them and one bitmask per product.
+
+A user's allergy list is compiled once into an AllergenMatcher (an Aho-Corasick
+automaton over the allergies plus the set of their substrings), which resolves
+it against the vocabulary into a mask of the same width. Filtering a candidate
+set is then a single vectorized AND over the candidates' rows, with no queries.
+
+Alternatives for a flagged product come from a memoized inverted index
+(category, allergies) -> safe product ids, so the allergy endpoints do not scan
+the category.
+
+The index is built from one `values_list` query and rebuilt lazily after any
+product write (see api.signals), using the same version-key pattern as the
+popularity snapshot. This module itself does not import numpy, so views and
+signal handlers can use it without loading the numeric stack at boot.
+"""
+
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+
+from . import caching
+from .models import Product
+
+
+VERSION_KEY = 'ingredient_index_version'
+MAX_CACHED_MATCHERS = 256
+
+_local = None
+_lock = threading.Lock()
+
+
+def normalize(value):
+    """Normalize an ingredient or allergy the way the allergy checks compare them."""
+    return str(value).lower().strip()
+
+
+def normalize_allergies(allergies):
+    """Distinct, non-empty normalized allergies (order preserved)."""
+    return tuple(dict.fromkeys(a for a in (normalize(x) for x in allergies or []) if a))
+
+
+def matches(allergy, ingredient):
+    """Reference rule for one pair; AllergenMatcher applies it to a whole allergy list."""
+    return allergy in ingredient or ingredient in allergy
+
+
+class AhoCorasick:
+    """Multi-pattern substring automaton: one pass over the text finds every pattern."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                state = nxt
+            self._out[state].add(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def contains_any(self, text):
+        """True if any pattern occurs in `text` (single left-to-right pass)."""
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._out[state]:
+                return True
+        return False
+
+
+class AllergenMatcher:
+    """
+    Compiled form of one allergy list.
+
+    `matches(token)` is True when an allergy occurs inside the ingredient token
+    (automaton scan of the token) or the token occurs inside an allergy (lookup in
+    the precomputed substrings of the allergies, which are short).
+    """
+
+    def __init__(self, allergies):
+        self.allergies = normalize_allergies(allergies)
+        self._automaton = AhoCorasick(self.allergies)
+        self._inside = {
+            allergy[start:end]
+            for allergy in self.allergies
+            for start in range(len(allergy))
+            for end in range(start + 1, len(allergy) + 1)
+        }
+
+    def __bool__(self):
+        return bool(self.allergies)
+
+    def matches(self, token):
+        return token in self._inside or self._automaton.contains_any(token)
+
+    def found(self, tokens):
+        """The tokens (in order) that match an allergy."""
+        return [token for token in tokens if self.matches(token)]
+
+
+@lru_cache(maxsize=MAX_CACHED_MATCHERS)
+def _compiled(key):
+    return AllergenMatcher(key)
+
+
+def get_matcher(allergies):
+    """Return the (cached) compiled matcher for an allergy list."""
+    return _compiled(normalize_allergies(allergies))
+
+
+def tokenize(ingredients):
+    """Distinct, non-empty normalized ingredient tokens (order preserved)."""
+    return tuple(dict.fromkeys(t for t in (normalize(i) for i in ingredients or []) if t))
+
+
+def get_index():
+    """Return the current ingredient index, rebuilding it after product writes."""
+    global _local
+    version = caching.versions.get(VERSION_KEY)
+    local = _local
+    if local is not None and version is not None and local.version == version:
+        return local
+
+    with _lock:
+        if version is None:
+            version = time.time_ns()
+            caching.versions.set(VERSION_KEY, version, None)
+        if _local is None or _local.version != version:
+            from .ingredient_index import IngredientIndex
+
+            rows = Product.objects.order_by('id').values_list('id', 'category', 'ingredients')
+            _local = IngredientIndex(rows.iterator(chunk_size=2000), version=version)
+        return _local
+
+
+def invalidate():
+    """Mark the index stale; every process rebuilds it on next use."""
+    caching.versions.delete(VERSION_KEY)
+
+
+def find_allergens(product, allergies, index=None):
+    """Normalized ingredients of `product` that match the allergy list (in ingredient order)."""
+    matcher = get_matcher(allergies)
+    if not matcher:
+        return []
+    tokens = (index or get_index()).tokens_for(product.id)
+    if tokens is None:
+        tokens = tokenize(product.ingredients)
+    return matcher.found(tokens)
+
+
+def annotate(products, allergies):
+    """
+    Add `allergens_found` to serialized products (dicts from Product.to_dict()) in place.
+
+    All products are resolved against the ingredient index in one pass; products
+    newer than the index fall back to their own ingredient list. Returns `products`.
+    """
+    matcher = get_matcher(allergies)
+    if not matcher:
+        for product in products:
+            product['allergens_found'] = []
+        return products
+
+    found = get_index().allergens_found([product['id'] for product in products], allergies)
+    for product, tokens in zip(products, found):
+        product['allergens_found'] = tokens if tokens is not None else matcher.found(tokenize(product.get('ingredients')))
+    return products
+
+
+def contains_allergen(ingredients, allergies):
+    """Direct check for a single product (used for products newer than the index)."""
+    matcher = get_matcher(allergies)
+    return bool(matcher) and any(matcher.matches(token) for token in tokenize(ingredients))
+
+
+def filter_product_ids(product_ids, allergies):
+    """Return the ids (in order) that contain none of the allergens."""
+    product_ids = list(product_ids)
+    if not product_ids or not normalize_allergies(allergies):
+        return product_ids
+    flagged = get_index().flag(product_ids, allergies)
+    return [pid for pid, bad in zip(product_ids, flagged.tolist()) if not bad]
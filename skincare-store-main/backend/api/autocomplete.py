@@ -0,0 +1,184 @@
+"""
+Type-ahead suggestions for product titles, categories and ingredient names.
+
+The catalog is reduced to a compact snapshot of (text, type, product_id, weight)
+tuples, stored in the cache so every worker can build its index without touching
+the database. Weights are popularity: likes + 3 x completed order lines + 2 x
+reviews (+1 so new products still appear); a category or ingredient weighs the
+sum of its products.
+
+Each worker turns the snapshot into a sorted array of keys, one per word start
+of each suggestion ("vitamin c serum", "c serum", "serum"), so a prefix is a
+contiguous range found by binary search. The best suggestions for every prefix
+spanning more than WIDE_RANGE keys are precomputed at build time; any other
+prefix ranks a small range per request. A lookup is a dict hit, or a couple of
+bisects plus a top-k over at most WIDE_RANGE keys.
+
+Product writes invalidate the snapshot (api.signals). Rebuilds are throttled to
+one per REBUILD_INTERVAL seconds, so a burst of stock updates does not rebuild
+the index on every request.
+"""
+
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from . import caching
+from .models import OrderItem, Product, Review, UserLikedProduct
+
+
+SNAPSHOT_KEY = 'autocomplete_snapshot'
+VERSION_KEY = 'autocomplete_snapshot_version'
+SNAPSHOT_TTL = 3600  # also bounds how stale the popularity weights get
+REBUILD_INTERVAL = 5  # seconds a stale index may keep serving after a product write
+WIDE_RANGE = 64  # keys a prefix may span before its ranking is precomputed
+MAX_SUGGESTIONS = 20
+
+COMPLETED_ORDER_STATUSES = ['confirmed', 'processing', 'shipped', 'delivered']
+
+WORD_START_RE = re.compile(r'(?<![0-9a-z])[0-9a-z]')
+SPACE_RE = re.compile(r'\s+')
+
+_local = None
+_lock = threading.Lock()
+
+
+def normalize(text):
+    return SPACE_RE.sub(' ', str(text).lower()).strip()
+
+
+def build_snapshot():
+    """Read the catalog and popularity counts (four queries) into a compact suggestion list."""
+    weights = defaultdict(int)
+    for model, factor, filters in [
+        (UserLikedProduct, 1, {}),
+        (OrderItem, 3, {'order__status__in': COMPLETED_ORDER_STATUSES}),
+        (Review, 2, {}),
+    ]:
+        counts = model.objects.filter(**filters).values('product_id').annotate(count=Count('id'))
+        for row in counts.values_list('product_id', 'count'):
+            weights[row[0]] += row[1] * factor
+
+    entries = []
+    categories = defaultdict(int)
+    ingredients = {}
+    for product_id, title, category, product_ingredients in Product.objects.values_list(
+        'id', 'title', 'category', 'ingredients'
+    ).iterator(chunk_size=2000):
+        weight = weights.get(product_id, 0) + 1
+        if title:
+            entries.append((title, 'product', product_id, weight))
+        if category:
+            categories[category] += weight
+        for ingredient in product_ingredients or []:
+            name = normalize(ingredient)
+            if name:
+                display, total = ingredients.get(name, (str(ingredient).strip(), 0))
+                ingredients[name] = (display, total + weight)
+
+    entries.extend((category, 'category', None, weight) for category, weight in categories.items())
+    entries.extend((display, 'ingredient', None, weight) for display, weight in ingredients.values())
+    return entries
+
+
+class AutocompleteIndex:
+    """Sorted word-start keys over a suggestion snapshot."""
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.entries = entries
+        self.weights = [entry[3] for entry in entries]
+
+        keyed = []
+        for idx, (text, _, _, _) in enumerate(entries):
+            normalized = normalize(text)
+            for match in WORD_START_RE.finditer(normalized):
+                keyed.append((normalized[match.start():], idx))
+        keyed.sort()
+        self.keys = [key for key, _ in keyed]
+        self.refs = [idx for _, idx in keyed]
+
+        # Precompute every prefix whose range is too wide to rank per request; any
+        # other prefix sits under a narrow parent, so its own range is narrow too.
+        self._top = {}
+        self._precompute(0, len(self.keys), 0)
+
+    def _precompute(self, lo, hi, depth):
+        i = lo
+        while i < hi:
+            if len(self.keys[i]) <= depth:
+                i += 1
+                continue
+            prefix = self.keys[i][:depth + 1]
+            j = bisect_left(self.keys, prefix + '\uffff', i, hi)
+            if j - i > WIDE_RANGE:
+                self._top[prefix] = self._rank(i, j, MAX_SUGGESTIONS)
+                self._precompute(i, j, depth + 1)
+            i = j
+
+    def _range(self, prefix):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\uffff', lo)
+        return lo, hi
+
+    def _rank(self, lo, hi, limit):
+        candidates = set(self.refs[lo:hi])
+        return heapq.nlargest(limit, candidates, key=lambda idx: (self.weights[idx], -idx))
+
+    def suggest(self, query, limit=8):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        if prefix in self._top:
+            ranked = self._top[prefix][:limit]
+        else:
+            ranked = self._rank(*self._range(prefix), limit)
+        return [self._as_dict(idx) for idx in ranked]
+
+    def _as_dict(self, idx):
+        text, kind, product_id, weight = self.entries[idx]
+        suggestion = {'type': kind, 'text': text, 'weight': weight}
+        if product_id is not None:
+            suggestion['product_id'] = product_id
+        return suggestion
+
+
+def get_index():
+    """Return this worker's index, rebuilding from the cached snapshot (or the database)."""
+    global _local
+    version = caching.versions.get(VERSION_KEY)
+    local = _local
+    if local is not None and (
+        local.version == version
+        or (version is None and time.monotonic() - local.built_at < REBUILD_INTERVAL)
+    ):
+        return local
+
+    with _lock:
+        if _local is not None and _local.version == version and version is not None:
+            return _local
+        snapshot = cache.get(SNAPSHOT_KEY) if version is not None else None
+        if snapshot is None or snapshot[0] != version:
+            version = time.time_ns()
+            snapshot = (version, build_snapshot())
+            cache.set(SNAPSHOT_KEY, snapshot, SNAPSHOT_TTL)
+            caching.versions.set(VERSION_KEY, version, SNAPSHOT_TTL)
+        _local = AutocompleteIndex(snapshot[1], version=version)
+        return _local
+
+
+def suggest(query, limit=8):
+    return get_index().suggest(query, limit)
+
+
+def invalidate():
+    """Drop the snapshot after a product write; workers rebuild within REBUILD_INTERVAL."""
+    caching.versions.delete(VERSION_KEY)
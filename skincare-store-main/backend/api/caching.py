@@ -0,0 +1,137 @@
+"""
+Namespaced access to the shared cache tier.
+
+The default cache (settings.CACHES) is shared by every worker: Redis when
+REDIS_URL is set, otherwise a file-based cache. So one worker's writes and
+invalidations are seen by all of them, and nothing here may call cache.clear().
+
+A Namespace prefixes its keys with a generation number that lives in the cache
+itself. `clear()` bumps that generation, which drops the whole namespace for
+every worker without touching other domains. `clear(scope=...)` does the same
+for one scope inside it (one user's recommendations, one product's similar
+items). Orphaned entries expire through their timeouts.
+
+Every get()/get_many() counts hits and misses for its namespace. `stats()`
+reports the counters of the current process; the current request's totals
+also go to api.metrics.
+
+Version and generation keys (these generations, api.query_cache's table
+generations, the version counters of process-local snapshots and indexes)
+live in `versions`, the separate `versions` cache of settings.CACHES. Losing
+one makes every worker rebuild, so they must not sit in a store that culls or
+evicts them along with ordinary entries.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache, caches
+from django.utils.connection import ConnectionProxy
+
+from . import metrics
+
+
+versions = ConnectionProxy(caches, 'versions')
+
+_counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_counters_lock = threading.Lock()
+
+
+class Namespace:
+
+    def __init__(self, name, timeout=3600):
+        self.name = name
+        self.timeout = timeout
+
+    def _generation_key(self, scope=None):
+        return f'ns:{self.name}' if scope is None else f'ns:{self.name}:{scope}'
+
+    def _prefix(self, scope):
+        keys = [self._generation_key()]
+        if scope is not None:
+            keys.append(self._generation_key(scope))
+        generations = versions.get_many(keys)
+        missing = [key for key in keys if key not in generations]
+        if missing:
+            for key in missing:
+                versions.add(key, time.time_ns(), None)
+            # Another worker may have won the add
+            generations.update(versions.get_many(missing))
+        return ':'.join([self.name] + [str(generations[key]) for key in keys])
+
+    def key(self, key, scope=None):
+        return _join(self._prefix(scope), key, scope)
+
+    def get(self, key, default=None, scope=None):
+        value = cache.get(self.key(key, scope), _MISSING)
+        _record(self.name, int(value is not _MISSING), int(value is _MISSING))
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, scope=None):
+        """{key: value} for the keys that are cached, in one round trip."""
+        prefix = self._prefix(scope)
+        full = {_join(prefix, key, scope): key for key in keys}
+        found = cache.get_many(list(full))
+        _record(self.name, len(found), len(full) - len(found))
+        return {full[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=None, scope=None):
+        cache.set(self.key(key, scope), value, self.timeout if timeout is None else timeout)
+
+    def set_many(self, values, timeout=None, scope=None):
+        prefix = self._prefix(scope)
+        cache.set_many(
+            {_join(prefix, key, scope): value for key, value in values.items()},
+            self.timeout if timeout is None else timeout,
+        )
+
+    def delete(self, key, scope=None):
+        cache.delete(self.key(key, scope))
+
+    def delete_many(self, keys, scope=None):
+        prefix = self._prefix(scope)
+        cache.delete_many([_join(prefix, key, scope) for key in keys])
+
+    def clear(self, scope=None):
+        """Invalidate the namespace (or one scope of it) for every worker."""
+        versions.delete(self._generation_key(scope))
+
+
+_MISSING = object()
+
+
+def _join(prefix, key, scope):
+    return f'{prefix}:{key}' if scope is None else f'{prefix}:{scope}:{key}'
+
+
+def _record(name, hits, misses=0):
+    with _counters_lock:
+        _counters[name]['hits'] += hits
+        _counters[name]['misses'] += misses
+    metrics.record_cache(hits, misses)
+
+
+def stats():
+    """Hit/miss counters of this process per namespace."""
+    with _counters_lock:
+        return {
+            name: {
+                **counts,
+                'hit_rate': round(counts['hits'] / max(counts['hits'] + counts['misses'], 1), 4),
+            }
+            for name, counts in sorted(_counters.items())
+        }
+
+
+def reset_stats():
+    with _counters_lock:
+        _counters.clear()
+
+
+# Recommendation domains
+recommendations = Namespace('recommendations', timeout=3600)  # scoped by user
+friends_trending = Namespace('friends_trending', timeout=1800)  # scoped by user
+similar_products = Namespace('similar_products', timeout=86400)  # scoped by product
+
+RECOMMENDATION_NAMESPACES = (recommendations, friends_trending, similar_products)
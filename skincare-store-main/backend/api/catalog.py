@@ -0,0 +1,120 @@
+"""
+Process-local catalog snapshot for read-heavy endpoints.
+
+Listing, filtering, search/recommendation hydration, similar products and
+allergy alternatives read product cards and columns from an immutable
+CatalogSnapshot (api.catalog_snapshot) instead of re-querying and re-serializing
+the same Product rows. A snapshot is built in three queries (products, reviews,
+reviewers) and never modified afterwards.
+
+Product and Review writes append the product id to a shared change log
+(api.signals). The next read in each process re-reads only the products logged
+since its snapshot was built, reuses every other row, and swaps the patched
+snapshot in with a single assignment, so requests already holding the old
+snapshot finish against a consistent view. The snapshot is rebuilt whole on the
+first read, when more than MAX_PATCH changes are pending, or when a log entry
+is missing (evicted, or lost to a racing non-atomic incr). Reviewer renames
+show up with the next full rebuild.
+
+The catalog version is "<epoch>.<sequence>": the epoch names the last full
+rebuild and the sequence counts logged changes. version() reads it without
+building anything, for ETags.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+
+from . import caching
+from .models import Product
+
+
+VERSION_KEY = 'catalog_snapshot_version'  # epoch; deleting it forces a full rebuild everywhere
+SEQUENCE_KEY = 'catalog_change_sequence'
+CHANGE_KEY = 'catalog_change:{}'
+# Log entries live in the default (culled) cache: a missing one only costs a full rebuild
+CHANGE_TTL = 24 * 3600
+MAX_PATCH = 500
+
+_local = None  # ((epoch, sequence), CatalogSnapshot), swapped as one value
+_lock = threading.Lock()
+
+
+def _position():
+    found = caching.versions.get_many([VERSION_KEY, SEQUENCE_KEY])
+    return found.get(VERSION_KEY), found.get(SEQUENCE_KEY, 0)
+
+
+def _epoch():
+    epoch = time.time_ns()
+    if not caching.versions.add(VERSION_KEY, epoch, None):
+        epoch = caching.versions.get(VERSION_KEY, epoch)
+    return epoch
+
+
+def version():
+    """The version get_snapshot() would return, without building the snapshot."""
+    epoch, sequence = _position()
+    if epoch is None:
+        epoch = _epoch()
+    return f'{epoch}.{sequence}'
+
+
+def _changed_since(local, epoch, sequence):
+    """Ids of the products changed since `local` was built, or None when it must be rebuilt whole."""
+    if local is None:
+        return None
+    (local_epoch, local_sequence), _ = local
+    if local_epoch != epoch or not 0 < sequence - local_sequence <= MAX_PATCH:
+        return None
+    keys = [CHANGE_KEY.format(number) for number in range(local_sequence + 1, sequence + 1)]
+    found = cache.get_many(keys)
+    if len(found) != len(keys):
+        return None
+    return set(found.values())
+
+
+def get_snapshot():
+    """Return the current catalog snapshot, patching in products changed since the last read."""
+    global _local
+    epoch, sequence = _position()
+    local = _local
+    if local is not None and local[0] == (epoch, sequence):
+        return local[1]
+
+    with _lock:
+        if epoch is None:
+            epoch = _epoch()
+        local = _local
+        if local is not None and local[0] == (epoch, sequence):
+            return local[1]
+        # NumPy is loaded on first use, not at startup (see api.recommender_facade)
+        from .catalog_snapshot import CatalogSnapshot
+
+        products = Product.objects.order_by('id').prefetch_related('reviews__user')
+        changed = _changed_since(local, epoch, sequence)
+        if changed is None:
+            snapshot = CatalogSnapshot(products, version=f'{epoch}.{sequence}')
+        else:
+            snapshot = CatalogSnapshot(
+                products.filter(id__in=changed), version=f'{epoch}.{sequence}', base=local[1], removed=changed,
+            )
+        _local = ((epoch, sequence), snapshot)
+        return snapshot
+
+
+def invalidate(product_id=None):
+    """
+    Log a change to `product_id`; every process patches that product into its
+    snapshot on next read. Without an id every process rebuilds its snapshot.
+    """
+    if product_id is not None:
+        try:
+            sequence = caching.versions.incr(SEQUENCE_KEY)
+        except ValueError:
+            caching.versions.add(SEQUENCE_KEY, 0, None)
+            sequence = caching.versions.incr(SEQUENCE_KEY)
+        if cache.add(CHANGE_KEY.format(sequence), product_id, CHANGE_TTL):
+            return
+    caching.versions.delete(VERSION_KEY)
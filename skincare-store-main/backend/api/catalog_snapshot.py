@@ -0,0 +1,154 @@
+"""
+Immutable, process-local columnar snapshot of the catalog (see api.catalog).
+
+    product_ids     sorted product ids; `row_of` maps id -> row
+    price, stock    float64 / int64 columns
+    rating          float64 mean review rating, NaN when unreviewed
+    trending        bool column
+    category_codes  int32 code of each row's lowercased category; `category_keys`
+                    holds the lowercased names, `category_labels` a display spelling
+    title_rank      int32 position of each row in title order
+    products        Product.to_dict() per row (shared, so callers must copy before mutating)
+    cards           the same dicts pre-serialized to JSON
+    updated_at      Product.updated_at per row
+    listing()       the whole catalog as one JSON body, compressed per encoding on demand
+"""
+
+import json
+
+import numpy as np
+
+from . import compression
+from .allergens import tokenize
+
+
+def _entry(product):
+    """Everything a snapshot keeps about one product, computed once and reused by later patches."""
+    data = product.to_dict()
+    reviews = product.reviews.all()
+    return (
+        product.id,
+        data,
+        json.dumps(data, separators=(',', ':')),
+        float(product.price),
+        product.stock,
+        sum(r.rating for r in reviews) / len(reviews) if reviews else np.nan,
+        product.is_trending,
+        product.category,
+        tokenize(product.ingredients),
+        product.updated_at,
+    )
+
+
+class CatalogSnapshot:
+    """Immutable catalog columns plus serialized product cards."""
+
+    def __init__(self, products, version=None, base=None, removed=()):
+        """
+        `products` are Product instances ordered by id, with reviews__user prefetched.
+        With a `base` snapshot they are only the products that changed since it was
+        built: every other row is reused as is, and ids in `removed` that are not in
+        `products` (deleted products) are dropped.
+        """
+        self.version = version
+        entries = {entry[0]: entry for entry in base._entries} if base is not None else {}
+        for product_id in removed:
+            entries.pop(product_id, None)
+        for product in products:
+            entries[product.id] = _entry(product)
+        self._entries = [entries[product_id] for product_id in sorted(entries)]
+
+        ids, prices, stocks, ratings, trending, codes = [], [], [], [], [], []
+        category_codes, labels = {}, []
+        token_rows = {}
+        self.products = []
+        self.cards = []
+        self.updated_at = []
+        self._listing = None
+
+        for row, entry in enumerate(self._entries):
+            product_id, data, card, price, stock, rating, is_trending, category, tokens, updated_at = entry
+            ids.append(product_id)
+            prices.append(price)
+            stocks.append(stock)
+            ratings.append(rating)
+            trending.append(is_trending)
+            key = category.lower()
+            if key not in category_codes:
+                category_codes[key] = len(labels)
+                labels.append(category)
+            else:
+                labels[category_codes[key]] = min(labels[category_codes[key]], category)
+            codes.append(category_codes[key])
+            for token in tokens:
+                token_rows.setdefault(token, []).append(row)
+            self.products.append(data)
+            self.cards.append(card)
+            self.updated_at.append(updated_at)
+
+        self.product_ids = np.asarray(ids, dtype=np.int64)
+        self.row_of = {product_id: row for row, product_id in enumerate(ids)}
+        self.price = np.asarray(prices, dtype=np.float64)
+        self.stock = np.asarray(stocks, dtype=np.int64)
+        self.rating = np.asarray(ratings, dtype=np.float64)
+        self.trending = np.asarray(trending, dtype=bool)
+        self.category_codes = np.asarray(codes, dtype=np.int32)
+        self.category_keys = list(category_codes)
+        self.category_labels = labels
+        self.title_rank = np.empty(len(ids), dtype=np.int32)
+        self.title_rank[sorted(range(len(ids)), key=lambda row: (self.products[row]['title'], ids[row]))] = (
+            np.arange(len(ids), dtype=np.int32)
+        )
+        self.ingredient_rows = {token: np.asarray(rows, dtype=np.intp) for token, rows in token_rows.items()}
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def __contains__(self, product_id):
+        return product_id in self.row_of
+
+    def product(self, product_id):
+        """A copy of one product's dict, or None."""
+        row = self.row_of.get(product_id)
+        return dict(self.products[row]) if row is not None else None
+
+    def modified(self, product_id):
+        """When a product (or one of its reviews) last changed, or None."""
+        row = self.row_of.get(product_id)
+        return self.updated_at[row] if row is not None else None
+
+    def card(self, product_id):
+        """One product's pre-serialized JSON, or None."""
+        row = self.row_of.get(product_id)
+        return self.cards[row] if row is not None else None
+
+    def products_at(self, rows):
+        """Copies of the products' dicts at the given rows."""
+        return [dict(self.products[row]) for row in rows]
+
+    def products_for(self, product_ids, as_map=False):
+        """Copies of the products' dicts in the given order; unknown ids are skipped."""
+        found = [(pid, self.row_of[pid]) for pid in product_ids if pid in self.row_of]
+        if as_map:
+            return {pid: dict(self.products[row]) for pid, row in found}
+        return [dict(self.products[row]) for _, row in found]
+
+    def cards_json(self, rows=None):
+        """JSON array of the pre-serialized cards for `rows` (every product by default)."""
+        cards = self.cards if rows is None else (self.cards[row] for row in rows)
+        return '[' + ','.join(cards) + ']'
+
+    def listing(self):
+        """The full cards_json() body with its compressed copies (compression.Variants), built on first use."""
+        if self._listing is None:
+            self._listing = compression.Variants(self.cards_json().encode())
+        return self._listing
+
+    def rows_without_ingredients(self, terms):
+        """Boolean mask of rows with no ingredient containing any of `terms`."""
+        terms = [term for term in (str(t).lower().strip() for t in terms) if term]
+        keep = np.ones(len(self), dtype=bool)
+        for token, rows in self.ingredient_rows.items():
+            if any(term in token for term in terms):
+                keep[rows] = False
+        return keep
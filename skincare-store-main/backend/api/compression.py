@@ -0,0 +1,206 @@
+"""
+Content-negotiated compression for API responses.
+
+APICompressionMiddleware (api.middleware) compresses /api/ responses of at least
+MIN_SIZE bytes with the best encoding the client accepts: brotli when the
+optional `brotli` package is installed, otherwise gzip. Streamed responses are
+compressed chunk by chunk and flushed, so they keep streaming.
+
+Payloads that are served many times unchanged (the catalog listing, banners,
+about-us) keep their compressed copies next to their body (Variants), and
+`precompressed_response()` attaches them for the middleware. A copy is only
+made for an encoding some client asked for. The first such request gets an
+on-the-fly copy. A background thread then makes the highest-level copy, which
+is served from then on, so the slow levels never run on the request path.
+"""
+
+import gzip
+import threading
+import time
+import zlib
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import caching
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+MIN_SIZE = 1024  # Smaller bodies rarely shrink enough to be worth it
+GZIP_LEVEL = 6  # On-the-fly levels trade ratio for latency
+BROTLI_QUALITY = 5
+PRECOMPRESSED_GZIP_LEVEL = 9  # Precompressed variants are paid for once
+PRECOMPRESSED_BROTLI_QUALITY = 11
+PAYLOAD_TTL = 3600
+
+
+def supported_encodings():
+    """Encodings this process can produce, most preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encoding, available=None):
+    """Pick an encoding from an Accept-Encoding header, or None for identity."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    for encoding in available or supported_encodings():
+        if weights.get(encoding, weights.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding, precompressed=False):
+    if encoding == 'br':
+        return brotli.compress(body, quality=PRECOMPRESSED_BROTLI_QUALITY if precompressed else BROTLI_QUALITY)
+    # mtime=0 keeps the output byte-identical for identical bodies
+    return gzip.compress(body, compresslevel=PRECOMPRESSED_GZIP_LEVEL if precompressed else GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of byte chunks, flushing after each so data keeps flowing."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+_refining = {}  # (id of the variants, encoding) or cache key -> background thread
+_refining_lock = threading.Lock()
+
+
+class Variants:
+    """A body and its compressed copies, made per encoding as clients ask for them."""
+
+    def __init__(self, body):
+        self.body = body
+        self._encoded = {}
+
+    def get(self, encoding):
+        """The body in `encoding`, or None when it is too small to be worth compressing."""
+        if len(self.body) < MIN_SIZE:
+            return None
+        encoded = self._load(encoding)
+        if encoded is None:
+            encoded = compress(self.body, encoding)
+            self._save(encoding, encoded, final=False)
+            self._refine(encoding)
+        return encoded
+
+    def _token(self, encoding):
+        return (id(self), encoding)
+
+    def _load(self, encoding):
+        return self._encoded.get(encoding)
+
+    def _save(self, encoding, encoded, final):
+        if final:
+            self._encoded[encoding] = encoded
+        else:
+            self._encoded.setdefault(encoding, encoded)
+
+    def _refine(self, encoding):
+        """Replace the on-the-fly copy with the highest-level one, off the request path."""
+        token = self._token(encoding)
+
+        def run():
+            try:
+                self._save(encoding, compress(self.body, encoding, precompressed=True), final=True)
+            finally:
+                with _refining_lock:
+                    _refining.pop(token, None)
+
+        with _refining_lock:
+            if token in _refining:
+                return
+            thread = _refining[token] = threading.Thread(target=run, name='precompress', daemon=True)
+        thread.start()
+
+
+class CachedVariants(Variants):
+    """Variants whose compressed copies live in the shared cache next to the body under `key`."""
+
+    def __init__(self, key, body):
+        super().__init__(body)
+        self.key = key
+
+    def _token(self, encoding):
+        return f'{self.key}:{encoding}'
+
+    def _load(self, encoding):
+        return cache.get(self._token(encoding))
+
+    def _save(self, encoding, encoded, final):
+        if final:
+            cache.set(self._token(encoding), encoded, PAYLOAD_TTL)
+        else:
+            cache.add(self._token(encoding), encoded, PAYLOAD_TTL)
+
+
+def wait():
+    """Block until the background compressions started so far have finished."""
+    with _refining_lock:
+        threads = list(_refining.values())
+    for thread in threads:
+        thread.join()
+
+
+def precompressed_response(encoded, content_type='application/json'):
+    """Response for a Variants; the middleware asks it for the negotiated encoding."""
+    response = HttpResponse(encoded.body, content_type=content_type)
+    response.precompressed = encoded
+    return response
+
+
+def cached_response(name, build, variant=''):
+    """
+    Response for a cacheable payload: `build()` returns the JSON body bytes and
+    runs only on a miss; the body and its compressed copies are cached side by side.
+    `variant` separates parameterised payloads of the same name (e.g. a filter).
+    """
+    key = f'precompressed:{name}:{version(name)}:{variant}'
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        cache.set(key, body, PAYLOAD_TTL)
+    return precompressed_response(CachedVariants(key, body))
+
+
+def version(name):
+    """Current version of payload `name`; changes whenever it is invalidated."""
+    return caching.versions.get_or_set(_version_key(name), time.time_ns, None)
+
+
+def invalidate(name):
+    """Drop every cached variant of payload `name`; stale entries expire with PAYLOAD_TTL."""
+    caching.versions.delete(_version_key(name))
+
+
+def _version_key(name):
+    return f'precompressed_version:{name}'
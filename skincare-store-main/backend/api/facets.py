@@ -0,0 +1,166 @@
+"""
+Faceted storefront filtering: a page of products plus counts for every facet.
+
+Facets: category, price tier, in stock, trending and minimum average rating;
+ingredient exclusion narrows everything. Counts are disjunctive, i.e. each facet
+is counted with all *other* selections applied, so a shopper sees how many
+results picking another value would give.
+
+Everything is computed from the columns of the catalog snapshot (api.catalog):
+one boolean mask per active facet, counts from mask combinations and
+np.bincount over category codes. No query runs once the snapshot is built.
+"""
+
+from . import catalog
+
+
+# (value, label, lower bound inclusive, upper bound exclusive)
+PRICE_TIERS = [
+    ('under_15', 'Under $15', None, 15),
+    ('15_30', '$15 - $30', 15, 30),
+    ('30_60', '$30 - $60', 30, 60),
+    ('60_plus', '$60 & up', 60, None),
+]
+RATING_STEPS = [4, 3, 2, 1]
+
+
+class FacetError(ValueError):
+    pass
+
+
+def parse(params, csv):
+    """Read facet selections from request.GET (`csv` splits comma-separated values)."""
+    tiers = {tier[0] for tier in PRICE_TIERS}
+    selection = {
+        'category': [value.lower() for value in csv('category')],
+        'price_tier': csv('price_tier'),
+        'in_stock': params.get('in_stock') in ('1', 'true'),
+        'trending': params.get('trending') in ('1', 'true'),
+        'min_rating': None,
+        'exclude_ingredients': csv('exclude_ingredients'),
+    }
+    unknown = set(selection['price_tier']) - tiers
+    if unknown:
+        raise FacetError(f"Unknown price_tier: {', '.join(sorted(unknown))}")
+    if params.get('min_rating'):
+        try:
+            selection['min_rating'] = float(params['min_rating'])
+        except ValueError:
+            raise FacetError('Invalid min_rating')
+    return selection
+
+
+def _tier_mask(snapshot, value):
+    import numpy as np
+
+    _, _, low, high = next(tier for tier in PRICE_TIERS if tier[0] == value)
+    mask = np.ones(len(snapshot), dtype=bool)
+    if low is not None:
+        mask = mask & (snapshot.price >= low)
+    if high is not None:
+        mask = mask & (snapshot.price < high)
+    return mask
+
+
+def _rating_mask(snapshot, minimum):
+    # NaN (unreviewed) compares False
+    return snapshot.rating >= minimum
+
+
+def _conditions(snapshot, selection):
+    """One boolean row mask per active facet, keyed by facet name."""
+    import numpy as np
+
+    conditions = {}
+    if selection['category']:
+        codes = [code for code, key in enumerate(snapshot.category_keys) if key in selection['category']]
+        conditions['category'] = np.isin(snapshot.category_codes, codes)
+    if selection['price_tier']:
+        conditions['price_tier'] = np.logical_or.reduce(
+            [_tier_mask(snapshot, value) for value in selection['price_tier']]
+        )
+    if selection['in_stock']:
+        conditions['in_stock'] = snapshot.stock > 0
+    if selection['trending']:
+        conditions['trending'] = snapshot.trending
+    if selection['min_rating'] is not None:
+        conditions['min_rating'] = _rating_mask(snapshot, selection['min_rating'])
+    return conditions
+
+
+def _all_except(base, conditions, facet=None):
+    mask = base
+    for name, condition in conditions.items():
+        if name != facet:
+            mask = mask & condition
+    return mask
+
+
+def _sort_rows(snapshot, rows, sort):
+    import numpy as np
+
+    ids = snapshot.product_ids[rows]
+    if sort == 'price':
+        order = np.lexsort((ids, snapshot.price[rows]))
+    elif sort == '-price':
+        order = np.lexsort((ids, -snapshot.price[rows]))
+    elif sort == 'rating':
+        # Best rated first, unreviewed products last
+        order = np.lexsort((ids, np.nan_to_num(-snapshot.rating[rows], nan=np.inf)))
+    elif sort == 'title':
+        order = np.argsort(snapshot.title_rank[rows], kind='stable')
+    else:
+        return rows
+    return rows[order]
+
+
+def filter_products(selection, offset=0, limit=24, sort=None):
+    """Return (product dicts page, total, facets) for a parsed selection."""
+    import numpy as np
+
+    snapshot = catalog.get_snapshot()
+    base = np.ones(len(snapshot), dtype=bool)
+    if selection['exclude_ingredients']:
+        base = snapshot.rows_without_ingredients(selection['exclude_ingredients'])
+    conditions = _conditions(snapshot, selection)
+
+    matches = _all_except(base, conditions)
+    category_counts = np.bincount(
+        snapshot.category_codes[_all_except(base, conditions, 'category')],
+        minlength=len(snapshot.category_keys),
+    )
+    tier_base = _all_except(base, conditions, 'price_tier')
+    rating_base = _all_except(base, conditions, 'min_rating')
+
+    facets = {
+        'category': sorted(
+            (
+                {'value': snapshot.category_labels[code], 'count': int(count),
+                 'selected': snapshot.category_keys[code] in selection['category']}
+                for code, count in enumerate(category_counts) if count
+            ),
+            key=lambda facet: (-facet['count'], facet['value']),
+        ),
+        'price_tier': [
+            {'value': value, 'label': label,
+             'count': int(np.count_nonzero(tier_base & _tier_mask(snapshot, value))),
+             'selected': value in selection['price_tier']}
+            for value, label, _, _ in PRICE_TIERS
+        ],
+        'in_stock': {
+            'count': int(np.count_nonzero(_all_except(base, conditions, 'in_stock') & (snapshot.stock > 0))),
+            'selected': selection['in_stock'],
+        },
+        'trending': {
+            'count': int(np.count_nonzero(_all_except(base, conditions, 'trending') & snapshot.trending)),
+            'selected': selection['trending'],
+        },
+        'min_rating': [
+            {'value': step, 'count': int(np.count_nonzero(rating_base & _rating_mask(snapshot, step))),
+             'selected': selection['min_rating'] == step}
+            for step in RATING_STEPS
+        ],
+    }
+
+    rows = _sort_rows(snapshot, np.flatnonzero(matches), sort)
+    return snapshot.products_at(rows[offset:offset + limit]), len(rows), facets
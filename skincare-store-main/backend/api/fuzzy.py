@@ -0,0 +1,191 @@
+"""
+Typo-tolerant trigram search over users (name, email) and products (title, category).
+
+On PostgreSQL the columns carry pg_trgm GIN indexes (migration 0021). A search is
+one query: candidates come from the index through the word-similarity operator
+(`<%`) or a substring ILIKE, are scored with word_similarity, counted and paged.
+Counting stops at MAX_MATCHES, beyond which the total is reported as an estimate.
+
+Other backends (the SQLite test database) use an in-process trigram index built
+the way pg_trgm splits text, rebuilt lazily after writes with the version-key
+pattern used by api.search.
+
+Both paths return {'total': int, 'estimated': bool, 'hits': [(id, score), ...]}.
+A substring match scores 1 on top of its similarity, so everything the old
+icontains lookups found still ranks ahead of fuzzy-only matches.
+"""
+
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import connection
+
+from . import caching
+from .models import AppUser, Product
+
+
+VERSION_KEY = 'fuzzy_index_version:{}'
+MAX_MATCHES = 1000
+SIMILARITY_THRESHOLD = 0.6  # pg_trgm.word_similarity_threshold default
+
+TARGETS = {
+    'users': (AppUser, ('name', 'email')),
+    'products': (Product, ('title', 'category')),
+}
+
+WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+_local = {}
+_lock = threading.Lock()
+
+
+def search_users(query, offset=0, limit=20):
+    return search('users', query, offset, limit)
+
+
+def search_products(query, offset=0, limit=20):
+    return search('products', query, offset, limit)
+
+
+def search(target, query, offset=0, limit=20):
+    if connection.vendor == 'postgresql':
+        return _search_postgres(target, query, offset, limit)
+    return get_index(target).search(query, offset, limit)
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL
+# ---------------------------------------------------------------------------
+
+def _like_pattern(query):
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _postgres_sql(table, fields):
+    similarity = ', '.join(f'word_similarity(%(q)s, {field})' for field in fields)
+    matches = ' OR '.join(
+        f'%(q)s <%% {field} OR {field} ILIKE %(like)s' for field in fields
+    )
+    substring = ' OR '.join(f'{field} ILIKE %(like)s' for field in fields)
+    return f"""
+WITH matches AS (
+    SELECT id,
+           greatest({similarity}) + CASE WHEN {substring} THEN 1 ELSE 0 END AS score
+    FROM {table}
+    WHERE {matches}
+    ORDER BY score DESC, id
+    LIMIT {MAX_MATCHES}
+)
+SELECT counted.total, page.id, page.score
+FROM (SELECT count(*) AS total FROM matches) counted
+LEFT JOIN LATERAL (
+    SELECT id, score FROM matches ORDER BY score DESC, id LIMIT %(limit)s OFFSET %(offset)s
+) page ON true
+"""
+
+
+def _search_postgres(target, query, offset, limit):
+    model, fields = TARGETS[target]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _postgres_sql(model._meta.db_table, fields),
+            {'q': query, 'like': _like_pattern(query), 'limit': limit, 'offset': offset},
+        )
+        rows = cursor.fetchall()
+
+    total = rows[0][0] if rows else 0
+    return {
+        'total': total,
+        'estimated': total >= MAX_MATCHES,
+        'hits': [(pk, round(float(score), 6)) for _, pk, score in rows if pk is not None],
+    }
+
+
+# ---------------------------------------------------------------------------
+# In-process fallback
+# ---------------------------------------------------------------------------
+
+def trigrams(text):
+    """pg_trgm's trigram set: lowercased words padded with two spaces in front and one behind."""
+    grams = set()
+    for word in WORD_RE.findall(str(text).lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Trigram -> ids postings plus the lowercased fields used to confirm substring matches."""
+
+    def __init__(self, rows, version=None):
+        """`rows` are (id, field, field, ...) tuples."""
+        self.version = version
+        self.postings = defaultdict(list)
+        self.texts = {}
+
+        for pk, *values in rows:
+            self.texts[pk] = [str(value).lower() for value in values if value]
+            for gram in trigrams(' '.join(self.texts[pk])):
+                self.postings[gram].append(pk)
+
+    def search(self, query, offset=0, limit=20):
+        query_grams = trigrams(query)
+        needle = query.strip().lower()
+        if not query_grams:
+            return {'total': 0, 'estimated': False, 'hits': []}
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+        scores = {
+            pk: count / len(query_grams)
+            for pk, count in shared.items()
+            if count / len(query_grams) >= SIMILARITY_THRESHOLD
+        }
+        for pk in self._substring_matches(needle):
+            scores[pk] = scores.get(pk, shared[pk] / len(query_grams)) + 1
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:MAX_MATCHES]
+        return {
+            'total': len(ranked),
+            'estimated': len(ranked) >= MAX_MATCHES,
+            'hits': [(pk, round(score, 6)) for pk, score in ranked[offset:offset + limit]],
+        }
+
+    def _substring_matches(self, needle):
+        # Every unpadded trigram of each query word occurs in a text containing the query
+        inner = set()
+        for word in WORD_RE.findall(needle):
+            inner.update(word[i:i + 3] for i in range(len(word) - 2))
+        if inner:
+            candidates = set.intersection(*(set(self.postings.get(gram, ())) for gram in inner))
+        else:
+            candidates = self.texts  # Too short for trigrams: check every text
+        return [pk for pk in candidates if any(needle in text for text in self.texts[pk])]
+
+
+def get_index(target):
+    """Return the in-process trigram index for `target`, rebuilding it after writes."""
+    version = caching.versions.get(VERSION_KEY.format(target))
+    local = _local.get(target)
+    if local is not None and version is not None and local.version == version:
+        return local
+
+    with _lock:
+        if version is None:
+            version = time.time_ns()
+            caching.versions.set(VERSION_KEY.format(target), version, None)
+        local = _local.get(target)
+        if local is None or local.version != version:
+            model, fields = TARGETS[target]
+            rows = model.objects.order_by('id').values_list('id', *fields)
+            local = _local[target] = TrigramIndex(rows.iterator(chunk_size=2000), version=version)
+        return local
+
+
+def invalidate(target):
+    """Mark the in-process index for `target` stale (PostgreSQL reads the tables directly)."""
+    caching.versions.delete(VERSION_KEY.format(target))
@@ -0,0 +1,67 @@
+"""
+Conditional GET and CDN caching headers for public read endpoints.
+
+`public()` wraps a view with django.views.decorators.http.condition. Each ETag is
+built from version counters the process already holds: the catalog snapshot
+version, a product's `updated_at`, a payload version from api.compression. That
+means an If-None-Match hit is answered with 304 before the view reads any rows
+or serializes anything. The query string is part of the tag, so `?fields=` and
+`?view=` variants validate separately.
+
+Responses get `Cache-Control: public` with a browser `max-age` and a CDN
+`s-maxage`. Views whose body depends on the caller (allergy flags for signed-in
+users) pass `personal=True`. Requests carrying a token then get no ETag and
+`private, no-cache`, and every response varies on Authorization.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+
+MAX_AGE = 60  # Browsers revalidate after a minute; 304s keep that cheap
+SHARED_MAX_AGE = 300  # CDN edge lifetime
+
+
+def variant(request):
+    """Short digest of the query string ('all' without one)."""
+    query = request.GET.urlencode()
+    return hashlib.md5(query.encode()).hexdigest()[:12] if query else 'all'
+
+
+def _authenticated(request):
+    return bool(request.headers.get('Authorization', '').replace('Bearer ', '').strip())
+
+
+def public(etag=None, last_modified=None, max_age=MAX_AGE, shared_max_age=SHARED_MAX_AGE, personal=False):
+    """Decorator: ETag/Last-Modified validation plus CDN-friendly Cache-Control."""
+    def decorator(view):
+        def etag_func(request, *args, **kwargs):
+            if etag is None or (personal and _authenticated(request)):
+                return None
+            return etag(request, *args, **kwargs)
+
+        def last_modified_func(request, *args, **kwargs):
+            if last_modified is None or (personal and _authenticated(request)):
+                return None
+            return last_modified(request, *args, **kwargs)
+
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method not in ('GET', 'HEAD') or response.status_code not in (200, 304):
+                return response
+            if personal:
+                patch_vary_headers(response, ('Authorization',))
+                if _authenticated(request):
+                    patch_cache_control(response, private=True, no_cache=True)
+                    return response
+            patch_cache_control(response, public=True, max_age=max_age, s_maxage=shared_max_age)
+            return response
+
+        return wrapper
+    return decorator
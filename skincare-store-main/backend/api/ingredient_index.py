@@ -0,0 +1,130 @@
+"""
+Catalog-wide ingredient bitmask index (see api.allergens for the matching rule).
+
+    vocabulary      every distinct normalized ingredient, one bit each
+    product_ids     sorted product ids (row lookup by binary search)
+    tokens          precomputed normalized ingredient tokens per product
+    masks           uint64 bitmask words per product, bit set = contains token
+    category_rows   rows of each category, for allergen-free alternatives
+"""
+
+import numpy as np
+
+from .allergens import get_matcher, normalize_allergies, tokenize
+
+
+MAX_CACHED_ALLERGY_MASKS = 256
+MAX_CACHED_ALTERNATIVES = 1024
+
+
+class IngredientIndex:
+    """Immutable ingredient bitmask index over the whole catalog."""
+
+    def __init__(self, rows, version=None):
+        """`rows` is an iterable of (product_id, category, ingredients) ordered by product id."""
+        self.version = version
+        vocabulary = {}
+        ids, tokens, set_rows, set_bits = [], [], [], []
+        categories = {}
+
+        for row, (product_id, category, ingredients) in enumerate(rows):
+            product_tokens = tokenize(ingredients)
+            ids.append(product_id)
+            tokens.append(product_tokens)
+            categories.setdefault(category, []).append(row)
+            for token in product_tokens:
+                set_rows.append(row)
+                set_bits.append(vocabulary.setdefault(token, len(vocabulary)))
+
+        self.product_ids = np.asarray(ids, dtype=np.int64)
+        self.tokens = tokens
+        self.vocabulary = list(vocabulary)
+        self.category_rows = {category: np.asarray(rows, dtype=np.intp) for category, rows in categories.items()}
+        self.words = max(1, (len(vocabulary) + 63) // 64)
+        self.masks = np.zeros((len(ids), self.words), dtype=np.uint64)
+        if set_bits:
+            bits = np.asarray(set_bits, dtype=np.uint64)
+            np.bitwise_or.at(
+                self.masks,
+                (np.asarray(set_rows, dtype=np.intp), (bits >> np.uint64(6)).astype(np.intp)),
+                np.uint64(1) << (bits & np.uint64(63)),
+            )
+        self._allergy_masks = {}
+        self._safe_by_category = {}
+
+    def allergy_mask(self, allergies):
+        """Bitmask of every vocabulary token matched by the allergy list."""
+        matcher = get_matcher(allergies)
+        mask = self._allergy_masks.get(matcher.allergies)
+        if mask is None:
+            bits = np.asarray(
+                [bit for bit, token in enumerate(self.vocabulary) if matcher.matches(token)],
+                dtype=np.uint64,
+            )
+            mask = np.zeros(self.words, dtype=np.uint64)
+            if bits.size:
+                np.bitwise_or.at(mask, (bits >> np.uint64(6)).astype(np.intp), np.uint64(1) << (bits & np.uint64(63)))
+            if len(self._allergy_masks) >= MAX_CACHED_ALLERGY_MASKS:
+                self._allergy_masks.clear()
+            self._allergy_masks[matcher.allergies] = mask
+        return mask
+
+    def rows(self, product_ids):
+        """Row positions for product ids, plus a boolean array of which ids are indexed."""
+        ids = np.asarray(product_ids, dtype=np.int64)
+        if not len(self.product_ids):
+            return np.zeros(len(ids), dtype=np.intp), np.zeros(len(ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.product_ids, ids), len(self.product_ids) - 1)
+        return positions, self.product_ids[positions] == ids
+
+    def tokens_for(self, product_id):
+        """Precomputed normalized tokens of a product, or None if it is not indexed."""
+        positions, found = self.rows([product_id])
+        return self.tokens[positions[0]] if found[0] else None
+
+    def flag(self, product_ids, allergies):
+        """
+        Boolean array: True where the product contains one of the allergens.
+        Products not in the index (created after it was built) are reported False.
+        """
+        if not len(product_ids) or not normalize_allergies(allergies):
+            return np.zeros(len(product_ids), dtype=bool)
+        positions, found = self.rows(product_ids)
+        if not found.any():
+            return found
+        mask = self.allergy_mask(allergies)
+        return (self.masks[positions] & mask).any(axis=1) & found
+
+    def allergens_found(self, product_ids, allergies):
+        """
+        Matched tokens per product in one pass: the bitmask AND selects the affected
+        rows, and only those are resolved to tokens. None marks products that are
+        not indexed.
+        """
+        positions, found = self.rows(product_ids)
+        matcher = get_matcher(allergies)
+        if not matcher or not found.any():
+            return [[] if hit else None for hit in found.tolist()]
+        affected = (self.masks[positions] & self.allergy_mask(allergies)).any(axis=1)
+        return [
+            (matcher.found(self.tokens[row]) if bad else []) if hit else None
+            for row, hit, bad in zip(positions.tolist(), found.tolist(), affected.tolist())
+        ]
+
+    def safe_in_category(self, category, allergies):
+        """Ids of the products in `category` free of the allergens, in id order (memoized)."""
+        key = (category, normalize_allergies(allergies))
+        safe = self._safe_by_category.get(key)
+        if safe is None:
+            rows = self.category_rows.get(category, np.zeros(0, dtype=np.intp))
+            unsafe = (self.masks[rows] & self.allergy_mask(allergies)).any(axis=1)
+            safe = self.product_ids[rows[~unsafe]]
+            if len(self._safe_by_category) >= MAX_CACHED_ALTERNATIVES:
+                self._safe_by_category.clear()
+            self._safe_by_category[key] = safe
+        return safe
+
+    def alternatives(self, category, allergies, exclude_id=None, limit=3):
+        """Up to `limit` allergen-free product ids from the same category."""
+        safe = self.safe_in_category(category, allergies)
+        return [pid for pid in safe[:limit + 1].tolist() if pid != exclude_id][:limit]
@@ -0,0 +1,97 @@
+"""
+Normalized ingredient tables kept in step with `Product.ingredients`.
+
+`Product.ingredients` stays the source of truth (it is what the API returns), but
+a JSON list cannot be indexed portably. Each distinct normalized ingredient gets an
+`Ingredient` row and every product/ingredient pair a `ProductIngredient` row, so
+"products without X" becomes an indexed NOT IN subquery instead of loading every
+product into Python.
+
+Single product writes are synced from a post_save handler (api.signals); bulk
+writes that bypass signals (bulk_create, queryset.update, raw SQL) are caught up
+with `python manage.py backfill_ingredients`.
+"""
+
+from .allergens import tokenize
+from .models import Ingredient, Product, ProductIngredient
+
+
+NAME_LENGTH = Ingredient._meta.get_field('name').max_length
+LOOKUP_CHUNK = 500  # Stay well below SQLite's bound-parameter limit
+
+
+def ingredient_names(ingredients):
+    """Normalized, de-duplicated ingredient names in list order."""
+    return list(dict.fromkeys(token[:NAME_LENGTH] for token in tokenize(ingredients)))
+
+
+def ingredient_ids(names):
+    """Map names to Ingredient ids, creating any that do not exist yet."""
+    names = list(dict.fromkeys(names))
+    ids = {}
+    for start in range(0, len(names), LOOKUP_CHUNK):
+        chunk = names[start:start + LOOKUP_CHUNK]
+        Ingredient.objects.bulk_create([Ingredient(name=name) for name in chunk], ignore_conflicts=True)
+        ids.update(Ingredient.objects.filter(name__in=chunk).values_list('name', 'id'))
+    return ids
+
+
+def sync_product(product):
+    """Bring one product's ingredient links up to date. Returns True if anything changed."""
+    names = ingredient_names(product.ingredients)
+    current = list(
+        ProductIngredient.objects.filter(product_id=product.pk)
+        .order_by('position')
+        .values_list('ingredient__name', flat=True)
+    )
+    if current == names:
+        return False
+
+    ids = ingredient_ids(names)
+    ProductIngredient.objects.filter(product_id=product.pk).delete()
+    ProductIngredient.objects.bulk_create([
+        ProductIngredient(product_id=product.pk, ingredient_id=ids[name], position=position)
+        for position, name in enumerate(names)
+    ])
+    return True
+
+
+def backfill(batch_size=1000, product_ids=None):
+    """
+    Rebuild the links for every product (or the given ids) in id-ordered batches.
+    Returns (products processed, links written).
+    """
+    queryset = Product.objects.order_by('id')
+    if product_ids is not None:
+        queryset = queryset.filter(id__in=product_ids)
+
+    processed = written = 0
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).values_list('id', 'ingredients')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        names_by_product = {pid: ingredient_names(ingredients) for pid, ingredients in batch}
+        ids = ingredient_ids(name for names in names_by_product.values() for name in names)
+
+        stale = ProductIngredient.objects.filter(product_id__gte=batch[0][0], product_id__lte=last_id)
+        if product_ids is not None:
+            stale = stale.filter(product_id__in=list(names_by_product))
+        stale.delete()
+        links = [
+            ProductIngredient(product_id=pid, ingredient_id=ids[name], position=position)
+            for pid, names in names_by_product.items()
+            for position, name in enumerate(names)
+        ]
+        ProductIngredient.objects.bulk_create(links, batch_size=batch_size)
+
+        processed += len(batch)
+        written += len(links)
+    return processed, written
+
+
+def exclude_containing(queryset, terms):
+    """Filter a Product queryset down to products with no ingredient containing any term."""
+    return queryset.exclude(ingredient_links__ingredient__in=Ingredient.matching(terms))
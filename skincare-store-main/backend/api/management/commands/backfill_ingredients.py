@@ -0,0 +1,47 @@
+"""
+Management command to (re)build the normalized ingredient tables from Product.ingredients.
+Run it once after migrating, and after bulk product imports that bypass model signals.
+
+Usage:
+    python manage.py backfill_ingredients
+    python manage.py backfill_ingredients --batch-size 5000
+    python manage.py backfill_ingredients --products 1 2 3
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api import ingredients
+from api.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Ingredient/ProductIngredient rows from Product.ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products per batch')
+        parser.add_argument('--products', type=int, nargs='+', help='Only these product ids')
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete ingredients no longer used by any product'
+        )
+
+    def handle(self, *args, **options):
+        start_time = timezone.now()
+
+        with transaction.atomic():
+            processed, written = ingredients.backfill(
+                batch_size=max(1, options['batch_size']),
+                product_ids=options['products'],
+            )
+            pruned = 0
+            if options['prune']:
+                pruned, _ = Ingredient.objects.filter(product_links__isnull=True).delete()
+
+        elapsed = (timezone.now() - start_time).total_seconds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {processed} products ({written} ingredient links, '
+            f'{Ingredient.objects.count()} ingredients, {pruned} pruned) in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,98 @@
+"""
+Management command to measure worker startup cost.
+
+Each measurement runs in a fresh interpreter, the way a gunicorn worker boots:
+django.setup() plus importing the URLconf (and therefore every view module).
+Two scenarios are reported side by side:
+
+    lazy   - what a worker pays at boot now that the recommendation stack is lazy
+    eager  - the same worker after the recommendation stack has been loaded, i.e.
+             what every worker used to pay at boot
+
+Usage:
+    python manage.py benchmark_startup
+    python manage.py benchmark_startup --repeat 5
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+HEAVY_MODULES = ['numpy', 'scipy', 'pandas', 'sklearn']
+
+PROBE = r'''
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import {urlconf}
+boot = time.perf_counter() - start
+rss_boot = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if {eager}:
+    from api.recommender_facade import ProductFeatureVector
+    ProductFeatureVector.get_feature_vectors
+    from sklearn.metrics.pairwise import cosine_similarity
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    import pandas
+total = time.perf_counter() - start
+print(json.dumps({{
+    'boot_seconds': boot,
+    'total_seconds': total,
+    'rss_boot_kb': rss_boot,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': [m for m in {heavy!r} if m in sys.modules],
+}}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Report worker import time and RSS with the recommendation stack lazy vs eagerly loaded'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario (median is reported)')
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+        results = {}
+
+        for scenario, eager in [('lazy', False), ('eager', True)]:
+            runs = [self._probe(eager) for _ in range(repeat)]
+            results[scenario] = {
+                'seconds': statistics.median(r['total_seconds'] for r in runs),
+                'rss_mb': statistics.median(r['rss_kb'] for r in runs) / 1024,
+                'modules': runs[-1]['modules'],
+            }
+
+        self.stdout.write(self.style.SUCCESS(f'Worker startup (median of {repeat} runs)'))
+        self.stdout.write(f'{"scenario":<10}{"import time":>14}{"max RSS":>12}  heavy modules loaded')
+        for scenario, result in results.items():
+            self.stdout.write(
+                f'{scenario:<10}{result["seconds"]:>12.3f} s{result["rss_mb"]:>9.1f} MB  '
+                f'{", ".join(result["modules"]) or "-"}'
+            )
+
+        lazy, eager = results['lazy'], results['eager']
+        self.stdout.write(self.style.SUCCESS(
+            f'\nLazy loading saves {eager["seconds"] - lazy["seconds"]:.3f} s and '
+            f'{eager["rss_mb"] - lazy["rss_mb"]:.1f} MB per worker'
+        ))
+
+    def _probe(self, eager):
+        code = PROBE.format(urlconf=settings.ROOT_URLCONF, eager=eager, heavy=HEAVY_MODULES)
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        completed = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=str(settings.BASE_DIR),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f'Startup probe failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
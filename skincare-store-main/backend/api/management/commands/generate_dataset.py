@@ -0,0 +1,532 @@
+"""
+Management command to generate a large synthetic dataset for load and scaling tests.
+
+Rows are bulk-inserted in batches (or streamed through Postgres COPY with --copy)
+and drawn from heavy-tailed distributions so that a few products and users attract
+most of the activity, like real traffic does. The same --seed always produces the
+same dataset.
+
+Usage:
+    python manage.py generate_dataset
+    python manage.py generate_dataset --users 1000000 --products 50000 --copy
+    python manage.py generate_dataset --scale 10 --seed 7
+    python manage.py generate_dataset --clear  # Remove previously generated users and products
+"""
+
+import csv
+import io
+import json
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api import ingredients
+from api.models import (
+    AppUser, Product, UserFollow, UserLikedProduct, Order, OrderItem,
+    Review, Conversation, Message, Notification
+)
+
+
+CATEGORIES = [
+    'Serums', 'Moisturizers', 'Cleansers', 'Sunscreens', 'Toners',
+    'Masks', 'Eye Care', 'Exfoliators', 'Lip Care', 'Body Care',
+]
+
+INGREDIENTS = [
+    'hyaluronic acid', 'glycerin', 'niacinamide', 'vitamin c', 'retinol',
+    'salicylic acid', 'glycolic acid', 'lactic acid', 'ceramides', 'peptides',
+    'squalane', 'shea butter', 'aloe vera', 'green tea extract', 'zinc oxide',
+    'titanium dioxide', 'fragrance', 'alcohol', 'parabens', 'lanolin',
+    'coconut oil', 'tea tree oil', 'benzoyl peroxide', 'centella asiatica', 'panthenol',
+]
+
+BENEFITS = [
+    'hydration', 'anti-aging', 'brightening', 'acne control', 'soothing',
+    'oil control', 'sun protection', 'exfoliation', 'firming', 'repair',
+]
+
+ADJECTIVES = ['Hydrating', 'Brightening', 'Gentle', 'Daily', 'Intensive', 'Calming', 'Radiant', 'Clarifying']
+
+COMMENTS = [
+    'Love it!', 'Works well for my skin.', 'Decent product.', 'Not for me.',
+    'Great value.', 'Would buy again.', 'Gave me a breakout.', 'Smells nice.',
+]
+
+MESSAGES = [
+    'Hey! Have you tried this?', 'This one is great', 'Thanks for the tip!',
+    'What do you use for dry skin?', 'Ordered it yesterday', 'Let me know how it goes',
+]
+
+PAID_STATUSES = ['confirmed', 'processing', 'shipped', 'delivered']
+
+# Generated products carry this title prefix, so --clear can find them again
+PRODUCT_PREFIX = '[loadtest] '
+
+# COPY's NULL marker. In CSV format the default marker is an unquoted empty field,
+# which would turn every empty string into NULL.
+COPY_NULL = r'\N'
+
+
+@contextmanager
+def explicit_timestamps(*model_classes):
+    """Let generated rows carry their own created_at/updated_at values.
+
+    bulk_create honours auto_now/auto_now_add, which would stamp every row with the
+    current time and make recency-based features (trending, activity windows) useless.
+    """
+    overridden = []
+    for model in model_classes:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                overridden.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = False
+                field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in overridden:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a large synthetic dataset (users, products, social and order activity)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Number of users to create')
+        parser.add_argument('--products', type=int, default=2000, help='Number of products to create')
+        parser.add_argument('--follows', type=float, default=20, help='Average follows per user')
+        parser.add_argument('--likes', type=float, default=8, help='Average liked products per user')
+        parser.add_argument('--orders', type=float, default=2, help='Average orders per user')
+        parser.add_argument('--reviews', type=float, default=1.5, help='Average reviews per user')
+        parser.add_argument('--messages', type=float, default=6, help='Average messages per conversation')
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Multiply user and product counts (e.g. 10 for a 10x dataset)'
+        )
+        parser.add_argument('--days', type=int, default=90, help='Spread activity timestamps over this many days')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same dataset)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT/COPY batch')
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Use Postgres COPY instead of bulk_create (PostgreSQL only)'
+        )
+        parser.add_argument(
+            '--domain',
+            type=str,
+            default='loadtest.invalid',
+            help='Email domain used for generated users'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete users previously generated with --domain (and their activity), generated products, and exit'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = max(1, options['batch_size'])
+        self.use_copy = options['copy']
+        self.domain = options['domain']
+
+        if self.use_copy and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires a PostgreSQL database')
+
+        if options['clear']:
+            deleted, _ = AppUser.objects.filter(email__endswith=f'@{self.domain}').delete()
+            deleted += Product.objects.filter(title__startswith=PRODUCT_PREFIX).delete()[0]
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} generated rows'))
+            return
+
+        self.rng = np.random.default_rng(options['seed'])
+        self.now = timezone.now()
+        self.days = max(1, options['days'])
+
+        n_users = int(options['users'] * options['scale'])
+        n_products = int(options['products'] * options['scale'])
+        if n_users < 2 or n_products < 1:
+            raise CommandError('Need at least 2 users and 1 product')
+
+        if AppUser.objects.filter(email__endswith=f'@{self.domain}').exists():
+            raise CommandError(
+                f'Users with @{self.domain} already exist; run with --clear first or pick another --domain'
+            )
+
+        start_time = timezone.now()
+        self.stdout.write(self.style.SUCCESS(
+            f'Generating dataset: {n_users} users, {n_products} products (seed={options["seed"]})'
+        ))
+
+        with explicit_timestamps(
+            UserFollow, UserLikedProduct, Order, Review, Conversation, Message, Notification
+        ):
+            user_ids = self._generate_users(n_users)
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(user_ids)} users'))
+
+            product_ids, prices = self._generate_products(n_products)
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(product_ids)} products'))
+
+            # Bulk inserts skip the post_save sync of the normalized ingredient tables
+            _, links = ingredients.backfill(batch_size=self.batch_size)
+            self.stdout.write(self.style.SUCCESS(f'✓ {links} product ingredient links'))
+
+            # Popularity ranks are shuffled so that "hot" rows are spread across the id range
+            user_cdf = self._zipf_cdf(len(user_ids))
+            product_cdf = self._zipf_cdf(len(product_ids))
+
+            follows = self._generate_follows(user_ids, user_cdf, options['follows'])
+            self.stdout.write(self.style.SUCCESS(f'✓ {follows} follows'))
+
+            likes = self._generate_likes(user_ids, product_ids, product_cdf, options['likes'])
+            self.stdout.write(self.style.SUCCESS(f'✓ {likes} likes'))
+
+            orders, items = self._generate_orders(
+                user_ids, product_ids, prices, product_cdf, options['orders']
+            )
+            self.stdout.write(self.style.SUCCESS(f'✓ {orders} orders ({items} items)'))
+
+            reviews = self._generate_reviews(user_ids, product_ids, product_cdf, options['reviews'])
+            self.stdout.write(self.style.SUCCESS(f'✓ {reviews} reviews'))
+
+            conversations, messages = self._generate_conversations(user_ids, options['messages'])
+            self.stdout.write(self.style.SUCCESS(f'✓ {conversations} conversations ({messages} messages)'))
+
+            notifications = self._generate_notifications(user_ids)
+            self.stdout.write(self.style.SUCCESS(f'✓ {notifications} notifications'))
+
+        elapsed_time = (timezone.now() - start_time).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f'\nDataset generated in {elapsed_time:.2f} seconds'))
+
+    # ------------------------------------------------------------------
+    # Distributions
+    # ------------------------------------------------------------------
+
+    def _zipf_cdf(self, n, exponent=1.1):
+        """Cumulative power-law popularity weights over n items, in a random (seeded) order."""
+        ranks = self.rng.permutation(n) + 1
+        cdf = np.cumsum(1.0 / np.power(ranks, exponent))
+        return cdf / cdf[-1]
+
+    def _sample(self, cdf, k):
+        """Draw k indexes from a popularity CDF in O(k log n)."""
+        indexes = np.searchsorted(cdf, self.rng.random(k), side='right')
+        return np.minimum(indexes, len(cdf) - 1)
+
+    def _activity_counts(self, n, mean, cap):
+        """Heavy-tailed per-entity activity counts with the requested mean."""
+        if mean <= 0:
+            return np.zeros(n, dtype=np.int64)
+        shape = 1.5
+        # numpy's pareto() is Lomax; +1 gives a classic Pareto with mean shape/(shape-1)
+        samples = (self.rng.pareto(shape, n) + 1) * mean * (shape - 1) / shape
+        return np.minimum(np.floor(samples), cap).astype(np.int64)
+
+    def _timestamps(self, n):
+        """Random timestamps within the last --days, skewed towards recent activity."""
+        seconds = self.rng.exponential(self.days * 86400 / 3, n)
+        seconds = np.minimum(seconds, self.days * 86400)
+        return [self.now - timedelta(seconds=float(s)) for s in seconds]
+
+    # ------------------------------------------------------------------
+    # Writers
+    # ------------------------------------------------------------------
+
+    def _insert(self, model, rows):
+        """Insert an iterable of row dicts (keyed by attname) in batches."""
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._write_batch(model, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            self._write_batch(model, batch)
+            total += len(batch)
+        return total
+
+    def _write_batch(self, model, batch):
+        with transaction.atomic():
+            if self.use_copy:
+                self._copy_batch(model, batch)
+            else:
+                model.objects.bulk_create([model(**row) for row in batch], batch_size=self.batch_size)
+
+    def _copy_batch(self, model, batch):
+        columns = list(batch[0].keys())
+        buffer = self._copy_buffer(batch, columns)
+
+        quote = connection.ops.quote_name
+        column_sql = ', '.join(quote(model._meta.get_field(column).column) for column in columns)
+        sql = (
+            f'COPY {quote(model._meta.db_table)} ({column_sql}) '
+            f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(sql, buffer)
+
+    @classmethod
+    def _copy_buffer(cls, batch, columns):
+        """The batch as COPY CSV input, rewound for reading."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow([cls._copy_value(row[column]) for column in columns])
+        buffer.seek(0)
+        return buffer
+
+    @staticmethod
+    def _copy_value(value):
+        if value is None:
+            return COPY_NULL
+        if isinstance(value, (list, dict)):
+            return json.dumps(value)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def _ids_after(self, model, last_id):
+        """Return ids of rows inserted after last_id, in insertion order."""
+        return np.fromiter(
+            model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True).iterator(),
+            dtype=np.int64,
+        )
+
+    @staticmethod
+    def _last_id(model):
+        last = model.objects.order_by('-id').values_list('id', flat=True).first()
+        return last or 0
+
+    # ------------------------------------------------------------------
+    # Generators
+    # ------------------------------------------------------------------
+
+    def _generate_users(self, n):
+        # Hashing a password per row would dominate the run; every generated user
+        # shares one hash for the documented load-test password.
+        password = make_password('loadtest123')
+        last_id = self._last_id(AppUser)
+        allergy_choices = np.array(INGREDIENTS[15:])
+        has_allergies = self.rng.random(n) < 0.15
+
+        def rows():
+            for i in range(n):
+                allergies = []
+                if has_allergies[i]:
+                    count = int(self.rng.integers(1, 3))
+                    allergies = [str(a) for a in self.rng.choice(allergy_choices, count, replace=False)]
+                yield {
+                    'name': f'Load User {i}',
+                    'email': f'user{i}@{self.domain}',
+                    'password': password,
+                    'bio': '',
+                    'allergies': allergies,
+                }
+
+        self._insert(AppUser, rows())
+        return self._ids_after(AppUser, last_id)
+
+    def _generate_products(self, n):
+        last_id = self._last_id(Product)
+        # Log-normal prices: most products are cheap, a long tail is premium
+        prices = np.round(np.clip(self.rng.lognormal(3.0, 0.6, n), 2, 500), 2)
+        stocks = self.rng.integers(0, 500, n)
+        categories = self.rng.integers(0, len(CATEGORIES), n)
+        trending = self.rng.random(n) < 0.05
+
+        def rows():
+            for i in range(n):
+                category = CATEGORIES[categories[i]]
+                ingredients = [str(x) for x in self.rng.choice(INGREDIENTS, int(self.rng.integers(2, 7)), replace=False)]
+                benefits = [str(x) for x in self.rng.choice(BENEFITS, int(self.rng.integers(1, 4)), replace=False)]
+                kind = category[:-1] if category.endswith('s') else category
+                yield {
+                    'title': f'{PRODUCT_PREFIX}{ADJECTIVES[i % len(ADJECTIVES)]} {kind} {i}',
+                    'description': f'Synthetic {category.lower()} product generated for load testing.',
+                    'price': float(prices[i]),
+                    'stock': int(stocks[i]),
+                    'images': [f'https://via.placeholder.com/400x400.png?text=Product+{i}'],
+                    'category': category,
+                    'ingredients': ingredients,
+                    'is_trending': bool(trending[i]),
+                    'benefits': benefits,
+                    'how_to_use': ['Apply to clean skin.'],
+                    'faqs': [],
+                    'updated_at': self.now,  # COPY does not apply auto_now
+                }
+
+        self._insert(Product, rows())
+        return self._ids_after(Product, last_id), prices
+
+    def _generate_follows(self, user_ids, user_cdf, mean):
+        n = len(user_ids)
+        counts = self._activity_counts(n, mean, cap=n - 1)
+        # Edges are kept as compact index arrays: conversations and notifications
+        # are derived from them once the follows are written.
+        self.followers = array('q')
+        self.followings = array('q')
+
+        def rows():
+            for i in range(n):
+                if counts[i] == 0:
+                    continue
+                # A few "influencer" accounts attract most of the followers
+                targets = set(self._sample(user_cdf, int(counts[i])).tolist())
+                targets.discard(i)
+                created = self._timestamps(len(targets))
+                for target, created_at in zip(sorted(targets), created):
+                    self.followers.append(i)
+                    self.followings.append(target)
+                    yield {
+                        'follower_id': int(user_ids[i]),
+                        'following_id': int(user_ids[target]),
+                        'created_at': created_at,
+                    }
+
+        return self._insert(UserFollow, rows())
+
+    def _generate_likes(self, user_ids, product_ids, product_cdf, mean):
+        counts = self._activity_counts(len(user_ids), mean, cap=len(product_ids))
+
+        def rows():
+            for i, user_id in enumerate(user_ids):
+                if counts[i] == 0:
+                    continue
+                liked = set(product_ids[self._sample(product_cdf, int(counts[i]))].tolist())
+                for product_id, created_at in zip(sorted(liked), self._timestamps(len(liked))):
+                    yield {'user_id': int(user_id), 'product_id': product_id, 'created_at': created_at}
+
+        return self._insert(UserLikedProduct, rows())
+
+    def _generate_orders(self, user_ids, product_ids, prices, product_cdf, mean):
+        counts = self._activity_counts(len(user_ids), mean, cap=200)
+        price_by_id = dict(zip(product_ids.tolist(), prices.tolist()))
+        last_order_id = self._last_id(Order)
+        order_items = []
+        statuses = PAID_STATUSES + ['pending', 'cancelled']
+        status_weights = np.array([0.2, 0.1, 0.15, 0.4, 0.1, 0.05])
+
+        def rows():
+            for i, user_id in enumerate(user_ids):
+                for created_at in self._timestamps(int(counts[i])):
+                    basket = product_ids[self._sample(product_cdf, int(self.rng.integers(1, 5)))]
+                    items = []
+                    total = 0.0
+                    for product_id in set(basket.tolist()):
+                        qty = int(self.rng.integers(1, 3))
+                        price = price_by_id[product_id]
+                        items.append((product_id, qty, price))
+                        total += qty * price
+                    order_items.append(items)
+                    yield {
+                        'user_id': int(user_id),
+                        'order_number': f'LT{len(order_items):010d}',
+                        'total': round(total, 2),
+                        'status': str(self.rng.choice(statuses, p=status_weights)),
+                        'payment_status': 'completed',
+                        'tracking_number': '',
+                        'notes': '',
+                        'created_at': created_at,
+                        'updated_at': created_at,
+                    }
+
+        orders = self._insert(Order, rows())
+        order_ids = self._ids_after(Order, last_order_id)
+
+        def item_rows():
+            for order_id, items in zip(order_ids, order_items):
+                for product_id, qty, price in items:
+                    yield {'order_id': int(order_id), 'product_id': product_id, 'qty': qty, 'price': price}
+
+        items = self._insert(OrderItem, item_rows())
+        return orders, items
+
+    def _generate_reviews(self, user_ids, product_ids, product_cdf, mean):
+        counts = self._activity_counts(len(user_ids), mean, cap=len(product_ids))
+        # Ratings skew positive, as they do on most storefronts
+        rating_weights = np.array([0.05, 0.07, 0.13, 0.30, 0.45])
+
+        def rows():
+            for i, user_id in enumerate(user_ids):
+                if counts[i] == 0:
+                    continue
+                reviewed = set(product_ids[self._sample(product_cdf, int(counts[i]))].tolist())
+                for product_id, created_at in zip(sorted(reviewed), self._timestamps(len(reviewed))):
+                    yield {
+                        'user_id': int(user_id),
+                        'product_id': product_id,
+                        'rating': int(self.rng.choice(5, p=rating_weights)) + 1,
+                        'comment': COMMENTS[int(self.rng.integers(len(COMMENTS)))],
+                        'created_at': created_at,
+                    }
+
+        return self._insert(Review, rows())
+
+    def _generate_conversations(self, user_ids, mean):
+        # Chat is only allowed between mutual followers
+        n = len(user_ids)
+        followers = np.frombuffer(self.followers, dtype=np.int64)
+        followings = np.frombuffer(self.followings, dtype=np.int64)
+        forward = followers * n + followings
+        mutual = np.intersect1d(forward, followings * n + followers)
+        mutual = mutual[mutual // n < mutual % n]
+        pairs = list(zip((mutual // n).tolist(), (mutual % n).tolist()))
+        if not pairs:
+            return 0, 0
+
+        last_conversation_id = self._last_id(Conversation)
+        created = self._timestamps(len(pairs))
+
+        def rows():
+            for (a, b), created_at in zip(pairs, created):
+                yield {
+                    'user1_id': int(user_ids[a]),
+                    'user2_id': int(user_ids[b]),
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                }
+
+        conversations = self._insert(Conversation, rows())
+        conversation_ids = self._ids_after(Conversation, last_conversation_id)
+        counts = self._activity_counts(len(pairs), mean, cap=1000)
+
+        def message_rows():
+            for conversation_id, (a, b), count in zip(conversation_ids, pairs, counts):
+                for created_at in sorted(self._timestamps(int(count))):
+                    sender = a if self.rng.random() < 0.5 else b
+                    yield {
+                        'conversation_id': int(conversation_id),
+                        'sender_id': int(user_ids[sender]),
+                        'content': MESSAGES[int(self.rng.integers(len(MESSAGES)))],
+                        'message_type': 'text',
+                        'is_read': bool(self.rng.random() < 0.8),
+                        'created_at': created_at,
+                    }
+
+        messages = self._insert(Message, message_rows())
+        return conversations, messages
+
+    def _generate_notifications(self, user_ids):
+        created = self._timestamps(len(self.followers))
+
+        def rows():
+            for follower, following, created_at in zip(self.followers, self.followings, created):
+                yield {
+                    'user_id': int(user_ids[following]),
+                    'actor_id': int(user_ids[follower]),
+                    'notification_type': 'follow',
+                    'message': f'Load User {follower} started following you',
+                    'is_read': bool(self.rng.random() < 0.6),
+                    'created_at': created_at,
+                }
+
+        return self._insert(Notification, rows())
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Seed a demo product so the frontend demo auto-add always has a product'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Create the demo product even if other products already exist',
+        )
+
+    def handle(self, *args, **options):
+        if Product.objects.exists() and not options['force']:
+            self.stdout.write('Products already exist; nothing to seed.')
+            return
+
+        product, created = Product.objects.get_or_create(
+            title='Demo Skincare Product',
+            defaults={
+                'description': 'This is a demo product created automatically for development and testing.',
+                'price': 9.99,
+                'stock': 50,
+                'images': ['https://via.placeholder.com/400x400.png?text=Demo+Product'],
+                'category': 'demo',
+            }
+        )
+
+        if created:
+            self.stdout.write(self.style.SUCCESS(f'Created demo product {product.id}'))
+        else:
+            self.stdout.write(f'Demo product already exists ({product.id})')
@@ -8,16 +8,17 @@ Usage:
 """
 
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
 from django.db.models import Count, Q
 from datetime import datetime, timedelta
 
+from api import caching, popularity
 from api.models import AppUser, Product, UserLikedProduct, OrderItem
 from api.recommender import (
     HybridRecommender,
     ContentBasedRecommender,
     DataExporter,
-    ProductFeatureVector
+    ProductFeatureVector,
+    InteractionMatrix
 )
 
 
@@ -40,7 +41,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--rebuild-vectors',
             action='store_true',
-            help='Rebuild product feature vectors before caching'
+            help='Rebuild and publish product feature vectors and the interaction matrix before caching'
         )
 
     def handle(self, *args, **options):
@@ -53,11 +54,16 @@ class Command(BaseCommand):
             self.stdout.write('Rebuilding product feature vectors...')
             ProductFeatureVector.build_feature_vectors()
             self.stdout.write(self.style.SUCCESS('✓ Feature vectors rebuilt'))
+            self.stdout.write('Rebuilding user-product interaction matrix...')
+            InteractionMatrix.build()
+            self.stdout.write(self.style.SUCCESS('✓ Interaction matrix rebuilt'))
         
-        # Step 2: Cache cold-start recommendations
-        self.stdout.write('Caching cold-start recommendations...')
-        self._cache_cold_start()
-        self.stdout.write(self.style.SUCCESS('✓ Cold-start recommendations cached'))
+        # Step 2: Rebuild the popularity snapshot (cold-start + trending)
+        self.stdout.write('Rebuilding popularity snapshot...')
+        snapshot = popularity.build()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Popularity snapshot rebuilt ({len(snapshot["items"])} cold-start products)'
+        ))
         
         # Step 3: Get users to process
         users_to_process = self._get_active_users(options['users'])
@@ -107,13 +113,6 @@ class Command(BaseCommand):
         self.stdout.write(f'  Users processed: {cached_count}')
         self.stdout.write(f'  Products processed: {cached_products}')
     
-    def _cache_cold_start(self):
-        """Cache cold-start recommendations for new users."""
-        for limit in [10, 20, 30]:
-            cache_key = f'cold_start_recommendations_limit_{limit}'
-            recommendations = HybridRecommender.get_cold_start_recommendations(top_n=limit)
-            cache.set(cache_key, recommendations, 86400)  # 24 hours
-    
     def _get_active_users(self, max_users=None):
         """
         Get list of active user IDs, prioritizing those with recent activity.
@@ -173,18 +172,21 @@ class Command(BaseCommand):
     
     def _cache_user_recommendations(self, user_id):
         """Cache personalized recommendations for a user."""
+        allergies = AppUser.objects.filter(id=user_id).values_list('allergies', flat=True).first() or []
         for limit in [10, 20, 30]:
-            cache_key = f'recommendations_user_{user_id}_limit_{limit}'
+            cache_key = f'limit_{limit}'
             
             # Check if user has history
             user_history = DataExporter.get_user_history(user_id)
             
             if not user_history['all']:
-                # Use cold-start
-                recommendations = HybridRecommender.get_cold_start_recommendations(top_n=limit)
-            else:
-                # Personalized
-                recommendations = HybridRecommender.get_personalized_recommendations(user_id, top_n=limit)
+                # Users without history are served from the popularity snapshot
+                continue
+            
+            # Personalized
+            recommendations = HybridRecommender.get_personalized_recommendations(
+                user_id, top_n=limit, allergies=allergies
+            )
             
             result = {
                 "success": True,
@@ -194,12 +196,12 @@ class Command(BaseCommand):
             }
             
             # Cache for 1 hour
-            cache.set(cache_key, result, 3600)
+            caching.recommendations.set(cache_key, result, 3600, scope=user_id)
     
     def _cache_similar_products(self, product_id):
         """Cache similar products for a given product."""
         for limit in [5, 10, 15]:
-            cache_key = f'similar_products_{product_id}_limit_{limit}'
+            cache_key = f'limit_{limit}'
             
             # Get similar products
             similar_items = ContentBasedRecommender.get_similar_products(product_id, top_n=limit)
@@ -226,7 +228,7 @@ class Command(BaseCommand):
             }
             
             # Cache for 24 hours
-            cache.set(cache_key, result, 86400)
+            caching.similar_products.set(cache_key, result, 86400, scope=product_id)
 
 
 # Import models for annotations
@@ -0,0 +1,169 @@
+"""
+Per-request performance instrumentation.
+
+RequestMetricsMiddleware measures every /api/ request: the number of SQL
+statements and the time spent in them (a database execute wrapper), shared
+cache hits and misses (reported by api.caching), and the total time. The
+figures go back to the client in a Server-Timing header:
+
+    Server-Timing: db;dur=12.4;desc="7 queries", cache;desc="hits=3 misses=1", total;dur=31.0
+
+Each endpoint (method plus URL pattern) also keeps its last WINDOW requests,
+so the admin metrics endpoint can report rolling p50/p95/p99 in Prometheus
+text format. Figures are per process. Streamed responses are measured up to
+the point the view returns, not while their body is sent.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+
+WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent on SQL and the shared cache."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - start
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'cache;desc="hits={self.cache_hits} misses={self.cache_misses}"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+@contextmanager
+def collect():
+    """Count the SQL and cache work done inside the block (on this thread) into a RequestMetrics."""
+    current = RequestMetrics()
+    token = _current.set(current)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(current._execute))
+            yield current
+    finally:
+        _current.reset(token)
+
+
+def record_cache(hits, misses):
+    current = _current.get()
+    if current is not None:
+        current.cache_hits += hits
+        current.cache_misses += misses
+
+
+class _Endpoint:
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.recent = deque(maxlen=WINDOW)  # (seconds, queries)
+
+
+_endpoints = {}
+_lock = threading.Lock()
+
+
+def observe(method, endpoint, seconds, current):
+    with _lock:
+        stats = _endpoints.get((method, endpoint))
+        if stats is None:
+            stats = _endpoints[(method, endpoint)] = _Endpoint()
+        stats.count += 1
+        stats.seconds += seconds
+        stats.queries += current.queries
+        stats.sql_seconds += current.sql_time
+        stats.recent.append((seconds, current.queries))
+
+
+def reset():
+    with _lock:
+        _endpoints.clear()
+
+
+def _quantile(ordered, q):
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _summary(lines, name, help_text, rows):
+    """rows: (labels, recent values, sum, count)"""
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} summary')
+    for labels, recent, total, count in rows:
+        ordered = sorted(recent)
+        for q in QUANTILES:
+            lines.append(f'{name}{_labels(**labels, quantile=q)} {_quantile(ordered, q):g}')
+        lines.append(f'{name}_sum{_labels(**labels)} {total:g}')
+        lines.append(f'{name}_count{_labels(**labels)} {count}')
+
+
+def render(cache_stats=None, product_cards=None):
+    """This process's metrics in Prometheus text exposition format."""
+    with _lock:
+        endpoints = [
+            ({'method': method, 'endpoint': endpoint}, stats.count, stats.seconds, stats.queries,
+             stats.sql_seconds, list(stats.recent))
+            for (method, endpoint), stats in sorted(_endpoints.items())
+        ]
+
+    lines = []
+    _summary(lines, 'api_request_duration_seconds', f'Request duration, quantiles over the last {WINDOW} requests.', [
+        (labels, [seconds for seconds, _ in recent], seconds, count)
+        for labels, count, seconds, _, _, recent in endpoints
+    ])
+    _summary(lines, 'api_request_sql_queries', f'SQL statements per request, quantiles over the last {WINDOW} requests.', [
+        (labels, [queries for _, queries in recent], queries, count)
+        for labels, count, _, queries, _, recent in endpoints
+    ])
+    lines.append('# HELP api_request_sql_seconds_total Time spent in SQL.')
+    lines.append('# TYPE api_request_sql_seconds_total counter')
+    for labels, _, _, _, sql_seconds, _ in endpoints:
+        lines.append(f'api_request_sql_seconds_total{_labels(**labels)} {sql_seconds:g}')
+
+    if cache_stats is not None:
+        for result in ('hits', 'misses'):
+            lines.append(f'# HELP api_cache_{result}_total Shared cache {result} per namespace.')
+            lines.append(f'# TYPE api_cache_{result}_total counter')
+            for namespace, counts in cache_stats.items():
+                lines.append(f'api_cache_{result}_total{_labels(namespace=namespace)} {counts[result]}')
+
+    if product_cards is not None:
+        lines.append('# HELP api_product_cards Local product card LRU.')
+        lines.append('# TYPE api_product_cards gauge')
+        for field in ('entries', 'bytes', 'hits', 'misses', 'evictions'):
+            lines.append(f'api_product_cards{_labels(field=field)} {product_cards[field]}')
+
+    return '\n'.join(lines) + '\n'
@@ -1,8 +1,87 @@
+import time
+
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
 
+from . import compression, metrics, profiling
+from .permissions import IsAdminUser
+
 class DisableCSRFForAPI(MiddlewareMixin):
     """Disable CSRF validation for API endpoints."""
     
     def process_request(self, request):
         if request.path.startswith('/api/'):
             setattr(request, '_dont_enforce_csrf_checks', True)
+
+
+class RequestMetricsMiddleware:
+    """Time API requests, count their SQL and cache work and send it as Server-Timing (see api.metrics)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with metrics.collect() as current:
+            response = self.get_response(request)
+        seconds = time.perf_counter() - start
+
+        match = request.resolver_match
+        endpoint = '/' + match.route if match else 'unmatched'
+        metrics.observe(request.method, endpoint, seconds, current)
+        response.headers['Server-Timing'] = current.server_timing(seconds)
+        return response
+
+
+class ProfilerMiddleware:
+    """Profile API requests from admins that ask for it (see api.profiling); others pass straight through."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = profiling.requested(request)
+        if mode is None or not request.path.startswith('/api/') or not IsAdminUser().has_permission(request):
+            return self.get_response(request)
+        return profiling.run(request, mode, self.get_response)
+
+
+class APICompressionMiddleware(MiddlewareMixin):
+    """Compress API responses with the best encoding the client accepts (see api.compression)."""
+
+    def process_response(self, request, response):
+        if not request.path.startswith('/api/') or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(response.streaming_content, encoding)
+            if response.has_header('Content-Length'):
+                del response.headers['Content-Length']
+        else:
+            precompressed = getattr(response, 'precompressed', None)
+            if precompressed is not None:
+                content = precompressed.get(encoding)
+                if content is None:
+                    return response
+            elif len(response.content) < compression.MIN_SIZE:
+                return response
+            else:
+                content = compression.compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        # The compressed body differs byte for byte, so a strong validator no longer holds
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-19 01:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_product_expiry_date_product_manufacturing_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_links', to='api.ingredient')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_links', to='api.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='productingredient',
+            index=models.Index(fields=['ingredient', 'product'], name='api_product_ingredi_460849_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productingredient',
+            unique_together={('product', 'ingredient')},
+        ),
+    ]
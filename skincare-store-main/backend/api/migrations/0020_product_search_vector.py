@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+# api_product.search_vector is deliberately not a model field: it is only read by the
+# search query in api.search, so ordinary product queries never load it.
+# Weights: A = title, B = category and ingredients, C = benefits, D = description.
+# The trigger keeps the column current for every INSERT/UPDATE, including
+# bulk_create, queryset.update() and COPY.
+CREATE_SEARCH_VECTOR = """
+ALTER TABLE api_product ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION api_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.category, '')), 'B') ||
+        setweight(jsonb_to_tsvector('english', coalesce(NEW.ingredients, '[]'::jsonb), '["string"]'), 'B') ||
+        setweight(jsonb_to_tsvector('english', coalesce(NEW.benefits, '[]'::jsonb), '["string"]'), 'C') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS api_product_search_vector_trigger ON api_product;
+CREATE TRIGGER api_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, category, ingredients, benefits
+    ON api_product
+    FOR EACH ROW EXECUTE FUNCTION api_product_search_vector_update();
+
+UPDATE api_product SET title = title;
+
+CREATE INDEX IF NOT EXISTS api_product_search_vector_gin ON api_product USING GIN (search_vector);
+"""
+
+DROP_SEARCH_VECTOR = """
+DROP INDEX IF EXISTS api_product_search_vector_gin;
+DROP TRIGGER IF EXISTS api_product_search_vector_trigger ON api_product;
+DROP FUNCTION IF EXISTS api_product_search_vector_update();
+ALTER TABLE api_product DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def create_search_vector(apps, schema_editor):
+    # Other backends (SQLite in tests) use the in-process index in api.search
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_VECTOR)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_VECTOR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_product_ingredient_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+# Trigram GIN indexes serve both the word-similarity operator (<%) and the
+# substring ILIKE used by api.fuzzy. Creating the extension needs a role allowed
+# to CREATE on the database (pg_trgm is a trusted extension from PostgreSQL 13).
+CREATE_TRIGRAM_INDEXES = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS api_appuser_name_trgm ON api_appuser USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS api_appuser_email_trgm ON api_appuser USING GIN (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS api_product_title_trgm ON api_product USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS api_product_category_trgm ON api_product USING GIN (category gin_trgm_ops);
+"""
+
+DROP_TRIGRAM_INDEXES = """
+DROP INDEX IF EXISTS api_appuser_name_trgm;
+DROP INDEX IF EXISTS api_appuser_email_trgm;
+DROP INDEX IF EXISTS api_product_title_trgm;
+DROP INDEX IF EXISTS api_product_category_trgm;
+"""
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Other backends (SQLite in tests) use the in-process trigram index in api.fuzzy
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TRIGRAM_INDEXES)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGRAM_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.hashers import make_password, check_password
 from datetime import datetime, timedelta
 
@@ -17,6 +18,10 @@ class Product(models.Model):
     faqs = models.JSONField(default=list, blank=True)  # List of FAQs with question and answer
     expiry_date = models.DateField(null=True, blank=True)  # Product expiry date
     manufacturing_date = models.DateField(null=True, blank=True)  # Manufacturing date
+    updated_at = models.DateTimeField(auto_now=True)  # Change-feed cursor (see api.changes)
+
+    class Meta:
+        indexes = [models.Index(fields=['updated_at', 'id'])]
 
     def to_dict(self):
         return {
@@ -39,6 +44,51 @@ class Product(models.Model):
         }
 
 
+
+class ProductTombstone(models.Model):
+    """Id of a deleted product, kept so the change feed can report the deletion."""
+    product_id = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['deleted_at', 'product_id'])]
+
+    def __str__(self):
+        return f"{self.product_id} deleted at {self.deleted_at}"
+
+
+class Ingredient(models.Model):
+    """Distinct normalized (lowercased, stripped) ingredient name."""
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def matching(cls, terms):
+        """Ingredients whose name contains any of `terms` (case-insensitive)."""
+        query = models.Q()
+        for term in terms:
+            term = str(term).lower().strip()
+            if term:
+                query |= models.Q(name__contains=term)
+        return cls.objects.filter(query) if query else cls.objects.none()
+
+
+class ProductIngredient(models.Model):
+    """Indexed copy of Product.ingredients, kept in sync by api.ingredients."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='ingredient_links')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='product_links')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'ingredient')
+        indexes = [models.Index(fields=['ingredient', 'product'])]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.ingredient_id}"
+
+
 class AppUser(models.Model):
     name = models.CharField(max_length=200)
     email = models.EmailField(unique=True)
@@ -91,22 +141,47 @@ class AppUser(models.Model):
     
     def to_profile_dict(self, requesting_user=None):
         """Return detailed profile with social stats."""
-        profile = {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'bio': self.bio,
-            'followers_count': self.get_followers_count(),
-            'following_count': self.get_following_count(),
-            'is_following': False,
-            'mutual_followers_count': 0,
-        }
-        
-        if requesting_user and requesting_user.id != self.id:
-            profile['is_following'] = requesting_user.is_following(self.id)
-            profile['mutual_followers_count'] = requesting_user.get_mutual_followers_count(self.id)
-        
-        return profile
+        return AppUser.to_profile_dicts([self], requesting_user)[0]
+
+    @staticmethod
+    def to_profile_dicts(users, requesting_user=None):
+        """to_profile_dict() for a list of users, in at most four queries however long the list is."""
+        users = list(users)
+        ids = [user.id for user in users]
+        if not ids:
+            return []
+
+        def counts(rows, key):
+            return dict(rows.values_list(key).annotate(models.Count('id')).order_by())
+
+        followers = counts(UserFollow.objects.filter(following_id__in=ids), 'following_id')
+        following = counts(UserFollow.objects.filter(follower_id__in=ids), 'follower_id')
+        followed, mutual = set(), {}
+        if requesting_user:
+            followed = set(
+                UserFollow.objects.filter(follower=requesting_user, following_id__in=ids)
+                .values_list('following_id', flat=True)
+            )
+            # Follows of these users by someone who also follows the requesting user
+            mutual = counts(
+                UserFollow.objects.filter(following_id__in=ids, follower__following__following=requesting_user),
+                'following_id',
+            )
+
+        profiles = []
+        for user in users:
+            is_other = requesting_user is not None and requesting_user.id != user.id
+            profiles.append({
+                'id': user.id,
+                'name': user.name,
+                'email': user.email,
+                'bio': user.bio,
+                'followers_count': followers.get(user.id, 0),
+                'following_count': following.get(user.id, 0),
+                'is_following': is_other and user.id in followed,
+                'mutual_followers_count': mutual.get(user.id, 0) if is_other else 0,
+            })
+        return profiles
 
 
 class Cart(models.Model):
@@ -516,22 +591,47 @@ class Conversation(models.Model):
     
     def to_dict(self, current_user_id):
         """Convert conversation to dictionary."""
-        other_user = self.get_other_user(current_user_id)
-        last_message = self.get_last_message()
-        unread_count = self.messages.filter(is_read=False).exclude(sender_id=current_user_id).count()
-        
-        return {
-            'id': self.id,
-            'other_user': {
-                'id': other_user.id,
-                'name': other_user.name,
-                'email': other_user.email,
-            },
-            'last_message': last_message.to_dict() if last_message else None,
-            'unread_count': unread_count,
-            'updated_at': self.updated_at.isoformat(),
-            'created_at': self.created_at.isoformat(),
-        }
+        return Conversation.to_dicts([self], current_user_id)[0]
+
+    @staticmethod
+    def to_dicts(conversations, current_user_id):
+        """to_dict() for a list of conversations (users selected), in three queries however long the list is."""
+        conversations = list(conversations)
+        ids = [conversation.id for conversation in conversations]
+        if not ids:
+            return []
+
+        unread = dict(
+            Message.objects.filter(conversation_id__in=ids, is_read=False)
+            .exclude(sender_id=current_user_id)
+            .values_list('conversation_id').annotate(models.Count('id')).order_by()
+        )
+        latest = Message.objects.filter(conversation=models.OuterRef('pk')).order_by('-created_at').values('id')[:1]
+        last_ids = dict(
+            Conversation.objects.filter(id__in=ids).annotate(last_id=models.Subquery(latest))
+            .values_list('id', 'last_id')
+        )
+        last_messages = Message.objects.select_related('sender', 'shared_product').in_bulk(
+            [message_id for message_id in last_ids.values() if message_id is not None]
+        )
+
+        data = []
+        for conversation in conversations:
+            other_user = conversation.get_other_user(current_user_id)
+            last_message = last_messages.get(last_ids.get(conversation.id))
+            data.append({
+                'id': conversation.id,
+                'other_user': {
+                    'id': other_user.id,
+                    'name': other_user.name,
+                    'email': other_user.email,
+                },
+                'last_message': last_message.to_dict() if last_message else None,
+                'unread_count': unread.get(conversation.id, 0),
+                'updated_at': conversation.updated_at.isoformat(),
+                'created_at': conversation.created_at.isoformat(),
+            })
+        return data
 
 
 class Message(models.Model):
@@ -579,7 +679,7 @@ class Message(models.Model):
         """Convert message to dictionary."""
         message_dict = {
             'id': self.id,
-            'conversation_id': self.conversation.id,
+            'conversation_id': self.conversation_id,
             'sender': {
                 'id': self.sender.id,
                 'name': self.sender.name,
@@ -0,0 +1,171 @@
+"""
+Popularity snapshot for cold-start and trending recommendations.
+
+Cold-start recommendations used to be recomputed for every new user: three trending
+aggregates, an Avg/Count annotate over the whole catalog and a to_dict() (with its
+own rating and review queries) per product. None of that depends on the user, so it
+is computed once here and stored in the cache as:
+
+    trending_ids    ranked product ids by 7-day activity (used by the hybrid recommender)
+    items           ranked cold-start recommendations (14-day trending, then top rated)
+    encoded         the same items pre-serialized to JSON, one string per card
+
+The snapshot is rebuilt by `manage.py update_recommendations` and whenever it is
+missing (expired, invalidated after a product write, or cleared by an admin).
+Workers keep a local reference and only fetch it again when the version changes,
+so a read is a single cache lookup plus a list slice.
+
+This module deliberately avoids importing `api.recommender` so that serving a new
+user never loads the numeric stack (numpy is only needed to apply allergy masks).
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Count
+
+from . import caching
+from .models import OrderItem, Product, Review, UserLikedProduct
+
+
+SNAPSHOT_KEY = 'popularity_snapshot'
+VERSION_KEY = 'popularity_snapshot_version'
+SNAPSHOT_TTL = 3600  # Rebuilt hourly at most; the cron job usually refreshes it sooner
+SNAPSHOT_SIZE = 50  # Largest `limit` accepted by the recommendation endpoints
+
+COMPLETED_ORDER_STATUSES = ['confirmed', 'processing', 'shipped', 'delivered']
+
+_local = None
+_lock = threading.Lock()
+
+
+def trending_scores(days):
+    """Score products by recent likes (x1), completed order lines (x3) and reviews (x avg rating)."""
+    cutoff_date = datetime.now() - timedelta(days=days)
+    scores = defaultdict(float)
+
+    recent_likes = UserLikedProduct.objects.filter(
+        created_at__gte=cutoff_date
+    ).values('product_id').annotate(count=Count('id'))
+    for item in recent_likes:
+        scores[item['product_id']] += item['count'] * 1
+
+    recent_orders = OrderItem.objects.filter(
+        order__created_at__gte=cutoff_date,
+        order__status__in=COMPLETED_ORDER_STATUSES
+    ).values('product_id').annotate(count=Count('id'))
+    for item in recent_orders:
+        scores[item['product_id']] += item['count'] * 3
+
+    recent_reviews = Review.objects.filter(
+        created_at__gte=cutoff_date
+    ).values('product_id').annotate(count=Count('id'), avg_rating=Avg('rating'))
+    for item in recent_reviews:
+        scores[item['product_id']] += item['count'] * (item['avg_rating'] or 0)
+
+    return scores
+
+
+def _ranked(scores, limit):
+    return [product_id for product_id, _ in sorted(scores.items(), key=lambda x: x[1], reverse=True)[:limit]]
+
+
+def build():
+    """Compute a fresh snapshot, store it in the cache and return it."""
+    global _local
+    trending_ids = _ranked(trending_scores(days=7), SNAPSHOT_SIZE)
+    cold_start_ids = _ranked(trending_scores(days=14), SNAPSHOT_SIZE)
+
+    # Reviews (and their authors) are prefetched so to_dict() issues no per-product queries
+    products = Product.objects.prefetch_related('reviews__user').in_bulk(cold_start_ids)
+    ranked = [(products[pid], 1.0, ['trending', 'cold_start']) for pid in cold_start_ids if pid in products]
+
+    # Fill up with the highest rated products (same rule as before: at least 3 reviews)
+    if len(ranked) < SNAPSHOT_SIZE:
+        top_rated = Product.objects.annotate(
+            avg_rating=Avg('reviews__rating'),
+            review_count=Count('reviews')
+        ).filter(
+            review_count__gte=3
+        ).exclude(
+            id__in=[product.id for product, _, _ in ranked]
+        ).order_by('-avg_rating', '-review_count').prefetch_related('reviews__user')[:SNAPSHOT_SIZE - len(ranked)]
+        ranked.extend((product, 0.9, ['top_rated', 'cold_start']) for product in top_rated)
+
+    # Items are only served after allergen filtering, so their allergy flags are always empty
+    items = [
+        {'product': dict(product.to_dict(), allergens_found=[]), 'recommendation_score': score, 'sources': sources}
+        for product, score, sources in ranked
+    ]
+
+    snapshot = {
+        'version': time.time_ns(),
+        'built_at': datetime.now().isoformat(),
+        'trending_ids': trending_ids,
+        'product_ids': [item['product']['id'] for item in items],
+        'items': items,
+        'encoded': [json.dumps(item, cls=DjangoJSONEncoder) for item in items],
+    }
+    cache.set(SNAPSHOT_KEY, snapshot, SNAPSHOT_TTL)
+    caching.versions.set(VERSION_KEY, snapshot['version'], SNAPSHOT_TTL)
+    _local = snapshot
+    return snapshot
+
+
+def get_snapshot():
+    """Return the current snapshot, rebuilding it if it is missing."""
+    global _local
+    version = caching.versions.get(VERSION_KEY)
+    local = _local
+    if local is not None and version == local['version']:
+        return local
+
+    with _lock:
+        if version is not None:
+            snapshot = cache.get(SNAPSHOT_KEY)
+            if snapshot is not None and snapshot['version'] == version:
+                _local = snapshot
+                return snapshot
+        return build()
+
+
+def invalidate():
+    """Drop the snapshot (e.g. after a product is edited or deleted); the next read rebuilds it."""
+    global _local
+    cache.delete(SNAPSHOT_KEY)
+    caching.versions.delete(VERSION_KEY)
+    _local = None
+
+
+def trending_ids(limit=20):
+    """Top product ids by 7-day activity."""
+    return get_snapshot()['trending_ids'][:limit]
+
+
+def _safe_rows(snapshot, top_n, allergies):
+    """Snapshot positions of the first `top_n` items free of the given allergens."""
+    if not allergies:
+        return range(min(top_n, len(snapshot['items'])))
+
+    from . import allergens
+
+    flagged = allergens.get_index().flag(snapshot['product_ids'], allergies)
+    return [row for row, bad in enumerate(flagged.tolist()) if not bad][:top_n]
+
+
+def cold_start_recommendations(top_n=20, allergies=None):
+    """Ranked recommendations for users without any history."""
+    snapshot = get_snapshot()
+    return [dict(snapshot['items'][row]) for row in _safe_rows(snapshot, top_n, allergies)]
+
+
+def cold_start_json(top_n=20, allergies=None):
+    """The cold-start recommendations as a JSON array, joined from the pre-serialized cards."""
+    snapshot = get_snapshot()
+    encoded = [snapshot['encoded'][row] for row in _safe_rows(snapshot, top_n, allergies)]
+    return len(encoded), '[' + ','.join(encoded) + ']'
@@ -0,0 +1,155 @@
+"""
+Two-tier cache of product cards (Product.to_dict()) for point lookups.
+
+Carts, liked products, bookings, admin orders and allergy checks each need a
+handful of specific cards. Serializing them from the database costs a review
+query per product. The shared cache alone still costs a round trip and an
+unpickle per card. So lookups go through:
+
+    1. an in-process LRU, bounded by entry count, estimated bytes and a TTL;
+    2. the `product_cards` namespace of the shared cache (api.caching);
+    3. the database, for whatever is left, in one prefetched query.
+
+Every card has its own version key in the versions cache. Product and review
+writes delete the shared entry and that product's version (api.signals). The
+local LRU keeps each card with the version it was read under, and a lookup
+reads the versions of the requested ids in one get_many: a card whose version
+moved is fetched again, every other card stays local. The TTL bounds
+staleness if an invalidation is ever missed.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+from . import caching
+from .models import Product
+
+
+MAX_ENTRIES = 5000
+MAX_BYTES = 32 * 1024 * 1024
+TTL = 300
+VERSION_KEY = 'product_cards_version:{}'
+
+shared = caching.Namespace('product_cards', timeout=3600)
+
+
+class LRUCache:
+    """Thread-safe LRU bounded by entries and (estimated) bytes, with per-entry TTL."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (value, size, expires)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= self.clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, self.clock() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_local = LRUCache()  # product id -> (card, version)
+
+
+def _versions(product_ids):
+    """{product id: card version}, creating versions for ids seen for the first time."""
+    keys = {product_id: VERSION_KEY.format(product_id) for product_id in product_ids}
+    versions = caching.versions.get_many(list(keys.values()))
+    for key in keys.values():
+        if key not in versions:
+            # Created before the card is read, so a write racing this lookup deletes it again
+            if caching.versions.add(key, time.time_ns(), None):
+                versions[key] = caching.versions.get(key)
+    return {product_id: versions.get(key) for product_id, key in keys.items()}
+
+
+def get_many(product_ids):
+    """{product id: card copy} for the ids that exist; callers may mutate the copies."""
+    product_ids = list(dict.fromkeys(product_ids))
+    versions = _versions(product_ids)
+    cards, missing = {}, []
+    for product_id in product_ids:
+        entry = _local.get(product_id)
+        if entry is None or entry[1] is None or entry[1] != versions[product_id]:
+            missing.append(product_id)
+        else:
+            cards[product_id] = entry[0]
+
+    if missing:
+        found = shared.get_many(missing)
+        loaded = {
+            product.id: product.to_dict()
+            for product in Product.objects.filter(id__in=[pid for pid in missing if pid not in found])
+            .prefetch_related('reviews__user')
+        }
+        if loaded:
+            shared.set_many(loaded)
+        for product_id, card in {**found, **loaded}.items():
+            _local.set(product_id, (card, versions[product_id]), len(json.dumps(card, separators=(',', ':'))))
+            cards[product_id] = card
+        absent = [VERSION_KEY.format(product_id) for product_id in missing if product_id not in cards]
+        if absent:
+            caching.versions.delete_many(absent)
+
+    return {product_id: dict(card) for product_id, card in cards.items()}
+
+
+def get(product_id):
+    return get_many([product_id]).get(product_id)
+
+
+def invalidate(product_id):
+    """Drop one product's card everywhere: the shared entry now, local LRUs on their next lookup of it."""
+    shared.delete(product_id)
+    caching.versions.delete(VERSION_KEY.format(product_id))
+
+
+def stats():
+    return _local.stats()
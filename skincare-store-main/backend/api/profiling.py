@@ -0,0 +1,270 @@
+"""
+On-demand profiling of single API requests, for admins.
+
+An admin asks for a profile with a header or a query parameter:
+
+    curl -H 'Authorization: Bearer <admin token>' -H 'X-Profile: cprofile' .../api/products/
+    curl -H 'Authorization: Bearer <admin token>' '.../api/products/?profile=sample'
+
+ProfilerMiddleware then runs the request under one of two profilers:
+
+    cprofile  every Python call, with call counts and own/cumulative time
+    sample    a background thread records the request thread's stack every
+              SAMPLE_INTERVAL seconds; cheaper on deep call graphs
+
+`1`, `true` and `yes` mean cprofile. In both modes every SQL statement is
+recorded with its duration and the project frames that issued it. Parameters
+are not recorded. The profile is kept in the shared cache for TTL seconds
+under the id sent back in the X-Profile-Id response header. It can be read
+through /api/admin/profiles/<id>/. Add ?format=pstats (cprofile) to download
+a .prof file for pstats/snakeviz, or ?format=folded (sample) to get stacks
+for flamegraph tools.
+
+Requests that do not ask for a profile pay one header lookup. The admin check
+costs a user query, so it only runs for requests that do ask. Non-admin
+requests are served as usual, unprofiled. Streamed bodies are generated
+inside the profile, so a profiled streaming response is buffered.
+"""
+
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from . import caching
+
+
+HEADER = 'HTTP_X_PROFILE'
+PARAM = 'profile'
+RESPONSE_HEADER = 'X-Profile-Id'
+MODES = ('cprofile', 'sample')
+DEFAULT_MODE = 'cprofile'
+SAMPLE_INTERVAL = 0.005
+TTL = 24 * 3600
+KEEP = 50  # profiles listed by recent()
+MAX_STATEMENTS = 500  # SQL statements kept per profile; the count and total time cover all of them
+ORIGIN_FRAMES = 5
+TOP_FUNCTIONS = 40
+
+INDEX_KEY = 'index'
+
+profiles = caching.Namespace('profiles', timeout=TTL)
+
+_cprofile_lock = threading.Lock()  # one cProfile at a time per process; others fall back to sampling
+
+
+def requested(request):
+    """The profiler mode a request asks for, or None. Costs one lookup when it asks for nothing."""
+    value = request.META.get(HEADER)
+    if value is None and f'{PARAM}=' in request.META.get('QUERY_STRING', ''):
+        value = request.GET.get(PARAM)
+    if value is None:
+        return None
+    mode = value.strip().lower()
+    if mode in MODES:
+        return mode
+    return DEFAULT_MODE if mode in ('', '1', 'true', 'yes') else None
+
+
+def _project_path(filename):
+    """filename relative to the project, or None for library and stdlib code."""
+    root = str(settings.BASE_DIR)
+    if not filename.startswith(root) or 'site-packages' in filename:
+        return None
+    return os.path.relpath(filename, root)
+
+
+def _origin():
+    """The innermost project frames of the current stack, innermost first."""
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < ORIGIN_FRAMES:
+        code = frame.f_code
+        path = _project_path(code.co_filename)
+        if path is not None and code.co_filename != __file__:
+            frames.append(f'{path}:{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+    return frames
+
+
+class SQLRecorder:
+    """Database execute wrapper that keeps each statement with its duration and origin."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.seconds += duration
+            if len(self.statements) < MAX_STATEMENTS:
+                self.statements.append({
+                    'sql': sql,
+                    'many': many,
+                    'duration_ms': round(duration * 1000, 3),
+                    'origin': _origin(),
+                })
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'duration_ms': round(self.seconds * 1000, 3),
+            'statements': self.statements,
+        }
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread. enable()/disable() mirror cProfile.Profile."""
+
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = SAMPLE_INTERVAL if interval is None else interval
+        self.stacks = Counter()  # 'outer;...;inner' -> samples
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                path = _project_path(code.co_filename) or os.path.basename(code.co_filename)
+                stack.append(f'{path}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        """Stacks in the folded format read by flamegraph.pl and speedscope."""
+        return ''.join(f'{stack} {samples}\n' for stack, samples in self.stacks.most_common())
+
+    def top(self):
+        inclusive, own = Counter(), Counter()
+        for stack, samples in self.stacks.items():
+            functions = stack.split(';')
+            for function in set(functions):
+                inclusive[function] += samples
+            own[functions[-1]] += samples
+        return [
+            {'function': function, 'samples': samples, 'own_samples': own[function]}
+            for function, samples in inclusive.most_common(TOP_FUNCTIONS)
+        ]
+
+
+def _cprofile_top(stats):
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            'function': f'{_project_path(filename) or filename}:{line}({name})',
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def run(request, mode, get_response):
+    """Serve the request under the profiler for `mode`, store the profile and name it in the response."""
+    locked = mode == 'cprofile' and _cprofile_lock.acquire(blocking=False)
+    if mode == 'cprofile' and not locked:
+        mode = 'sample'
+    profiler = cProfile.Profile() if mode == 'cprofile' else SamplingProfiler()
+    recorder = SQLRecorder()
+
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            profiler.enable()
+            try:
+                response = get_response(request)
+                if response.streaming:
+                    response.streaming_content = list(response.streaming_content)
+            finally:
+                profiler.disable()
+    finally:
+        if locked:
+            _cprofile_lock.release()
+    seconds = time.perf_counter() - start
+
+    profile = {
+        'id': uuid.uuid4().hex,
+        'mode': mode,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'created_at': timezone.now().isoformat(),
+        'duration_ms': round(seconds * 1000, 3),
+        'sql': recorder.to_dict(),
+    }
+    if mode == 'cprofile':
+        profiler.create_stats()
+        profile['top'] = _cprofile_top(profiler.stats)
+        profile['pstats'] = marshal.dumps(profiler.stats)  # the layout pstats.Stats.dump_stats() writes
+    else:
+        profile['top'] = profiler.top()
+        profile['folded'] = profiler.folded()
+    save(profile)
+
+    response.headers[RESPONSE_HEADER] = profile['id']
+    return response
+
+
+def summary(profile):
+    return {
+        'id': profile['id'],
+        'mode': profile['mode'],
+        'method': profile['method'],
+        'path': profile['path'],
+        'status': profile['status'],
+        'created_at': profile['created_at'],
+        'duration_ms': profile['duration_ms'],
+        'sql_count': profile['sql']['count'],
+        'sql_ms': profile['sql']['duration_ms'],
+    }
+
+
+def save(profile):
+    profiles.set(profile['id'], profile)
+    index = [entry for entry in profiles.get(INDEX_KEY, []) if entry['id'] != profile['id']]
+    profiles.set(INDEX_KEY, [summary(profile)] + index[:KEEP - 1])
+
+
+def get(profile_id):
+    return profiles.get(profile_id)
+
+
+def recent():
+    """Summaries of the latest profiles that have not expired, newest first."""
+    cutoff = timezone.now() - timedelta(seconds=TTL)
+    return [entry for entry in profiles.get(INDEX_KEY, []) if datetime.fromisoformat(entry['created_at']) > cutoff]
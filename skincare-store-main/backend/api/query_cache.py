@@ -0,0 +1,104 @@
+"""
+Opt-in caching of queryset results in the shared cache.
+
+    addresses = query_cache.fetch(user.addresses.order_by('-is_default'), timeout=300)
+
+`fetch()` caches the evaluated queryset under a digest of its compiled SQL and
+parameters, so every request running the same query shares one entry. The
+entry key also carries a generation number for each table named in the SQL.
+Writes to WATCHED_MODELS bump the generation of their table (post_save and
+post_delete receivers in api.signals). An entry therefore survives writes to
+unrelated tables and is abandoned as soon as any table it read changes.
+Queries that read a table outside WATCHED_MODELS are rejected, since nothing
+would invalidate them.
+
+Writes that bypass model signals (queryset.update(), bulk_create(), raw SQL)
+do not invalidate; the per-call timeout bounds how stale such results get.
+Prefetched relations are not covered by the key, so prefetch_related()
+querysets are rejected. Results are pickled: prefer values() or only() over
+models with sensitive fields.
+"""
+
+import hashlib
+import re
+import time
+
+from django.apps import apps
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from . import caching
+from .models import Address, AppUser, Order, OrderItem, Product, Review, UserFollow, UserLikedProduct
+
+
+WATCHED_MODELS = (Address, AppUser, Order, OrderItem, Product, Review, UserFollow, UserLikedProduct)
+WATCHED_TABLES = {model._meta.db_table for model in WATCHED_MODELS}
+
+results = caching.Namespace('queries')
+
+
+def _tables_in(sql, using):
+    quote = connections[using].ops.quote_name
+    return sorted({
+        model._meta.db_table
+        for model in apps.get_models(include_auto_created=True)
+        if quote(model._meta.db_table) in sql
+    })
+
+
+def _generation_key(table):
+    return f'query_table:{table}'
+
+
+def _key(queryset, suffix=''):
+    """Cache key for a queryset, or None if it can match nothing."""
+    if queryset._prefetch_related_lookups:
+        raise ValueError('query_cache does not cache prefetch_related() querysets')
+    try:
+        sql, params = queryset.query.clone().get_compiler(using=queryset.db).as_sql()
+    except EmptyResultSet:
+        return None
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    digest = hashlib.sha1(f'{queryset.db}|{sql}|{params!r}|{suffix}'.encode()).hexdigest()
+
+    tables = _tables_in(sql, queryset.db)
+    unwatched = set(tables) - WATCHED_TABLES
+    if unwatched:
+        raise ValueError(f"query_cache cannot invalidate reads of {', '.join(sorted(unwatched))}")
+    keys = [_generation_key(table) for table in tables]
+    generations = caching.versions.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        for key in missing:
+            caching.versions.add(key, time.time_ns(), None)
+        generations.update(caching.versions.get_many(missing))
+    return f"{digest}:{'.'.join(str(generations[key]) for key in keys)}"
+
+
+def fetch(queryset, timeout):
+    """The queryset's results as a list, from the cache when nothing it reads has changed."""
+    key = _key(queryset)
+    if key is None:
+        return []
+    rows = results.get(key)
+    if rows is None:
+        rows = list(queryset.all())  # a clone, so callers' querysets hold no stale results
+        results.set(key, rows, timeout)
+    return rows
+
+
+def count(queryset, timeout):
+    """queryset.count(), cached like fetch()."""
+    key = _key(queryset, suffix='count')
+    if key is None:
+        return 0
+    total = results.get(key)
+    if total is None:
+        total = queryset.all().count()
+        results.set(key, total, timeout)
+    return total
+
+
+def invalidate(model):
+    """Abandon every cached result that read `model`'s table."""
+    caching.versions.delete(_generation_key(model._meta.db_table))
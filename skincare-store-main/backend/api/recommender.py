@@ -7,27 +7,41 @@ Provides personalized product recommendations using:
 """
 
 import numpy as np
-import pandas as pd
+from bisect import bisect_left
 from collections import defaultdict
-from django.db.models import Count, Q, Avg
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
+from django.db.models import Count, Q
 from datetime import datetime, timedelta
 
 from .models import (
     Product, AppUser, UserLikedProduct, Order, OrderItem, 
     Review, UserFollow
 )
+from . import allergens, caching, catalog, popularity
+from .recommender_artifacts import feature_store, interaction_store
+# Cache and stats helpers live in the lightweight facade; re-exported for existing callers
+from .recommender_facade import (  # noqa: F401
+    get_recommendation_stats,
+    invalidate_user_recommendation_cache,
+    invalidate_product_similarity_cache,
+)
+
+
+# pandas and scikit-learn are only needed to export DataFrames and to (re)build
+# vectors; workers that serve from published artifacts never import them.
+def cosine_similarity(*args, **kwargs):
+    from sklearn.metrics.pairwise import cosine_similarity as _cosine_similarity
+    return _cosine_similarity(*args, **kwargs)
 
 
 class DataExporter:
     """Export and prepare data for recommendation algorithms."""
     
     @staticmethod
-    def get_user_product_interactions(user_id=None):
+    def get_user_product_interactions(user_id=None, user_ids=None):
         """
         Create User-Product Interaction Matrix.
-        Returns a dictionary with user_id as key and their interaction data.
+        Returns a dictionary with user_id as key and their interaction data,
+        for one user, the users in `user_ids`, or everyone.
         
         Interaction types:
         - Likes: 1 point
@@ -36,31 +50,33 @@ class DataExporter:
         """
         interactions = defaultdict(lambda: defaultdict(float))
         
-        # Get all users or specific user
-        users = [user_id] if user_id else AppUser.objects.values_list('id', flat=True)
-        
-        for uid in users:
-            # 1. Liked Products (1 point each)
-            liked_products = UserLikedProduct.objects.filter(user_id=uid).values_list('product_id', flat=True)
-            for product_id in liked_products:
-                interactions[uid][product_id] += 1.0
-            
-            # 2. Purchased Products (3 points each)
-            purchased_products = OrderItem.objects.filter(
-                order__user_id=uid,
-                order__status__in=['confirmed', 'processing', 'shipped', 'delivered']
-            ).values_list('product_id', flat=True)
-            for product_id in purchased_products:
-                interactions[uid][product_id] += 3.0
-            
-            # 3. Reviewed Products (weighted by rating)
-            reviews = Review.objects.filter(user_id=uid).values('product_id', 'rating')
-            for review in reviews:
-                # Rating weight: 5 stars = 2 points, 1 star = 0.4 points
-                weight = (review['rating'] / 5.0) * 2.0
-                interactions[uid][review['product_id']] += weight
-        
-        return dict(interactions)
+        # Three queries however many users are asked for
+        likes = UserLikedProduct.objects.all()
+        purchases = OrderItem.objects.filter(order__status__in=['confirmed', 'processing', 'shipped', 'delivered'])
+        reviews = Review.objects.all()
+        if user_id:
+            user_ids = [user_id]
+        if user_ids is not None:
+            likes = likes.filter(user_id__in=user_ids)
+            purchases = purchases.filter(order__user_id__in=user_ids)
+            reviews = reviews.filter(user_id__in=user_ids)
+        
+        # 1. Liked Products (1 point each)
+        for uid, product_id in likes.values_list('user_id', 'product_id'):
+            interactions[uid][product_id] += 1.0
+        
+        # 2. Purchased Products (3 points each)
+        for uid, product_id in purchases.values_list('order__user_id', 'product_id'):
+            interactions[uid][product_id] += 3.0
+        
+        # 3. Reviewed Products (weighted by rating)
+        for uid, product_id, rating in reviews.values_list('user_id', 'product_id', 'rating'):
+            # Rating weight: 5 stars = 2 points, 1 star = 0.4 points
+            weight = (rating / 5.0) * 2.0
+            interactions[uid][product_id] += weight
+        
+        # Users in id order, as when they were read one by one
+        return dict(sorted(interactions.items()))
     
     @staticmethod
     def get_interaction_matrix():
@@ -68,6 +84,8 @@ class DataExporter:
         Create a full User-Product interaction matrix as DataFrame.
         Rows: Users, Columns: Products, Values: Interaction scores
         """
+        import pandas as pd
+        
         interactions = DataExporter.get_user_product_interactions()
         
         if not interactions:
@@ -103,7 +121,7 @@ class DataExporter:
         - Average rating
         - Price tier (budget/mid/premium)
         """
-        products = Product.objects.all()
+        products = Product.objects.prefetch_related('reviews')  # average_rating() reads the prefetched rows
         product_features = {}
         
         for product in products:
@@ -152,6 +170,8 @@ class DataExporter:
         """
         Create a DataFrame with product features for similarity calculations.
         """
+        import pandas as pd
+        
         features = DataExporter.get_product_features()
         
         if not features:
@@ -184,12 +204,11 @@ class DataExporter:
             return {}
         
         friends_interactions = defaultdict(float)
+        interactions = DataExporter.get_user_product_interactions(user_ids=friend_ids)
         
         for friend_id in friend_ids:
-            friend_interactions = DataExporter.get_user_product_interactions(friend_id)
-            
             # Aggregate friend interactions with a social weight (0.5x)
-            for product_id, score in friend_interactions.get(friend_id, {}).items():
+            for product_id, score in interactions.get(friend_id, {}).items():
                 friends_interactions[product_id] += score * 0.5
         
         return dict(friends_interactions)
@@ -199,38 +218,7 @@ class DataExporter:
         """
         Get trending products based on recent activity.
         """
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        # Count recent interactions
-        trending_scores = defaultdict(int)
-        
-        # Recent likes
-        recent_likes = UserLikedProduct.objects.filter(
-            created_at__gte=cutoff_date
-        ).values('product_id').annotate(count=Count('id'))
-        
-        for item in recent_likes:
-            trending_scores[item['product_id']] += item['count'] * 1
-        
-        # Recent orders
-        recent_orders = OrderItem.objects.filter(
-            order__created_at__gte=cutoff_date,
-            order__status__in=['confirmed', 'processing', 'shipped', 'delivered']
-        ).values('product_id').annotate(count=Count('id'))
-        
-        for item in recent_orders:
-            trending_scores[item['product_id']] += item['count'] * 3
-        
-        # Recent reviews
-        recent_reviews = Review.objects.filter(
-            created_at__gte=cutoff_date
-        ).values('product_id').annotate(
-            count=Count('id'),
-            avg_rating=Avg('rating')
-        )
-        
-        for item in recent_reviews:
-            trending_scores[item['product_id']] += item['count'] * (item['avg_rating'] or 0)
+        trending_scores = popularity.trending_scores(days)
         
         # Sort and return top products
         sorted_products = sorted(
@@ -269,26 +257,38 @@ class DataExporter:
 
 
 class ProductFeatureVector:
-    """Generate and cache product feature vectors for content-based filtering."""
+    """Generate and cache product feature vectors for content-based filtering.
+
+    Built vectors are published to the shared artifact store together with a
+    precomputed nearest-neighbour table, so other worker processes map them
+    read-only instead of rebuilding their own copy.
+    """
+    
+    NEIGHBOURS = 20  # Precomputed neighbours per product
     
     _vectorizer = None
     _feature_matrix = None
     _product_ids = None
+    _neighbours = None
+    _neighbour_scores = None
+    _version = None
     
     @classmethod
     def build_feature_vectors(cls):
-        """Build TF-IDF vectors from product text features."""
+        """Build TF-IDF vectors from product text features and publish them."""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        
         product_features = DataExporter.get_product_features()
         
         if not product_features:
             return None, None, None
         
-        # Extract text features
+        # Extract text features (ordered by id so lookups can use binary search)
         texts = []
         product_ids = []
         
-        for product_id, features in product_features.items():
-            texts.append(features['text_features'])
+        for product_id in sorted(product_features):
+            texts.append(product_features[product_id]['text_features'])
             product_ids.append(product_id)
         
         # Create TF-IDF vectors
@@ -299,79 +299,165 @@ class ProductFeatureVector:
         )
         
         feature_matrix = vectorizer.fit_transform(texts)
+        neighbours, neighbour_scores = cls.build_neighbour_table(feature_matrix)
+        
+        version = feature_store.publish({
+            'feature_matrix': feature_matrix,
+            'product_ids': np.asarray(product_ids, dtype=np.int64),
+            'neighbours': neighbours,
+            'neighbour_scores': neighbour_scores,
+        })
         
         # Cache results
         cls._vectorizer = vectorizer
         cls._feature_matrix = feature_matrix
         cls._product_ids = product_ids
+        cls._neighbours = neighbours
+        cls._neighbour_scores = neighbour_scores
+        cls._version = version
         
         return vectorizer, feature_matrix, product_ids
     
+    @classmethod
+    def build_neighbour_table(cls, feature_matrix, chunk_size=1024):
+        """
+        Top-N most similar products for every product, excluding itself.
+        Returns (indexes, scores) arrays of shape (n_products, NEIGHBOURS).
+        """
+        n_products = feature_matrix.shape[0]
+        k = min(cls.NEIGHBOURS, max(n_products - 1, 0))
+        neighbours = np.zeros((n_products, k), dtype=np.int32)
+        scores = np.zeros((n_products, k), dtype=np.float32)
+        
+        if k == 0:
+            return neighbours, scores
+        
+        for start in range(0, n_products, chunk_size):
+            stop = min(start + chunk_size, n_products)
+            similarities = cosine_similarity(feature_matrix[start:stop], feature_matrix)
+            similarities[np.arange(stop - start), np.arange(start, stop)] = -1.0
+            
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            neighbours[start:stop] = np.take_along_axis(top, order, axis=1)
+            scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+        
+        return neighbours, scores
+    
     @classmethod
     def get_feature_vectors(cls):
-        """Get cached feature vectors or build if not available."""
-        if cls._feature_matrix is None:
+        """Get cached feature vectors, mapping the shared artifacts or building if not available."""
+        artifacts = feature_store.load()
+        
+        if artifacts is not None and artifacts.version != cls._version:
+            cls._vectorizer = None  # The vectorizer itself is not shared between processes
+            cls._feature_matrix = artifacts['feature_matrix']
+            cls._product_ids = artifacts['product_ids'].tolist()
+            cls._neighbours = artifacts['neighbours']
+            cls._neighbour_scores = artifacts['neighbour_scores']
+            cls._version = artifacts.version
+        elif cls._feature_matrix is None:
             cls.build_feature_vectors()
         
         return cls._vectorizer, cls._feature_matrix, cls._product_ids
-
-
-# Statistics and debugging functions
-def get_recommendation_stats():
-    """Get statistics about the recommendation system data."""
-    total_users = AppUser.objects.count()
-    total_products = Product.objects.count()
-    total_likes = UserLikedProduct.objects.count()
-    total_purchases = OrderItem.objects.filter(
-        order__status__in=['confirmed', 'processing', 'shipped', 'delivered']
-    ).count()
-    total_reviews = Review.objects.count()
-    total_follows = UserFollow.objects.count()
     
-    return {
-        'total_users': total_users,
-        'total_products': total_products,
-        'total_likes': total_likes,
-        'total_purchases': total_purchases,
-        'total_reviews': total_reviews,
-        'total_follows': total_follows,
-        'avg_interactions_per_user': (total_likes + total_purchases + total_reviews) / max(total_users, 1),
-    }
+    @classmethod
+    def get_neighbours(cls, product_id):
+        """Return (product_ids, scores) of precomputed neighbours, or None if unknown."""
+        _, feature_matrix, product_ids = cls.get_feature_vectors()
+        
+        if feature_matrix is None or cls._neighbours is None:
+            return None
+        
+        idx = bisect_left(product_ids, product_id)
+        if idx >= len(product_ids) or product_ids[idx] != product_id:
+            return None
+        
+        return (
+            [product_ids[i] for i in cls._neighbours[idx]],
+            cls._neighbour_scores[idx],
+        )
 
 
-# Cache management functions
-def invalidate_user_recommendation_cache(user_id):
+class InteractionMatrix:
     """
-    Invalidate cached recommendations for a specific user.
-    Call this when user performs actions that affect recommendations:
-    - Likes/unlikes a product
-    - Makes a purchase
-    - Adds a review
-    - Follows/unfollows someone
+    Sparse user x product interaction matrix shared through the artifact store.
+    
+    Rebuilt periodically (see `update_recommendations --rebuild-vectors`); users
+    who became active since the last rebuild are picked up on the next one.
     """
-    from django.core.cache import cache
     
-    # Invalidate personalized recommendations
-    for limit in [10, 20, 30, 50]:
-        cache_key = f'recommendations_user_{user_id}_limit_{limit}'
-        cache.delete(cache_key)
+    @staticmethod
+    def build():
+        """Build the interaction matrix from three aggregate queries and publish it."""
+        from scipy.sparse import coo_matrix
+        
+        rows, cols, values = [], [], []
+        
+        for user_id, product_id in UserLikedProduct.objects.values_list('user_id', 'product_id'):
+            rows.append(user_id)
+            cols.append(product_id)
+            values.append(1.0)
+        
+        for user_id, product_id in OrderItem.objects.filter(
+            order__status__in=['confirmed', 'processing', 'shipped', 'delivered']
+        ).values_list('order__user_id', 'product_id'):
+            rows.append(user_id)
+            cols.append(product_id)
+            values.append(3.0)
+        
+        for user_id, product_id, rating in Review.objects.values_list('user_id', 'product_id', 'rating'):
+            rows.append(user_id)
+            cols.append(product_id)
+            values.append((rating / 5.0) * 2.0)
+        
+        user_ids = np.unique(np.asarray(rows, dtype=np.int64))
+        product_ids = np.unique(np.asarray(cols, dtype=np.int64))
+        matrix = coo_matrix(
+            (
+                np.asarray(values, dtype=np.float64),
+                (np.searchsorted(user_ids, rows), np.searchsorted(product_ids, cols)),
+            ),
+            shape=(len(user_ids), len(product_ids)),
+        ).tocsr()  # Duplicate (user, product) entries are summed, as in DataExporter
+        
+        interaction_store.publish({
+            'matrix': matrix,
+            'by_product': matrix.T.tocsr(),  # product x user, for column lookups without copying
+            'user_ids': user_ids,
+            'product_ids': product_ids,
+        })
+        return matrix, user_ids, product_ids
     
-    # Invalidate friends trending
-    for limit in [15, 30]:
-        cache_key = f'friends_trending_user_{user_id}_limit_{limit}'
-        cache.delete(cache_key)
-
-
-def invalidate_product_similarity_cache(product_id):
-    """
-    Invalidate cached similar products for a specific product.
-    Call this when product details change significantly.
-    """
-    from django.core.cache import cache
+    @staticmethod
+    def load():
+        """Return (matrix, user_ids, product_ids, by_product) from the shared store, or None."""
+        artifacts = interaction_store.load()
+        if artifacts is None or 'by_product' not in artifacts:
+            return None  # Versions published before by_product existed wait for the next rebuild
+        return artifacts['matrix'], artifacts['user_ids'], artifacts['product_ids'], artifacts['by_product']
     
-    for limit in [5, 10, 15, 20]:
-        cache_key = f'similar_products_{product_id}_limit_{limit}'
-        cache.delete(cache_key)
+    @staticmethod
+    def user_rows(user_ids):
+        """Return {user_id: {product_id: score}} for the given users, or None if not built."""
+        loaded = InteractionMatrix.load()
+        if loaded is None:
+            return None
+        
+        matrix, all_user_ids, product_ids, _ = loaded
+        rows = {}
+        for user_id in user_ids:
+            idx = np.searchsorted(all_user_ids, user_id)
+            if idx < len(all_user_ids) and all_user_ids[idx] == user_id:
+                start, stop = matrix.indptr[idx], matrix.indptr[idx + 1]
+                rows[user_id] = dict(zip(
+                    product_ids[matrix.indices[start:stop]].tolist(),
+                    matrix.data[start:stop].tolist(),
+                ))
+            else:
+                rows[user_id] = {}
+        return rows
 
 
 def warm_user_recommendation_cache(user_id):
@@ -379,18 +465,21 @@ def warm_user_recommendation_cache(user_id):
     Pre-calculate and cache recommendations for a user.
     Useful after user performs significant actions.
     """
-    from django.core.cache import cache
-    
     try:
         user_history = DataExporter.get_user_history(user_id)
+        allergies = AppUser.objects.filter(id=user_id).values_list('allergies', flat=True).first() or []
         
         for limit in [10, 20, 30]:
-            cache_key = f'recommendations_user_{user_id}_limit_{limit}'
+            cache_key = f'limit_{limit}'
             
             if not user_history['all']:
-                recommendations = HybridRecommender.get_cold_start_recommendations(top_n=limit)
-            else:
-                recommendations = HybridRecommender.get_personalized_recommendations(user_id, top_n=limit)
+                # New users are served straight from the popularity snapshot
+                caching.recommendations.delete(cache_key, scope=user_id)
+                continue
+            
+            recommendations = HybridRecommender.get_personalized_recommendations(
+                user_id, top_n=limit, allergies=allergies
+            )
             
             result = {
                 "success": True,
@@ -399,7 +488,7 @@ def warm_user_recommendation_cache(user_id):
                 "user_has_history": bool(user_history['all'])
             }
             
-            cache.set(cache_key, result, 3600)  # 1 hour
+            caching.recommendations.set(cache_key, result, 3600, scope=user_id)  # 1 hour
         
         return True
     except Exception:
@@ -420,6 +509,17 @@ class ContentBasedRecommender:
         if feature_matrix is None or product_id not in product_ids:
             return []
         
+        # Serve from the precomputed neighbour table when it is deep enough
+        if top_n <= ProductFeatureVector.NEIGHBOURS:
+            neighbours = ProductFeatureVector.get_neighbours(product_id)
+            if neighbours is not None:
+                neighbour_ids, scores = neighbours
+                return [
+                    {'product_id': pid, 'similarity_score': float(score)}
+                    for pid, score in zip(neighbour_ids[:top_n], scores[:top_n])
+                    if score > 0.1  # Minimum similarity threshold
+                ]
+        
         # Get index of the target product
         try:
             product_idx = product_ids.index(product_id)
@@ -499,6 +599,13 @@ class CollaborativeFilteringRecommender:
         Find users with similar taste using cosine similarity on interaction vectors.
         Returns list of (user_id, similarity_score) tuples.
         """
+        shared = InteractionMatrix.load()
+        if shared is not None:
+            _, user_ids, product_ids, by_product = shared
+            return CollaborativeFilteringRecommender._find_similar_users_shared(
+                user_id, top_n, user_ids, product_ids, by_product
+            )
+        
         # Get interaction matrix
         all_interactions = DataExporter.get_user_product_interactions()
         
@@ -542,6 +649,62 @@ class CollaborativeFilteringRecommender:
         similarities.sort(key=lambda x: x[1], reverse=True)
         return similarities[:top_n]
     
+    @staticmethod
+    def _find_similar_users_shared(user_id, top_n, user_ids, product_ids, by_product):
+        """
+        Vectorized find_similar_users over the shared interaction matrix.
+        
+        The target user's own row is read live from the database so their newest
+        interactions count; other users come from the last published matrix.
+        Same scoring as the pure-Python path: cosine similarity restricted to
+        the products both users interacted with, at least 2 in common.
+        
+        Only the target's product columns are read (slices of the mapped
+        product x user matrix), so the work and memory per call grow with the
+        users who share a product with the target, not with the whole matrix.
+        """
+        target = DataExporter.get_user_product_interactions(user_id).get(user_id, {})
+        if not target:
+            return []
+        
+        # Target vector over the matrix columns (products unknown to the matrix can't be shared)
+        columns = np.searchsorted(product_ids, list(target.keys()))
+        known = [
+            (col, score) for col, score in zip(columns, target.values())
+            if col < len(product_ids) and product_ids[col] in target and score != 0
+        ]
+        if not known:
+            return []
+        
+        # One entry per (other user, shared product): their score and the target's
+        rows, values, target_values = [], [], []
+        for col, score in known:
+            start, stop = by_product.indptr[col], by_product.indptr[col + 1]
+            rows.append(by_product.indices[start:stop])
+            values.append(by_product.data[start:stop])
+            target_values.append(np.full(stop - start, score, dtype=np.float64))
+        rows = np.concatenate(rows)
+        values = np.concatenate(values)
+        target_values = np.concatenate(target_values)
+        
+        others, row_of = np.unique(rows, return_inverse=True)
+        common = np.bincount(row_of, minlength=len(others))
+        dot = np.bincount(row_of, weights=values * target_values, minlength=len(others))
+        magnitude_other = np.sqrt(np.bincount(row_of, weights=values ** 2, minlength=len(others)))
+        magnitude_target = np.sqrt(np.bincount(row_of, weights=target_values ** 2, minlength=len(others)))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = dot / (magnitude_target * magnitude_other)
+        
+        candidates = np.flatnonzero(
+            (common >= 2) & (magnitude_target > 0) & (magnitude_other > 0) & (similarity > 0.3)
+        )
+        candidates = candidates[user_ids[others[candidates]] != user_id]
+        
+        similarities = [(int(user_ids[others[i]]), float(similarity[i])) for i in candidates]
+        similarities.sort(key=lambda x: x[1], reverse=True)
+        return similarities[:top_n]
+    
     @staticmethod
     def get_user_based_recommendations(user_id, top_n=20):
         """
@@ -558,8 +721,10 @@ class CollaborativeFilteringRecommender:
         user_history = DataExporter.get_user_history(user_id)
         already_interacted = user_history['all']
         
-        # Get all interactions
-        all_interactions = DataExporter.get_user_product_interactions()
+        # Get interactions of the similar users (shared matrix when published)
+        all_interactions = InteractionMatrix.user_rows([uid for uid, _ in similar_users])
+        if all_interactions is None:
+            all_interactions = DataExporter.get_user_product_interactions()
         
         # Aggregate product scores from similar users
         product_scores = defaultdict(float)
@@ -657,11 +822,10 @@ class SocialRecommender:
         
         # Get friends' interactions
         product_scores = defaultdict(float)
+        interactions = DataExporter.get_user_product_interactions(user_ids=friend_ids)
         
         for friend_id in friend_ids:
-            friend_interactions = DataExporter.get_user_product_interactions(friend_id)
-            
-            for product_id, score in friend_interactions.get(friend_id, {}).items():
+            for product_id, score in interactions.get(friend_id, {}).items():
                 if product_id not in already_interacted:
                     # Social weight: 0.7x (slightly lower than own preference)
                     product_scores[product_id] += score * 0.7
@@ -747,20 +911,23 @@ class HybridRecommender:
     """Combine multiple recommendation strategies for best results."""
     
     @staticmethod
-    def get_personalized_recommendations(user_id, top_n=20):
+    def get_personalized_recommendations(user_id, top_n=20, allergies=None):
         """
         Hybrid recommendation combining:
         - Content-Based Filtering (30%)
         - Collaborative Filtering (30%)
         - Social Recommendations (25%)
         - Trending Products (15%)
+        
+        Products containing any of the user's allergens are left out. Pass the
+        user's `allergies` when already loaded to avoid looking them up.
         """
         # Get recommendations from each strategy
         content_based = ContentBasedRecommender.get_recommendations_for_user(user_id, top_n=15)
         collaborative = CollaborativeFilteringRecommender.get_user_based_recommendations(user_id, top_n=15)
         item_based = CollaborativeFilteringRecommender.get_item_based_recommendations(user_id, top_n=10)
         social = SocialRecommender.get_friends_recommendations(user_id, top_n=15)
-        trending = DataExporter.get_trending_products(days=7, limit=10)
+        trending = popularity.trending_ids(limit=10)  # Shared snapshot, not per-user aggregates
         
         # Aggregate scores with weights
         final_scores = defaultdict(float)
@@ -798,64 +965,40 @@ class HybridRecommender:
             final_scores.items(),
             key=lambda x: x[1],
             reverse=True
-        )[:top_n]
+        )
+        
+        # Drop candidates containing the user's allergens (one bitmask pass over the candidate set)
+        if allergies is None:
+            allergies = AppUser.objects.filter(id=user_id).values_list('allergies', flat=True).first() or []
+        safe_ids = set(allergens.filter_product_ids([pid for pid, _ in sorted_recommendations], allergies))
+        sorted_recommendations = [item for item in sorted_recommendations if item[0] in safe_ids][:top_n]
         
-        # Get product details and return
+        # Get product details from the catalog snapshot and return
+        products = catalog.get_snapshot().products_for([pid for pid, _ in sorted_recommendations], as_map=True)
         recommendations = []
         for product_id, score in sorted_recommendations:
-            try:
-                product = Product.objects.get(id=product_id)
-                recommendations.append({
-                    'product': product.to_dict(),
-                    'recommendation_score': round(score, 3),
-                    'sources': product_sources[product_id]
-                })
-            except Product.DoesNotExist:
+            product = products.get(product_id)
+            if product is None:
+                continue
+            # Products added after the ingredient index was built are checked directly
+            if allergies and allergens.contains_allergen(product['ingredients'], allergies):
                 continue
+            recommendations.append({
+                'product': product,
+                'recommendation_score': round(score, 3),
+                'sources': product_sources[product_id]
+            })
         
         return recommendations
     
     @staticmethod
-    def get_cold_start_recommendations(top_n=20):
+    def get_cold_start_recommendations(top_n=20, allergies=None):
         """
         For new users with no history, recommend:
         - Trending products
         - Highly rated products
-        - Popular products
-        """
-        recommendations = []
-        
-        # Get trending products
-        trending_ids = DataExporter.get_trending_products(days=14, limit=top_n)
-        
-        # Get products with details
-        for product_id in trending_ids:
-            try:
-                product = Product.objects.get(id=product_id)
-                recommendations.append({
-                    'product': product.to_dict(),
-                    'recommendation_score': 1.0,
-                    'sources': ['trending', 'cold_start']
-                })
-            except Product.DoesNotExist:
-                continue
-        
-        # If not enough trending, add highest rated
-        if len(recommendations) < top_n:
-            top_rated = Product.objects.annotate(
-                avg_rating=Avg('reviews__rating'),
-                review_count=Count('reviews')
-            ).filter(
-                review_count__gte=3
-            ).exclude(
-                id__in=[r['product']['id'] for r in recommendations]
-            ).order_by('-avg_rating', '-review_count')[:top_n - len(recommendations)]
-            
-            for product in top_rated:
-                recommendations.append({
-                    'product': product.to_dict(),
-                    'recommendation_score': 0.9,
-                    'sources': ['top_rated', 'cold_start']
-                })
         
-        return recommendations[:top_n]
+        Served from the precomputed popularity snapshot (see api.popularity),
+        without products containing any of `allergies`.
+        """
+        return popularity.cold_start_recommendations(top_n=top_n, allergies=allergies)
@@ -0,0 +1,194 @@
+"""
+Shared, memory-mapped storage for recommender artifacts.
+
+Feature matrices, neighbour tables and interaction matrices are written once as flat
+.npy files and opened read-only with np.load(mmap_mode='r'), so every worker process
+maps the same pages from the OS page cache instead of holding a private copy.
+
+Each artifact set lives in its own directory:
+
+    <RECOMMENDER_ARTIFACT_DIR>/<name>/CURRENT          -> "<version>"
+    <RECOMMENDER_ARTIFACT_DIR>/<name>/<version>/*.npy
+    <RECOMMENDER_ARTIFACT_DIR>/<name>/<version>/meta.json
+
+A rebuild writes a complete new version directory and then atomically replaces the
+CURRENT pointer, so readers never observe a half-written set. Sparse matrices are
+stored as their CSR components (data/indices/indptr) because .npz archives cannot be
+memory-mapped.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+from django.conf import settings
+
+
+POINTER_FILE = 'CURRENT'
+META_FILE = 'meta.json'
+KEEP_VERSIONS = 3
+
+
+class Artifacts:
+    """A loaded (memory-mapped) artifact version."""
+
+    def __init__(self, version, arrays, meta):
+        self.version = version
+        self.arrays = arrays
+        self.meta = meta
+
+    def __getitem__(self, name):
+        if name in self.meta.get('sparse', {}):
+            return self.sparse(name)
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays or name in self.meta.get('sparse', {})
+
+    def sparse(self, name):
+        """Rebuild a CSR matrix on top of the mapped component arrays (no copy)."""
+        from scipy.sparse import csr_matrix
+
+        shape = tuple(self.meta['sparse'][name])
+        return csr_matrix(
+            (self.arrays[f'{name}.data'], self.arrays[f'{name}.indices'], self.arrays[f'{name}.indptr']),
+            shape=shape,
+            copy=False,
+        )
+
+
+class ArtifactStore:
+    """Versioned artifact set shared between worker processes."""
+
+    def __init__(self, name, root=None):
+        self.name = name
+        self._root = root
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._pointer_mtime = None
+
+    @property
+    def directory(self):
+        root = self._root or getattr(settings, 'RECOMMENDER_ARTIFACT_DIR', None)
+        if root is None:
+            root = os.path.join(settings.BASE_DIR, 'var', 'recommender')
+        return os.path.join(str(root), self.name)
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.directory, POINTER_FILE)
+
+    def current_version(self):
+        try:
+            with open(self.pointer_path) as fh:
+                return fh.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def publish(self, arrays, meta=None):
+        """
+        Write a new artifact version and atomically make it current.
+
+        `arrays` maps names to numpy arrays or scipy sparse matrices.
+        Returns the new version identifier.
+        """
+        version = f'{int(time.time() * 1000)}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        target = os.path.join(self.directory, version)
+        os.makedirs(target)
+
+        meta = dict(meta or {})
+        meta['sparse'] = {}
+        meta['created_at'] = time.time()
+
+        for name, value in arrays.items():
+            if hasattr(value, 'tocsr'):
+                matrix = value.tocsr()
+                meta['sparse'][name] = list(matrix.shape)
+                self._save(target, f'{name}.data', matrix.data)
+                self._save(target, f'{name}.indices', matrix.indices)
+                self._save(target, f'{name}.indptr', matrix.indptr)
+            else:
+                self._save(target, name, np.asarray(value))
+
+        with open(os.path.join(target, META_FILE), 'w') as fh:
+            json.dump(meta, fh)
+
+        # Swap the pointer atomically; readers either see the old or the new version
+        tmp_pointer = f'{self.pointer_path}.{version}.tmp'
+        with open(tmp_pointer, 'w') as fh:
+            fh.write(version)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_pointer, self.pointer_path)
+        self._pointer_mtime = None
+
+        self._prune(keep=version)
+        return version
+
+    def load(self):
+        """
+        Return the current Artifacts, re-mapping only when the pointer has changed.
+        Returns None if nothing has been published yet.
+        """
+        try:
+            mtime = os.stat(self.pointer_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        loaded = self._loaded
+        if loaded is not None and mtime == self._pointer_mtime:
+            return loaded
+
+        with self._lock:
+            version = self.current_version()
+            if version is None:
+                return None
+            if self._loaded is not None and self._loaded.version == version:
+                self._pointer_mtime = mtime
+                return self._loaded
+
+            directory = os.path.join(self.directory, version)
+            try:
+                with open(os.path.join(directory, META_FILE)) as fh:
+                    meta = json.load(fh)
+                arrays = {
+                    filename[:-4]: np.load(os.path.join(directory, filename), mmap_mode='r')
+                    for filename in os.listdir(directory)
+                    if filename.endswith('.npy')
+                }
+            except FileNotFoundError:
+                # Pruned between reading the pointer and opening the files; keep what we have
+                return self._loaded
+
+            self._loaded = Artifacts(version, arrays, meta)
+            self._pointer_mtime = mtime
+            return self._loaded
+
+    def clear(self):
+        """Remove every published version (mainly for tests and maintenance)."""
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._loaded = None
+            self._pointer_mtime = None
+
+    @staticmethod
+    def _save(directory, name, array):
+        np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+    def _prune(self, keep):
+        """Delete old versions; processes that still map them keep valid pages on POSIX."""
+        versions = sorted(
+            entry for entry in os.listdir(self.directory)
+            if os.path.isdir(os.path.join(self.directory, entry))
+        )
+        stale = [v for v in versions if v != keep][:-(KEEP_VERSIONS - 1) or None]
+        for version in stale:
+            shutil.rmtree(os.path.join(self.directory, version), ignore_errors=True)
+
+
+feature_store = ArtifactStore('features')
+interaction_store = ArtifactStore('interactions')
@@ -0,0 +1,131 @@
+"""
+Lightweight facade over the recommendation system.
+
+`api.recommender` pulls in numpy, scipy and (when building vectors) scikit-learn.
+Importing it from views would load that whole stack into every worker at boot,
+even workers that never serve a recommendation. Views import the names below
+instead: the recommender classes are proxies that import `api.recommender` on
+first attribute access, and the cache helpers that only touch Django's cache
+live here so that liking a product or following a user never loads the stack.
+"""
+
+import importlib
+import threading
+
+from . import caching
+
+
+_module = None
+_lock = threading.Lock()
+
+
+def load():
+    """Import (once) and return the real `api.recommender` module."""
+    global _module
+    if _module is None:
+        with _lock:
+            if _module is None:
+                _module = importlib.import_module('api.recommender')
+    return _module
+
+
+def is_loaded():
+    """True once the recommendation stack has been imported in this process."""
+    return _module is not None
+
+
+class LazyRecommender:
+    """Stand-in for a class or function of `api.recommender`, resolved on first use."""
+
+    __slots__ = ('_name',)
+
+    def __init__(self, name):
+        self._name = name
+
+    def _resolve(self):
+        return getattr(load(), self._name)
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        state = 'loaded' if is_loaded() else 'not loaded'
+        return f'<LazyRecommender {self._name} ({state})>'
+
+
+DataExporter = LazyRecommender('DataExporter')
+ProductFeatureVector = LazyRecommender('ProductFeatureVector')
+InteractionMatrix = LazyRecommender('InteractionMatrix')
+ContentBasedRecommender = LazyRecommender('ContentBasedRecommender')
+CollaborativeFilteringRecommender = LazyRecommender('CollaborativeFilteringRecommender')
+SocialRecommender = LazyRecommender('SocialRecommender')
+HybridRecommender = LazyRecommender('HybridRecommender')
+warm_user_recommendation_cache = LazyRecommender('warm_user_recommendation_cache')
+
+
+# Statistics and debugging functions
+def get_recommendation_stats():
+    """Get statistics about the recommendation system data."""
+    from . import query_cache
+    from .models import AppUser, Product, UserLikedProduct, OrderItem, Review, UserFollow
+
+    # Each count is reused until its table is written to (or for five minutes)
+    total_users = query_cache.count(AppUser.objects.all(), timeout=300)
+    total_products = query_cache.count(Product.objects.all(), timeout=300)
+    total_likes = query_cache.count(UserLikedProduct.objects.all(), timeout=300)
+    total_purchases = query_cache.count(OrderItem.objects.filter(
+        order__status__in=['confirmed', 'processing', 'shipped', 'delivered']
+    ), timeout=300)
+    total_reviews = query_cache.count(Review.objects.all(), timeout=300)
+    total_follows = query_cache.count(UserFollow.objects.all(), timeout=300)
+
+    return {
+        'total_users': total_users,
+        'total_products': total_products,
+        'total_likes': total_likes,
+        'total_purchases': total_purchases,
+        'total_reviews': total_reviews,
+        'total_follows': total_follows,
+        'avg_interactions_per_user': (total_likes + total_purchases + total_reviews) / max(total_users, 1),
+    }
+
+
+def has_interaction_history(user_id):
+    """True if the user has liked, bought (completed order) or reviewed anything."""
+    from .models import UserLikedProduct, OrderItem, Review
+
+    return (
+        UserLikedProduct.objects.filter(user_id=user_id).exists()
+        or OrderItem.objects.filter(
+            order__user_id=user_id,
+            order__status__in=['confirmed', 'processing', 'shipped', 'delivered']
+        ).exists()
+        or Review.objects.filter(user_id=user_id).exists()
+    )
+
+
+# Cache management functions
+def invalidate_user_recommendation_cache(user_id):
+    """
+    Invalidate cached recommendations for a specific user.
+    Call this when user performs actions that affect recommendations:
+    - Likes/unlikes a product
+    - Makes a purchase
+    - Adds a review
+    - Follows/unfollows someone
+
+    Every limit is dropped at once, in every worker (see api.caching).
+    """
+    caching.recommendations.clear(scope=user_id)
+    caching.friends_trending.clear(scope=user_id)
+
+
+def invalidate_product_similarity_cache(product_id):
+    """
+    Invalidate cached similar products for a specific product.
+    Call this when product details change significantly.
+    """
+    caching.similar_products.clear(scope=product_id)
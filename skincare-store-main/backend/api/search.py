@@ -0,0 +1,234 @@
+"""
+Full-text product search.
+
+On PostgreSQL, products carry a weighted `search_vector` column (title A, category
+and ingredients B, benefits C, description D) kept current by a trigger and indexed
+with GIN (migration 0020). A search is one query: websearch_to_tsquery match,
+ts_rank_cd ordering, a window count for the total and ts_headline snippets for the
+returned page only.
+
+Other backends (the SQLite test database) use an in-process inverted index with
+the same field weights, rebuilt lazily after product writes with the version-key
+pattern used by api.allergens.
+
+Both paths return {'total': int, 'hits': [(product_id, rank, highlights), ...]}.
+Highlights are HTML: the product text is escaped and only the <mark> tags are markup.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connection
+from django.utils.html import escape
+
+from . import caching
+from .models import Product
+
+
+VERSION_KEY = 'product_search_index_version'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+SNIPPET_WORDS = 30
+
+# Same weights as PostgreSQL's ts_rank defaults for A/B/C/D
+FIELD_WEIGHTS = {
+    'title': 1.0,
+    'category': 0.4,
+    'ingredients': 0.4,
+    'benefits': 0.2,
+    'description': 0.1,
+}
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+_local = None
+_lock = threading.Lock()
+
+
+def search(query, offset=0, limit=20):
+    """Ranked product ids for `query` with highlight snippets, plus the total match count."""
+    if connection.vendor == 'postgresql':
+        return _search_postgres(query, offset, limit)
+    return get_index().search(query, offset, limit)
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL
+# ---------------------------------------------------------------------------
+
+def _escape_sql(expression):
+    """SQL escaping `expression` for HTML like django.utils.html.escape, so ts_headline only adds markup."""
+    for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("''", '&#x27;')):
+        expression = f"replace({expression}, '{char}', '{entity}')"
+    return expression
+
+
+POSTGRES_SEARCH_SQL = f"""
+WITH query AS (SELECT websearch_to_tsquery('english', %s) AS q),
+matches AS (
+    SELECT p.id, p.title, p.description,
+           ts_rank_cd(p.search_vector, query.q) AS rank,
+           count(*) OVER () AS total
+    FROM api_product p, query
+    WHERE p.search_vector @@ query.q
+    ORDER BY rank DESC, p.id
+    LIMIT %s OFFSET %s
+)
+SELECT m.id, m.rank, m.total,
+       ts_headline('english', {_escape_sql('m.title')}, query.q,
+                   'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, HighlightAll=true'),
+       ts_headline('english', {_escape_sql("coalesce(m.description, '')")}, query.q,
+                   'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords={SNIPPET_WORDS}, MinWords=10')
+FROM matches m, query
+ORDER BY m.rank DESC, m.id
+"""
+
+
+def _search_postgres(query, offset, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_SEARCH_SQL, [query, limit, offset])
+        rows = cursor.fetchall()
+
+    if not rows and offset:
+        # Past the last page: the window count is not available, so count separately
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM api_product WHERE search_vector @@ websearch_to_tsquery('english', %s)",
+                [query],
+            )
+            total = cursor.fetchone()[0]
+    else:
+        total = rows[0][2] if rows else 0
+
+    return {
+        'total': total,
+        'hits': [
+            (product_id, float(rank), {'title': title, 'description': description})
+            for product_id, rank, _, title, description in rows
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# In-process fallback
+# ---------------------------------------------------------------------------
+
+def tokenize(text):
+    return WORD_RE.findall(str(text).lower())
+
+
+def _field_text(value):
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(v) for v in value)
+    return value or ''
+
+
+class InvertedIndex:
+    """Term -> {product_id: weighted score} postings over the searchable fields."""
+
+    def __init__(self, rows, version=None):
+        """`rows` are (id, title, description, category, ingredients, benefits) tuples."""
+        self.version = version
+        self.postings = defaultdict(dict)
+        self.documents = {}
+
+        for product_id, title, description, category, ingredients, benefits in rows:
+            fields = {
+                'title': _field_text(title),
+                'description': _field_text(description),
+                'category': _field_text(category),
+                'ingredients': _field_text(ingredients),
+                'benefits': _field_text(benefits),
+            }
+            self.documents[product_id] = (fields['title'], fields['description'])
+
+            scores = defaultdict(float)
+            for field, text in fields.items():
+                for term in tokenize(text):
+                    scores[term] += FIELD_WEIGHTS[field]
+            for term, score in scores.items():
+                # Dampen repeated terms the way cover-density ranking does
+                self.postings[term][product_id] = 1 + math.log(score) if score > 1 else score
+
+    def search(self, query, offset=0, limit=20):
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return {'total': 0, 'hits': []}
+
+        # All terms must match (websearch_to_tsquery semantics for plain words)
+        postings = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+
+        ranked = sorted(
+            ((sum(posting[pid] for posting in postings), pid) for pid in candidates),
+            key=lambda item: (-item[0], item[1]),
+        )
+        page = ranked[offset:offset + limit]
+        return {
+            'total': len(ranked),
+            'hits': [(pid, round(score, 6), self.highlight(pid, terms)) for score, pid in page],
+        }
+
+    def highlight(self, product_id, terms):
+        title, description = self.documents[product_id]
+        return {'title': _mark(title, terms), 'description': _snippet(description, terms)}
+
+
+def _mark(text, terms):
+    """`text` escaped as HTML, with the words in `terms` wrapped in highlight tags."""
+    terms = set(terms)
+    parts, last = [], 0
+    for match in WORD_RE.finditer(text):
+        word = match.group(0)  # \w+ never holds characters that need escaping
+        parts.append(escape(text[last:match.start()]))
+        parts.append(f'{HIGHLIGHT_START}{word}{HIGHLIGHT_STOP}' if word.lower() in terms else word)
+        last = match.end()
+    parts.append(escape(text[last:]))
+    return ''.join(parts)
+
+
+def _snippet(text, terms):
+    """Window of SNIPPET_WORDS words around the first matching word, with matches marked."""
+    words = text.split()
+    if len(words) <= SNIPPET_WORDS:
+        return _mark(text, terms)
+    terms = set(terms)
+    first = next(
+        (i for i, word in enumerate(words) if any(t in terms for t in tokenize(word))),
+        0,
+    )
+    start = max(0, min(first - SNIPPET_WORDS // 3, len(words) - SNIPPET_WORDS))
+    snippet = ' '.join(words[start:start + SNIPPET_WORDS])
+    return _mark(snippet, terms)
+
+
+def get_index():
+    """Return the in-process search index, rebuilding it after product writes."""
+    global _local
+    version = caching.versions.get(VERSION_KEY)
+    local = _local
+    if local is not None and version is not None and local.version == version:
+        return local
+
+    with _lock:
+        if version is None:
+            version = time.time_ns()
+            caching.versions.set(VERSION_KEY, version, None)
+        if _local is None or _local.version != version:
+            rows = Product.objects.order_by('id').values_list(
+                'id', 'title', 'description', 'category', 'ingredients', 'benefits'
+            )
+            _local = InvertedIndex(rows.iterator(chunk_size=2000), version=version)
+        return _local
+
+
+def invalidate():
+    """Mark the in-process index stale (PostgreSQL keeps its column current by trigger)."""
+    caching.versions.delete(VERSION_KEY)
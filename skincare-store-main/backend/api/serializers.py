@@ -0,0 +1,360 @@
+"""
+Declarative response serializers.
+
+A Serializer maps field names to getters and names a few projections
+(card / detail / admin). Requests pick one with `?view=` or list exact fields
+with `?fields=`; only the chosen fields are computed, and only their relations
+are loaded. Fields that need related rows declare how: `select`/`prefetch`
+lookups for the queryset, or a `batch` loader that resolves the field for a
+whole page in one query (counts, nested items, payments) instead of per object.
+Nested products come from the catalog snapshot (api.catalog).
+
+The default projection of each serializer reproduces the model's to_dict(), so
+existing clients see the same payloads. `render()` encodes with orjson, which
+handles datetimes natively; Decimals are encoded as floats. `stream()` writes a
+JSON array row by row for list endpoints whose size is unbounded.
+"""
+
+from decimal import Decimal
+
+import orjson
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+
+from . import catalog
+from .models import OrderItem, Payment, UserFollow
+
+
+OMIT = object()  # Getter result for "leave this key out"
+STREAM_CHUNK_SIZE = 500  # Rows per database fetch and per streamed write
+
+
+class ProjectionError(ValueError):
+    pass
+
+
+class Field:
+    """One output key: how to read it and which relations it needs."""
+
+    def __init__(self, getter=None, select=(), prefetch=(), batch=None, default=OMIT):
+        self.getter = getter
+        self.select = tuple(select)
+        self.prefetch = tuple(prefetch)
+        self.batch = batch  # batch(serializer, objects) -> {object key: value}
+        self.default = default
+
+
+class Serializer:
+    fields = {}
+    projections = {}
+    default_projection = 'detail'
+    public_projections = ('card', 'detail')
+
+    def __init__(self, projection=None, fields=None, context=None):
+        projection = projection or self.default_projection
+        if fields:
+            unknown = [name for name in fields if name not in self.fields]
+            if unknown:
+                raise ProjectionError(f"Unknown fields: {', '.join(unknown)}")
+            self.names = list(dict.fromkeys(fields))
+        elif projection in self.projections:
+            self.names = list(self.projections[projection])
+        else:
+            raise ProjectionError(f"Unknown view: {projection}")
+        self.context = context or {}
+
+    @classmethod
+    def from_request(cls, request, context=None, admin=False, default=None):
+        """Serializer for `?view=` / `?fields=`; the admin projection only when `admin`."""
+        projection = request.GET.get('view') or None
+        if projection and projection not in cls.public_projections and not admin:
+            raise ProjectionError(f"Unknown view: {projection}")
+        fields = [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+        if not projection and not fields and default is not None:
+            fields = default
+        return cls(projection=projection, fields=fields, context=context)
+
+    def key(self, obj):
+        return obj.pk
+
+    def prepare(self, queryset):
+        """Add the select_related/prefetch_related lookups the chosen fields need."""
+        select = [lookup for name in self.names for lookup in self.fields[name].select]
+        prefetch = [lookup for name in self.names for lookup in self.fields[name].prefetch]
+        if select:
+            queryset = queryset.select_related(*dict.fromkeys(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*dict.fromkeys(prefetch))
+        return queryset
+
+    def many(self, objects):
+        objects = list(objects)
+        if not objects:
+            return []
+        batched = {
+            name: self.fields[name].batch(self, objects)
+            for name in self.names
+            if self.fields[name].batch is not None
+        }
+        rows = []
+        for obj in objects:
+            row = {}
+            for name in self.names:
+                field = self.fields[name]
+                if name in batched:
+                    value = batched[name].get(self.key(obj), field.default)
+                else:
+                    value = field.getter(obj)
+                if value is not OMIT:
+                    row[name] = value
+            rows.append(row)
+        return rows
+
+    def one(self, obj):
+        return self.many([obj])[0]
+
+
+def render(data, status=200):
+    """JSON response encoded with orjson."""
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def stream(rows, key=None, extra=None, encoded=False, status=200):
+    """
+    JSON array response written while `rows` is consumed, so only one chunk of
+    rows is held at a time. Pass a generator over `queryset.iterator(chunk_size=
+    STREAM_CHUNK_SIZE)` to keep memory flat on the database side too.
+
+    With `key` the array becomes `{key: [...], **extra}`. `encoded` rows are
+    already JSON text (the catalog's pre-serialized cards).
+    """
+    return StreamingHttpResponse(
+        _stream_chunks(rows, key, extra, encoded), content_type='application/json', status=status
+    )
+
+
+def _stream_chunks(rows, key, extra, encoded):
+    if key is None:
+        yield b'['
+        tail = b']'
+    else:
+        yield b'{' + dumps(key) + b':['
+        tail = b'],' + dumps(extra)[1:] if extra else b']}'
+    chunk, separator = [], b''
+    for row in rows:
+        chunk.append(row.encode() if encoded else dumps(row))
+        if len(chunk) == STREAM_CHUNK_SIZE:
+            yield separator + b','.join(chunk)
+            chunk, separator = [], b','
+    if chunk:
+        yield separator + b','.join(chunk)
+    yield tail
+
+
+def dumps(data):
+    return orjson.dumps(data, default=_encode_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _encode_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _isoformat(attr):
+    return lambda obj: getattr(obj, attr).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Products (catalog snapshot dicts)
+# ---------------------------------------------------------------------------
+
+def _product_key(name):
+    return Field(lambda product: product.get(name, OMIT))
+
+
+class ProductSerializer(Serializer):
+    """Projects the product dicts served by the catalog snapshot."""
+
+    fields = {
+        name: _product_key(name) for name in (
+            'id', 'title', 'description', 'price', 'stock', 'images', 'category', 'ingredients',
+            'is_trending', 'benefits', 'how_to_use', 'faqs', 'expiry_date', 'manufacturing_date',
+            'average_rating', 'reviews', 'allergens_found',
+        )
+    }
+    projections = {
+        'card': ('id', 'title', 'price', 'images', 'category', 'stock', 'is_trending', 'average_rating',
+                 'allergens_found'),
+        'detail': tuple(fields),
+        'admin': ('id', 'title', 'price', 'stock', 'category', 'is_trending', 'ingredients', 'benefits',
+                  'expiry_date', 'manufacturing_date', 'average_rating'),
+    }
+
+    def key(self, product):
+        return product['id']
+
+    def is_full(self):
+        """True when the output equals the stored dict, so pre-serialized cards can be sent."""
+        return self.names == list(self.projections['detail'])
+
+
+# ---------------------------------------------------------------------------
+# Orders
+# ---------------------------------------------------------------------------
+
+def _order_items(serializer, orders):
+    product_view = serializer.context.get('product_view', 'detail')
+    items = list(OrderItem.objects.filter(order__in=orders).order_by('id'))
+    products = ProductSerializer(product_view).many(
+        catalog.get_snapshot().products_for({item.product_id for item in items})
+    )
+    products = {product['id']: product for product in products}
+    by_order = {order.pk: [] for order in orders}
+    for item in items:
+        by_order[item.order_id].append({
+            'id': item.id,
+            'product': products.get(item.product_id),
+            'qty': item.qty,
+            'price': float(item.price),
+            'subtotal': float(item.price * item.qty),
+        })
+    return by_order
+
+
+def _latest_payments(serializer, orders):
+    latest = {}
+    for payment in Payment.objects.filter(order__in=orders).select_related('order').order_by('-created_at', '-id'):
+        latest.setdefault(payment.order_id, payment.to_dict())
+    return latest
+
+
+def _address(attr):
+    def getter(order):
+        address = getattr(order, attr)
+        return address.to_dict() if address else None
+    return Field(getter, select=[attr])
+
+
+class OrderSerializer(Serializer):
+    fields = {
+        'id': Field(lambda order: order.id),
+        'order_number': Field(lambda order: order.order_number),
+        'user': Field(lambda order: {'id': order.user.id, 'name': order.user.name, 'email': order.user.email},
+                      select=['user']),
+        'total': Field(lambda order: float(order.total)),
+        'status': Field(lambda order: order.status),
+        'payment_status': Field(lambda order: order.payment_status),
+        'items': Field(batch=_order_items, default=[]),
+        'shipping_address': _address('shipping_address'),
+        'billing_address': _address('billing_address'),
+        'tracking_number': Field(lambda order: order.tracking_number),
+        'notes': Field(lambda order: order.notes),
+        'created_at': Field(_isoformat('created_at')),
+        'updated_at': Field(_isoformat('updated_at')),
+        'payment': Field(batch=_latest_payments),
+    }
+    projections = {
+        'card': ('id', 'order_number', 'total', 'status', 'payment_status', 'created_at'),
+        'detail': ('id', 'order_number', 'total', 'status', 'payment_status', 'items', 'shipping_address',
+                   'billing_address', 'tracking_number', 'notes', 'created_at', 'updated_at', 'payment'),
+        'admin': ('id', 'order_number', 'user', 'total', 'status', 'payment_status', 'items',
+                  'shipping_address', 'tracking_number', 'created_at', 'updated_at'),
+    }
+
+    def __init__(self, projection=None, fields=None, context=None):
+        super().__init__(projection, fields, context)
+        # Nested products use a public product projection (`?product_view=card`)
+        if self.context.get('product_view', 'detail') not in ProductSerializer.public_projections:
+            raise ProjectionError(f"Unknown product_view: {self.context['product_view']}")
+
+
+# ---------------------------------------------------------------------------
+# Users
+# ---------------------------------------------------------------------------
+
+def _follow_counts(group_by):
+    def batch(serializer, users):
+        return dict(
+            UserFollow.objects.filter(**{f'{group_by}__in': users})
+            .values_list(group_by).annotate(count=Count('id')).order_by()
+        )
+    return batch
+
+
+def _is_following(serializer, users):
+    viewer = serializer.context.get('requesting_user')
+    if viewer is None:
+        return {}
+    followed = set(UserFollow.objects.filter(follower=viewer, following__in=users).values_list('following_id', flat=True))
+    return {user.pk: user.pk in followed for user in users if user.pk != viewer.pk}
+
+
+def _mutual_followers(serializer, users):
+    viewer = serializer.context.get('requesting_user')
+    if viewer is None:
+        return {}
+    viewer_followers = UserFollow.objects.filter(following=viewer).values('follower')
+    counts = dict(
+        UserFollow.objects.filter(following__in=users, follower__in=viewer_followers)
+        .values_list('following').annotate(count=Count('id')).order_by()
+    )
+    return {user.pk: counts.get(user.pk, 0) for user in users if user.pk != viewer.pk}
+
+
+class UserSerializer(Serializer):
+    fields = {
+        'id': Field(lambda user: user.id),
+        'name': Field(lambda user: user.name),
+        'email': Field(lambda user: user.email),
+        'bio': Field(lambda user: user.bio),
+        'allergies': Field(lambda user: user.allergies),
+        'is_staff': Field(lambda user: user.is_staff),
+        'is_superuser': Field(lambda user: user.is_superuser),
+        'followers_count': Field(batch=_follow_counts('following'), default=0),
+        'following_count': Field(batch=_follow_counts('follower'), default=0),
+        'is_following': Field(batch=_is_following, default=False),
+        'mutual_followers_count': Field(batch=_mutual_followers, default=0),
+    }
+    projections = {
+        'card': ('id', 'name'),
+        'detail': ('id', 'name', 'email', 'bio', 'followers_count', 'following_count', 'is_following',
+                   'mutual_followers_count'),
+        'admin': ('id', 'name', 'email', 'bio', 'allergies', 'is_staff', 'is_superuser'),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Messages
+# ---------------------------------------------------------------------------
+
+def _shared_product(message):
+    product = message.shared_product
+    if message.message_type != 'product' or product is None:
+        return OMIT
+    return {
+        'id': product.id,
+        'title': product.title,
+        'price': float(product.price),
+        'images': product.images,
+        'stock': product.stock,
+    }
+
+
+class MessageSerializer(Serializer):
+    fields = {
+        'id': Field(lambda message: message.id),
+        'conversation_id': Field(lambda message: message.conversation_id),
+        'sender': Field(lambda message: {'id': message.sender.id, 'name': message.sender.name}, select=['sender']),
+        'content': Field(lambda message: message.content),
+        'message_type': Field(lambda message: message.message_type),
+        'is_read': Field(lambda message: message.is_read),
+        'created_at': Field(_isoformat('created_at')),
+        'shared_product': Field(_shared_product, select=['shared_product']),
+    }
+    projections = {
+        'card': ('id', 'sender', 'content', 'message_type', 'created_at'),
+        'detail': tuple(fields),
+        'admin': tuple(fields),
+    }
+
@@ -0,0 +1,75 @@
+"""
+Model signal handlers that keep derived, process-local indexes in step with writes.
+Connected from ApiConfig.ready().
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import (
+    allergens, autocomplete, catalog, changes, compression, fuzzy, ingredients, product_cards, query_cache, search,
+)
+from .models import AppUser, Banner, Product, Review
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    allergens.invalidate()
+    autocomplete.invalidate()
+    catalog.invalidate(instance.pk)
+    fuzzy.invalidate('products')
+    product_cards.invalidate(instance.pk)
+    search.invalidate()
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    if created:
+        changes.clear_deletion(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    changes.record_deletion(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # Product cards carry the average rating and latest reviews, so a review is a
+    # product change for the change feed and for HTTP validators (api.http_cache)
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+    catalog.invalidate(instance.product_id)
+    product_cards.invalidate(instance.product_id)
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def banner_changed(sender, **kwargs):
+    compression.invalidate('banners')
+
+
+@receiver(post_save, sender=AppUser)
+@receiver(post_delete, sender=AppUser)
+def user_changed(sender, **kwargs):
+    fuzzy.invalidate('users')
+
+
+def query_table_changed(sender, **kwargs):
+    query_cache.invalidate(sender)
+
+
+for _model in query_cache.WATCHED_MODELS:
+    post_save.connect(query_table_changed, sender=_model, dispatch_uid=f'query_cache_save_{_model.__name__}')
+    post_delete.connect(query_table_changed, sender=_model, dispatch_uid=f'query_cache_delete_{_model.__name__}')
+
+
+@receiver(post_save, sender=Product)
+def sync_product_ingredients(sender, instance, update_fields=None, **kwargs):
+    # Saves that explicitly leave ingredients alone (e.g. stock updates) need no sync;
+    # links of deleted products go away through the foreign key cascade.
+    if update_fields is not None and 'ingredients' not in update_fields:
+        return
+    ingredients.sync_product(instance)
@@ -64,7 +64,7 @@ class AdminOrderAPITestCase(TestCase):
         """Test admin can view all orders with details"""
         resp = self.client.get('/api/admin/orders/', HTTP_AUTHORIZATION=f'Bearer {self.admin_token}')
         self.assertEqual(resp.status_code, 200)
-        data = json.loads(resp.content)
+        data = json.loads(resp.getvalue())
         self.assertIsInstance(data, list)
         self.assertEqual(len(data), 2)
         
@@ -87,7 +87,7 @@ class AdminOrderAPITestCase(TestCase):
         """Test filtering orders by status"""
         resp = self.client.get('/api/admin/orders/?status=pending', HTTP_AUTHORIZATION=f'Bearer {self.admin_token}')
         self.assertEqual(resp.status_code, 200)
-        data = json.loads(resp.content)
+        data = json.loads(resp.getvalue())
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['status'], 'pending')
 
@@ -95,7 +95,7 @@ class AdminOrderAPITestCase(TestCase):
         """Test filtering orders by customer name/email"""
         resp = self.client.get('/api/admin/orders/?customer=Customer', HTTP_AUTHORIZATION=f'Bearer {self.admin_token}')
         self.assertEqual(resp.status_code, 200)
-        data = json.loads(resp.content)
+        data = json.loads(resp.getvalue())
         self.assertEqual(len(data), 2)
 
     def test_admin_orders_forbidden_for_non_admin(self):
@@ -157,7 +157,7 @@ class AdminOrderAPITestCase(TestCase):
         """Test order response includes shipping address"""
         resp = self.client.get('/api/admin/orders/', HTTP_AUTHORIZATION=f'Bearer {self.admin_token}')
         self.assertEqual(resp.status_code, 200)
-        data = json.loads(resp.content)
+        data = json.loads(resp.getvalue())
         
         order = data[0]
         self.assertIsNotNone(order['shipping_address'])
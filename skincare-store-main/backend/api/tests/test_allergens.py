@@ -0,0 +1,236 @@
+"""
+Tests for allergy-aware recommendation filtering.
+Run: python manage.py test api.tests.test_allergens
+"""
+
+import json
+
+from django.test import TestCase, Client
+from django.core.cache import cache
+
+from api import allergens
+from api.ingredient_index import IngredientIndex
+from api.models import AppUser, Product, UserLikedProduct
+from api.recommender import HybridRecommender
+from api.utils import create_jwt
+
+
+class IngredientIndexTest(TestCase):
+
+    def test_flags_match_substring_rule(self):
+        rows = [
+            (1, 'cleanser', ['Salicylic Acid', 'Water']),
+            (2, 'cream', ['glycerin']),
+            (3, 'cream', []),
+            (5, 'oil', ['Fragrance (Parfum)', 'nuts']),
+        ] + [(10 + i, 'serum', [f'ingredient {i}']) for i in range(100)]  # more than 64 tokens
+        index = IngredientIndex(rows)
+        allergy_lists = [['acid'], ['  NUT oil '], ['fragrance'], ['Ingredient 99'], [], ['peanut']]
+
+        for allergies in allergy_lists:
+            product_ids = [pid for pid, _, _ in rows]
+            expected = [
+                any(allergens.matches(a.lower().strip(), i.lower().strip()) for a in allergies for i in ingredients)
+                for _, _, ingredients in rows
+            ]
+            self.assertEqual(index.flag(product_ids, allergies).tolist(), expected, allergies)
+
+    def test_unknown_products_are_not_flagged(self):
+        index = IngredientIndex([(1, 'oil', ['nuts'])])
+        self.assertEqual(index.flag([7, 1, 0], ['nuts']).tolist(), [False, True, False])
+
+    def test_index_rebuilds_after_product_write(self):
+        cache.clear()
+        product = Product.objects.create(title='Balm', price=10, ingredients=['shea butter'])
+        self.assertEqual(allergens.filter_product_ids([product.id], ['shea']), [])
+
+        product.ingredients = ['beeswax']
+        product.save()
+        self.assertEqual(allergens.filter_product_ids([product.id], ['shea']), [product.id])
+
+
+class AllergenMatcherTest(TestCase):
+
+    def test_matcher_agrees_with_pairwise_rule(self):
+        allergies = ['nut', 'Shea Butter', 'his', 'she', 'hers', 'paraben']
+        tokens = ['ushers', 'butter', 'macadamia nut oil', 'shea', 'methylparaben', 'water', 'e', 'hers']
+        matcher = allergens.get_matcher(allergies)
+
+        for token in tokens:
+            expected = any(allergens.matches(a.lower(), token) for a in allergies)
+            self.assertEqual(matcher.matches(token), expected, token)
+
+    def test_matcher_is_compiled_once_per_allergy_list(self):
+        self.assertIs(allergens.get_matcher(['Nut', 'soy']), allergens.get_matcher([' nut', 'SOY ', 'nut']))
+
+    def test_alternatives_come_from_same_category_without_allergens(self):
+        index = IngredientIndex([
+            (1, 'oil', ['nut oil']),
+            (2, 'oil', ['argan oil']),
+            (3, 'cream', ['aloe']),
+            (4, 'oil', ['hazelnut']),
+            (5, 'oil', ['jojoba']),
+            (6, 'oil', ['rosehip']),
+            (7, 'oil', ['squalane']),
+        ])
+
+        self.assertEqual(index.alternatives('oil', ['nut'], exclude_id=1), [2, 5, 6])
+        self.assertEqual(index.alternatives('oil', ['nut'], exclude_id=2), [5, 6, 7])
+        self.assertEqual(index.alternatives('serum', ['nut'], exclude_id=9), [])
+
+
+class AllergyCheckEndpointTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = AppUser.objects.create(name='Allergic', email='check@test.com', allergies=['Nut', 'fragrance'])
+        self.token = create_jwt({'user_id': self.user.id, 'email': self.user.email})
+        self.unsafe = Product.objects.create(
+            title='Nut Oil', price=15, category='oil', ingredients=['Macadamia Nut Oil', 'Fragrance', 'Water']
+        )
+        self.safe = [
+            Product.objects.create(title=f'Oil {i}', price=10, category='oil', ingredients=['jojoba oil'])
+            for i in range(4)
+        ]
+        Product.objects.create(title='Hazelnut', price=10, category='oil', ingredients=['hazelnut'])
+
+    def test_check_product_reports_allergens_and_alternatives(self):
+        response = self.client.get(
+            f'/api/allergies/check/{self.unsafe.id}/', HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+
+        data = response.json()
+        self.assertTrue(data['has_allergens'])
+        self.assertEqual(data['allergens_found'], ['macadamia nut oil', 'fragrance'])
+        self.assertEqual([p['id'] for p in data['alternatives']], [p.id for p in self.safe[:3]])
+
+    def test_check_cart_batches_products(self):
+        response = self.client.post(
+            '/api/allergies/check-cart/',
+            data={'product_ids': [self.safe[0].id, self.unsafe.id, 999999]},
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+
+        data = response.json()
+        self.assertTrue(data['has_allergens'])
+        self.assertEqual(len(data['products_with_allergens']), 1)
+        flagged = data['products_with_allergens'][0]
+        self.assertEqual(flagged['product']['id'], self.unsafe.id)
+        self.assertEqual([p['id'] for p in flagged['alternatives']], [p.id for p in self.safe[:3]])
+
+    def test_check_cart_accepts_string_ids_and_rejects_invalid_ones(self):
+        def check(product_ids):
+            return self.client.post(
+                '/api/allergies/check-cart/',
+                data={'product_ids': product_ids},
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {self.token}'
+            )
+
+        data = check([str(self.safe[0].id), str(self.unsafe.id)]).json()
+
+        self.assertTrue(data['has_allergens'])
+        self.assertEqual([p['product']['id'] for p in data['products_with_allergens']], [self.unsafe.id])
+        self.assertEqual(check(['abc']).status_code, 400)
+        self.assertEqual(check(str(self.unsafe.id)).status_code, 400)
+
+
+class AllergyAwareRecommendationTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = AppUser.objects.create(name='Allergic', email='allergic@test.com', allergies=['Nut'])
+        others = [AppUser.objects.create(name=f'Other {i}', email=f'other{i}@test.com') for i in range(3)]
+        self.safe = Product.objects.create(title='Aloe Gel', price=12, category='gel', ingredients=['aloe vera'])
+        self.unsafe = Product.objects.create(title='Nut Oil', price=15, category='oil', ingredients=['Macadamia Nut Oil'])
+        # Make both products trending
+        for user in others:
+            UserLikedProduct.objects.create(user=user, product=self.unsafe)
+            UserLikedProduct.objects.create(user=user, product=self.safe)
+
+    def test_cold_start_excludes_allergens(self):
+        ids = [r['product']['id'] for r in HybridRecommender.get_cold_start_recommendations(
+            top_n=10, allergies=self.user.allergies
+        )]
+        self.assertEqual(ids, [self.safe.id])
+
+    def test_personalized_excludes_allergens(self):
+        liked = Product.objects.create(title='Aloe Cream', price=20, category='oil', ingredients=['aloe vera'])
+        UserLikedProduct.objects.create(user=self.user, product=liked)
+
+        recommendations = HybridRecommender.get_personalized_recommendations(self.user.id, top_n=10)
+
+        ids = [r['product']['id'] for r in recommendations]
+        self.assertIn(self.safe.id, ids)
+        self.assertNotIn(self.unsafe.id, ids)
+
+    def test_filter_costs_no_queries_once_indexed(self):
+        candidates = [self.unsafe.id, self.safe.id]
+        allergens.get_index()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(allergens.filter_product_ids(candidates, ['nut']), [self.safe.id])
+
+    def test_endpoint_filters_new_user_recommendations(self):
+        token = create_jwt({'user_id': self.user.id, 'email': self.user.email})
+
+        response = Client().get(
+            '/api/recommendations/personalized/',
+            HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+        ids = [r['product']['id'] for r in response.json()['recommendations']]
+        self.assertEqual(ids, [self.safe.id])
+
+
+class AllergyFlagListingTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = AppUser.objects.create(name='Flagged', email='flags@test.com', allergies=['nut'])
+        self.auth = f"Bearer {create_jwt({'user_id': self.user.id, 'email': self.user.email})}"
+        self.unsafe = Product.objects.create(title='Nut Balm', price=8, ingredients=['Shea', 'Almond Nut Oil'])
+        self.safe = Product.objects.create(title='Aloe Gel', price=9, ingredients=['aloe'])
+
+    def test_catalog_is_flagged_for_signed_in_users_only(self):
+        anonymous = json.loads(self.client.get('/api/products/').getvalue())
+        self.assertNotIn('allergens_found', anonymous[0])
+
+        flags = {p['id']: p['allergens_found'] for p in json.loads(self.client.get(
+            '/api/products/', HTTP_AUTHORIZATION=self.auth
+        ).getvalue())}
+        self.assertEqual(flags, {self.unsafe.id: ['almond nut oil'], self.safe.id: []})
+
+    def test_liked_products_are_flagged(self):
+        UserLikedProduct.objects.create(user=self.user, product=self.unsafe)
+
+        liked = self.client.get('/api/liked-products/', HTTP_AUTHORIZATION=self.auth).json()
+
+        self.assertEqual(liked[0]['product']['allergens_found'], ['almond nut oil'])
+
+    def test_batch_endpoint_flags_products_in_one_pass(self):
+        allergens.get_index()
+        newer = Product.objects.create(title='Nut Scrub', price=7, ingredients=['walnut shell'])
+
+        response = self.client.get(
+            f'/api/allergies/check-batch/?ids={self.safe.id},{self.unsafe.id},{newer.id},999999',
+            HTTP_AUTHORIZATION=self.auth
+        )
+
+        data = response.json()
+        self.assertTrue(data['has_allergens'])
+        self.assertEqual(data['products'], [
+            {'id': self.safe.id, 'allergens_found': []},
+            {'id': self.unsafe.id, 'allergens_found': ['almond nut oil']},
+            {'id': newer.id, 'allergens_found': ['walnut shell']},
+        ])
+
+    def test_annotation_uses_cached_index_without_queries(self):
+        products = [self.unsafe.to_dict(), self.safe.to_dict()]
+        allergens.get_index()
+
+        with self.assertNumQueries(0):
+            allergens.annotate(products, ['NUT'])
+
+        self.assertEqual([p['allergens_found'] for p in products], [['almond nut oil'], []])
@@ -0,0 +1,74 @@
+"""
+Tests for popularity-weighted product autocomplete.
+Run: python manage.py test api.tests.test_autocomplete
+"""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import autocomplete
+from api.models import AppUser, Product, UserLikedProduct
+
+
+class AutocompleteTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        autocomplete._local = None
+        self.serum = Product.objects.create(
+            title='Vitamin C Serum', price=30, category='serum', ingredients=['Vitamin C', 'Ferulic Acid']
+        )
+        self.cream = Product.objects.create(
+            title='Vitamin E Cream', price=25, category='moisturizer', ingredients=['Tocopherol']
+        )
+        self.toner = Product.objects.create(
+            title='Calming Toner', price=15, category='toner', ingredients=['Niacinamide', 'vitamin c']
+        )
+        users = [AppUser.objects.create(name=f'User {i}', email=f'user{i}@test.com') for i in range(3)]
+        for user in users:
+            UserLikedProduct.objects.create(user=user, product=self.cream)
+
+    def texts(self, query, limit=8):
+        return [(s['type'], s['text']) for s in autocomplete.suggest(query, limit)]
+
+    def test_prefix_ranks_by_popularity(self):
+        self.assertEqual(self.texts('vitamin'), [
+            ('product', 'Vitamin E Cream'),
+            ('ingredient', 'Vitamin C'),
+            ('product', 'Vitamin C Serum'),
+        ])
+
+    def test_matches_word_starts_and_short_prefixes(self):
+        self.assertEqual(self.texts('ser'), [('product', 'Vitamin C Serum'), ('category', 'serum')])
+        self.assertIn(('ingredient', 'Niacinamide'), self.texts('N'))
+        self.assertEqual(self.texts('amide'), [])
+        self.assertEqual(self.texts('  '), [])
+
+    def test_limit(self):
+        self.assertEqual(len(self.texts('v', limit=2)), 2)
+
+    def test_index_follows_product_writes(self):
+        self.assertEqual(self.texts('retin'), [])
+
+        Product.objects.create(title='Retinol Night Oil', price=40, category='oil')
+
+        with mock.patch.object(autocomplete, 'REBUILD_INTERVAL', 0):
+            self.assertEqual(self.texts('retin'), [('product', 'Retinol Night Oil')])
+
+    def test_workers_reuse_the_cached_snapshot(self):
+        autocomplete.get_index()
+        autocomplete._local = None
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.texts('calm'), [('product', 'Calming Toner')])
+
+    def test_endpoint(self):
+        response = self.client.get('/api/products/autocomplete/?q=vit&limit=1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['suggestions'], [
+            {'type': 'product', 'text': 'Vitamin E Cream', 'weight': 4, 'product_id': self.cream.id}
+        ])
+        self.assertEqual(self.client.get('/api/products/autocomplete/?q=vit&limit=x').status_code, 400)
@@ -0,0 +1,54 @@
+"""
+Tests for the batch product endpoint.
+Run: python manage.py test api.tests.test_batch_products
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import AppUser, Product
+from api.utils import create_jwt
+
+
+class BatchProductsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.products = [
+            Product.objects.create(title=f'Product {i}', price=10 + i, ingredients=['water', 'fragrance'][:i + 1])
+            for i in range(3)
+        ]
+
+    def get(self, query, **headers):
+        return self.client.get(f'/api/products/batch/?{query}', **headers)
+
+    def test_requested_order_and_missing_ids(self):
+        ids = [self.products[2].id, 999, self.products[0].id, self.products[2].id]
+
+        data = self.get('ids=' + ','.join(map(str, ids))).json()
+
+        self.assertEqual([p['id'] for p in data['products']], [self.products[2].id, self.products[0].id])
+        self.assertEqual(data['missing'], [999])
+        self.assertEqual(data['products'][0], Product.objects.get(pk=self.products[2].pk).to_dict())
+
+    def test_constant_query_count(self):
+        ids = ','.join(str(p.id) for p in self.products)
+        self.get(f'ids={ids}')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(f'ids={ids}').status_code, 200)
+
+    def test_field_projection_with_allergy_flags(self):
+        user = AppUser.objects.create(name='A', email='a@test.com', allergies=['fragrance'])
+        token = create_jwt({'user_id': user.id, 'email': user.email})
+
+        data = self.get(f'ids={self.products[1].id}&fields=id,price,allergens_found',
+                        HTTP_AUTHORIZATION=f'Bearer {token}').json()
+
+        self.assertEqual(data['products'], [{'id': self.products[1].id, 'price': 11.0, 'allergens_found': ['fragrance']}])
+
+    def test_validation(self):
+        self.assertEqual(self.get('ids=').status_code, 400)
+        self.assertEqual(self.get('ids=1,x').status_code, 400)
+        self.assertEqual(self.get('ids=1&fields=id,secret').status_code, 400)
+        self.assertEqual(self.get('ids=' + ','.join(map(str, range(1, 202)))).status_code, 400)
@@ -0,0 +1,91 @@
+"""
+Tests for the namespaced shared cache.
+Run: python manage.py test api.tests.test_caching
+"""
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api import caching, catalog
+from api.caching import Namespace
+from api.models import AppUser, Product
+from api.utils import create_jwt
+
+
+class NamespaceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_stats()
+        self.feed = Namespace('feed')
+        self.other = Namespace('other')
+
+    def test_namespaces_do_not_collide(self):
+        self.feed.set('key', 'feed value')
+        self.other.set('key', 'other value')
+
+        self.assertEqual(self.feed.get('key'), 'feed value')
+        self.assertEqual(self.other.get('key'), 'other value')
+
+    def test_clear_only_drops_its_own_namespace(self):
+        self.feed.set('key', 1)
+        self.other.set('key', 2)
+        cache.set('unrelated', 3)
+
+        self.feed.clear()
+
+        self.assertIsNone(self.feed.get('key'))
+        self.assertEqual(self.other.get('key'), 2)
+        self.assertEqual(cache.get('unrelated'), 3)
+
+    def test_scoped_clear(self):
+        self.feed.set('limit_10', 'a', scope=1)
+        self.feed.set('limit_37', 'b', scope=1)
+        self.feed.set('limit_10', 'c', scope=2)
+
+        self.feed.clear(scope=1)
+
+        self.assertIsNone(self.feed.get('limit_10', scope=1))
+        self.assertIsNone(self.feed.get('limit_37', scope=1))
+        self.assertEqual(self.feed.get('limit_10', scope=2), 'c')
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'entries'},
+        'versions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'versions'},
+    })
+    def test_generations_and_versions_outlive_culled_entries(self):
+        Product.objects.create(title='Serum', price=30)
+        key = self.feed.key('key')
+        catalog.get_snapshot()
+
+        cache.clear()  # what a cull of the ordinary entries can do
+
+        self.assertEqual(self.feed.key('key'), key)
+        with self.assertNumQueries(0):
+            catalog.get_snapshot()
+
+    def test_hits_and_misses_are_counted(self):
+        self.feed.get('key')
+        self.feed.set('key', False)
+        self.feed.get('key')
+        self.feed.get('key')
+
+        self.assertEqual(caching.stats()['feed'], {'hits': 2, 'misses': 1, 'hit_rate': 0.6667})
+
+
+class RecommendationCacheRefreshTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = AppUser.objects.create(name='Admin', email='admin@test.com', is_staff=True)
+        self.auth = f"Bearer {create_jwt({'user_id': self.admin.id, 'email': self.admin.email})}"
+
+    def test_refresh_leaves_other_domains_alone(self):
+        caching.recommendations.set('limit_20', {'cached': True}, scope=self.admin.id)
+        cache.set('unrelated', 'kept')
+
+        response = self.client.post('/api/recommendations/refresh-cache/', HTTP_AUTHORIZATION=self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(caching.recommendations.get('limit_20', scope=self.admin.id))
+        self.assertEqual(cache.get('unrelated'), 'kept')
@@ -0,0 +1,100 @@
+"""
+Tests for the process-local catalog snapshot.
+Run: python manage.py test api.tests.test_catalog
+"""
+
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import caching, catalog
+from api.models import AppUser, Product, Review
+
+
+class CatalogSnapshotTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.serum = Product.objects.create(title='Serum', price=30, stock=4, category='serum', ingredients=['Retinol'])
+        self.toner = Product.objects.create(title='Toner', price=12, category='toner', ingredients=['Water'])
+        self.user = AppUser.objects.create(name='Reviewer', email='reviewer@test.com')
+
+    def test_cards_match_model_serialization(self):
+        Review.objects.create(user=self.user, product=self.serum, rating=4, comment='Nice')
+        snapshot = catalog.get_snapshot()
+
+        serum = Product.objects.get(pk=self.serum.pk)
+        self.assertEqual(json.loads(snapshot.card(self.serum.id)), serum.to_dict())
+        self.assertEqual(snapshot.product(self.serum.id), serum.to_dict())
+        self.assertEqual(snapshot.rating.tolist()[0], 4.0)
+
+    def test_reads_do_not_touch_the_database(self):
+        self.client.get('/api/products/')
+
+        with self.assertNumQueries(0):
+            listing = json.loads(self.client.get('/api/products/').getvalue())
+            detail = self.client.get(f'/api/products/{self.toner.id}/').json()
+            filtered = json.loads(self.client.get('/api/products/?exclude_ingredients=retin').getvalue())
+
+        self.assertEqual([p['id'] for p in listing], [self.serum.id, self.toner.id])
+        self.assertEqual(detail['title'], 'Toner')
+        self.assertEqual([p['id'] for p in filtered], [self.toner.id])
+
+    def test_product_and_review_writes_swap_in_a_new_snapshot(self):
+        before = catalog.get_snapshot()
+
+        self.toner.stock = 9
+        self.toner.save()
+        after_product_write = catalog.get_snapshot()
+        Review.objects.create(user=self.user, product=self.toner, rating=5)
+        after_review_write = catalog.get_snapshot()
+
+        self.assertIsNot(after_product_write, before)
+        self.assertEqual(before.product(self.toner.id)['stock'], 0)
+        self.assertEqual(after_product_write.product(self.toner.id)['stock'], 9)
+        self.assertEqual(after_review_write.product(self.toner.id)['average_rating'], 5.0)
+
+    def test_callers_get_copies(self):
+        catalog.get_snapshot().product(self.serum.id)['allergens_found'] = ['retinol']
+
+        self.assertNotIn('allergens_found', catalog.get_snapshot().product(self.serum.id))
+
+    def test_unknown_product(self):
+        self.assertEqual(self.client.get('/api/products/999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/abc/').status_code, 404)
+
+    def test_writes_patch_only_the_changed_rows(self):
+        mask = Product.objects.create(title='Mask', price=5)
+        before = catalog.get_snapshot()
+
+        self.toner.stock = 9
+        self.toner.save()
+        cleanser = Product.objects.create(title='Cleanser', price=8, category='cleanser', ingredients=['Retinol'])
+        self.serum.delete()
+        with self.assertNumQueries(2):  # the changed products and their reviews, nothing else
+            after = catalog.get_snapshot()
+
+        self.assertEqual(after.product_ids.tolist(), [self.toner.id, mask.id, cleanser.id])
+        self.assertEqual(after.product(self.toner.id)['stock'], 9)
+        self.assertEqual(after.card(cleanser.id), json.dumps(cleanser.to_dict(), separators=(',', ':')))
+        self.assertEqual(after.rows_without_ingredients(['retinol']).tolist(), [True, True, False])
+        self.assertIs(after.products[1], before.products[2])
+        self.assertEqual(after.version, catalog.version())
+
+    def test_missing_change_entries_fall_back_to_a_full_rebuild(self):
+        catalog.get_snapshot()
+        self.toner.stock = 9
+        self.toner.save()
+        cache.delete(catalog.CHANGE_KEY.format(caching.versions.get(catalog.SEQUENCE_KEY)))
+
+        self.assertEqual(catalog.get_snapshot().product(self.toner.id)['stock'], 9)
+
+    def test_version_is_read_without_building_the_snapshot(self):
+        before = catalog.get_snapshot()
+        self.toner.save()
+
+        with self.assertNumQueries(0):
+            version = catalog.version()
+        self.assertNotEqual(version, before.version)
+        self.assertEqual(catalog.get_snapshot().version, version)
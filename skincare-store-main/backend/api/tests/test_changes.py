@@ -0,0 +1,78 @@
+"""
+Tests for the catalog change feed.
+Run: python manage.py test api.tests.test_changes
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from api import changes
+from api.models import Product, ProductTombstone
+
+
+class ProductChangeFeedTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.products = [Product.objects.create(title=f'Product {i}', price=10) for i in range(3)]
+        # Settled history: written a minute ago, oldest first
+        for age, product in zip([60, 50, 40], self.products):
+            Product.objects.filter(pk=product.pk).update(updated_at=timezone.now() - timedelta(seconds=age))
+
+    def sync(self, since='', limit=500):
+        response = self.client.get('/api/products/changes/', {'since': since, 'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_sync_in_pages(self):
+        first = self.sync(limit=2)
+        second = self.sync(first['cursor'], limit=2)
+
+        self.assertEqual([p['id'] for p in first['updated']], [p.id for p in self.products[:2]])
+        self.assertTrue(first['has_more'])
+        self.assertEqual([p['id'] for p in second['updated']], [self.products[2].id])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(self.sync(second['cursor'])['updated'], [])
+
+    def test_only_changes_since_the_cursor_are_returned(self):
+        cursor = self.sync()['cursor']
+        deleted_id = self.products[1].id
+
+        with mock.patch.object(changes, 'SETTLE_SECONDS', 0):
+            self.products[0].stock = 7
+            self.products[0].save()
+            self.products[1].delete()
+            created = Product.objects.create(title='New', price=5)
+            data = self.sync(cursor)
+
+        self.assertEqual([p['id'] for p in data['updated']], [self.products[0].id, created.id])
+        self.assertEqual(data['updated'][0]['stock'], 7)
+        self.assertEqual(data['deleted'], [deleted_id])
+
+    def test_recent_changes_are_repeated_until_settled(self):
+        cursor = self.sync()['cursor']
+        self.products[2].save()
+
+        first = self.sync(cursor)
+        again = self.sync(first['cursor'])
+
+        self.assertEqual([p['id'] for p in first['updated']], [self.products[2].id])
+        self.assertEqual([p['id'] for p in again['updated']], [self.products[2].id])
+
+    def test_recreated_id_clears_its_tombstone(self):
+        product_id = self.products[2].id
+        self.products[2].delete()
+        self.assertTrue(ProductTombstone.objects.filter(product_id=product_id).exists())
+
+        Product.objects.create(id=product_id, title='Reused', price=1)
+
+        self.assertFalse(ProductTombstone.objects.filter(product_id=product_id).exists())
+
+    def test_cursor_round_trip_and_validation(self):
+        moment = timezone.now().replace(microsecond=123456)
+        self.assertEqual(changes.decode(changes.encode((moment, 42))), (moment, 42))
+        self.assertEqual(self.client.get('/api/products/changes/?since=yesterday').status_code, 400)
@@ -0,0 +1,116 @@
+"""
+Tests for API response compression and precompressed payloads.
+Run: python manage.py test api.tests.test_compression
+"""
+
+import gzip
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import compression
+from api.models import Banner, Product
+
+
+class NegotiationTest(TestCase):
+
+    def test_preferred_accepted_encoding_wins(self):
+        self.assertEqual(compression.negotiate('gzip, deflate, br', ['br', 'gzip']), 'br')
+        self.assertEqual(compression.negotiate('br;q=0, gzip;q=0.5', ['br', 'gzip']), 'gzip')
+        self.assertEqual(compression.negotiate('*', ['gzip']), 'gzip')
+        self.assertIsNone(compression.negotiate('identity', ['br', 'gzip']))
+        self.assertIsNone(compression.negotiate('', ['gzip']))
+
+    def test_stream_round_trip(self):
+        chunks = list(compression.compress_stream([b'[1,', b'2,', b'3]'], 'gzip'))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), b'[1,2,3]')
+
+
+@mock.patch.object(compression, 'brotli', None)
+class CompressionMiddlewareTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for i in range(30):
+            Product.objects.create(title=f'Hydrating Serum {i}', price=20, description='Gentle daily serum ' * 5)
+
+    def get(self, path, encoding='gzip'):
+        return self.client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+
+    def test_large_api_responses_are_gzipped(self):
+        plain = self.get('/api/products/', encoding='')
+        compressed = self.get('/api/products/')
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertLess(len(compressed.content), len(plain.content))
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+    def test_small_responses_are_left_alone(self):
+        response = self.get('/api/products/999/')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_streamed_responses_are_compressed(self):
+        response = self.get('/api/products/?exclude_ingredients=nut')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.getvalue()))), 30)
+
+    def test_catalog_listing_is_compressed_once_per_snapshot(self):
+        self.get('/api/products/')
+        compression.wait()
+
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            response = self.get('/api/products/')
+
+        compress.assert_not_called()
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 30)
+
+    def test_only_the_negotiated_encoding_is_made_and_refined_off_the_request_path(self):
+        body = b'{"text":"' + b'glow ' * 400 + b'"}'
+        variants = compression.Variants(body)
+
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            first = variants.get('gzip')
+            compression.wait()
+            refined = variants.get('gzip')
+
+        self.assertEqual(compress.call_args_list, [
+            mock.call(body, 'gzip'), mock.call(body, 'gzip', precompressed=True),
+        ])
+        self.assertEqual(gzip.decompress(first), body)
+        self.assertEqual(refined, gzip.compress(body, compression.PRECOMPRESSED_GZIP_LEVEL, mtime=0))
+        self.assertIsNone(compression.Variants(b'{}').get('gzip'))
+
+    def test_banner_payload_is_cached_until_banners_change(self):
+        for i in range(20):
+            Banner.objects.create(title=f'Summer glow sale {i}', description='Up to 30% off ' * 5)
+        self.get('/api/banners/')
+
+        with self.assertNumQueries(0):
+            cached = self.get('/api/banners/')
+        Banner.objects.create(title='New arrivals')
+        refreshed = self.get('/api/banners/', encoding='')
+
+        self.assertEqual(cached['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(cached.content))['banners']), 20)
+        self.assertEqual(len(refreshed.json()['banners']), 21)
+
+    def test_cached_payloads_are_built_and_compressed_once(self):
+        build = mock.Mock(return_value=b'{"text":"' + b'glow ' * 400 + b'"}')
+
+        first = compression.cached_response('example', build)
+        second = compression.cached_response('example', build)
+        compression.invalidate('example')
+        compression.cached_response('example', build)
+
+        self.assertEqual(build.call_count, 2)
+        self.assertEqual(gzip.decompress(second.precompressed.get('gzip')), first.content)
+        self.assertEqual(json.loads(self.get('/api/about-us/', encoding='').content)['company_name'], 'Novacell')
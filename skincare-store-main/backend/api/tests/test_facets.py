@@ -0,0 +1,78 @@
+"""
+Tests for the faceted storefront filter endpoint.
+Run: python manage.py test api.tests.test_facets
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import AppUser, Product, Review
+
+
+class FacetedFilterTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cheap_serum = Product.objects.create(title='Cheap Serum', price=10, stock=5, category='Serum')
+        self.serum = Product.objects.create(
+            title='Retinol Serum', price=35, stock=0, category='serum', is_trending=True, ingredients=['retinol']
+        )
+        self.toner = Product.objects.create(title='Toner', price=20, stock=3, category='toner', is_trending=True)
+        self.cream = Product.objects.create(title='Cream', price=80, stock=1, category='moisturizer')
+        users = [AppUser.objects.create(name=f'User {i}', email=f'user{i}@test.com') for i in range(2)]
+        Review.objects.create(user=users[0], product=self.toner, rating=5)
+        Review.objects.create(user=users[1], product=self.toner, rating=4)
+        Review.objects.create(user=users[0], product=self.serum, rating=2)
+
+    def get(self, query=''):
+        response = self.client.get(f'/api/products/filter/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def counts(self, facet):
+        return {entry['value']: entry['count'] for entry in facet}
+
+    def test_unfiltered_counts(self):
+        data = self.get()
+
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(self.counts(data['facets']['category'])['Serum'], 2)
+        self.assertEqual(self.counts(data['facets']['price_tier']),
+                         {'under_15': 1, '15_30': 1, '30_60': 1, '60_plus': 1})
+        self.assertEqual(data['facets']['in_stock']['count'], 3)
+        self.assertEqual(data['facets']['trending']['count'], 2)
+        self.assertEqual(self.counts(data['facets']['min_rating']), {4: 1, 3: 1, 2: 2, 1: 2})
+
+    def test_facets_count_with_the_other_selections_applied(self):
+        data = self.get('category=serum&in_stock=1')
+
+        self.assertEqual([p['id'] for p in data['results']], [self.cheap_serum.id])
+        # Category counts ignore the category selection but honour in_stock
+        self.assertEqual(self.counts(data['facets']['category']), {'Serum': 1, 'moisturizer': 1, 'toner': 1})
+        self.assertTrue(data['facets']['category'][0]['selected'])
+        # in_stock counts ignore in_stock but honour the category
+        self.assertEqual(data['facets']['in_stock']['count'], 1)
+        self.assertEqual(self.counts(data['facets']['price_tier'])['under_15'], 1)
+
+    def test_rating_tiers_and_ingredient_exclusion(self):
+        data = self.get('min_rating=4&sort=-price')
+        self.assertEqual([p['id'] for p in data['results']], [self.toner.id])
+
+        data = self.get('exclude_ingredients=retinol&trending=1')
+        self.assertEqual([p['id'] for p in data['results']], [self.toner.id])
+
+    def test_paging_and_sorting(self):
+        data = self.get('sort=-price&page=2&page_size=3')
+
+        self.assertEqual([p['id'] for p in data['results']], [self.cheap_serum.id])
+        self.assertFalse(data['has_more'])
+
+    def test_served_from_the_catalog_snapshot(self):
+        self.get()
+
+        with self.assertNumQueries(0):
+            self.get('price_tier=under_15,15_30,30_60&exclude_ingredients=retinol&sort=rating')
+
+    def test_invalid_selection(self):
+        self.assertEqual(self.client.get('/api/products/filter/?price_tier=free').status_code, 400)
+        self.assertEqual(self.client.get('/api/products/filter/?min_rating=high').status_code, 400)
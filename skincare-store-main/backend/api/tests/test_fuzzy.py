@@ -0,0 +1,72 @@
+"""
+Tests for trigram fuzzy search (in-process index; PostgreSQL uses pg_trgm GIN indexes).
+Run: python manage.py test api.tests.test_fuzzy
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import fuzzy
+from api.models import AppUser, Product
+from api.utils import create_jwt
+
+
+class FuzzyUserSearchTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.jonathan = AppUser.objects.create(name='Jonathan Smith', email='jsmith@example.com')
+        self.johanna = AppUser.objects.create(name='Johanna Stone', email='jo.stone@example.com')
+        self.maria = AppUser.objects.create(name='Maria Lopez', email='maria@beauty.io')
+
+    def ids(self, query):
+        return [pk for pk, _ in fuzzy.search_users(query)['hits']]
+
+    def test_tolerates_typos(self):
+        self.assertEqual(self.ids('jonathon'), [self.jonathan.id])
+        self.assertEqual(self.ids('lopes'), [self.maria.id])
+
+    def test_substring_matches_rank_first(self):
+        # "smit" is a substring of Jonathan's name; Johanna only shares trigrams with "stone"
+        self.assertEqual(self.ids('smit')[0], self.jonathan.id)
+        self.assertEqual(self.ids('beauty.io'), [self.maria.id])
+        self.assertEqual(fuzzy.search_users('xyzzy')['total'], 0)
+
+    def test_index_follows_user_writes(self):
+        self.assertEqual(self.ids('priya'), [])
+
+        priya = AppUser.objects.create(name='Priya Patel', email='priya@example.com')
+
+        self.assertEqual(self.ids('priya'), [priya.id])
+
+    def test_endpoint_pages_and_skips_current_user(self):
+        token = create_jwt({'user_id': self.jonathan.id, 'email': self.jonathan.email})
+
+        response = self.client.get('/api/social/users/search/?q=example&page_size=5',
+                                   HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        data = response.json()
+        self.assertEqual(data['total_count'], 2)
+        self.assertFalse(data['total_is_estimate'])
+        self.assertEqual([u['id'] for u in data['users']], [self.johanna.id])
+
+
+class FuzzyProductSearchTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.serum = Product.objects.create(title='Hyaluronic Acid Serum', price=25, category='serum')
+        Product.objects.create(title='Clay Mask', price=20, category='mask')
+
+    def test_search_falls_back_to_trigrams_on_typos(self):
+        response = self.client.get('/api/products/search/?q=hyaluronik')
+
+        data = response.json()
+        self.assertTrue(data['fuzzy'])
+        self.assertEqual([r['product']['id'] for r in data['results']], [self.serum.id])
+
+    def test_exact_terms_use_full_text_search(self):
+        data = self.client.get('/api/products/search/?q=hyaluronic').json()
+
+        self.assertFalse(data['fuzzy'])
+        self.assertEqual(data['total'], 1)
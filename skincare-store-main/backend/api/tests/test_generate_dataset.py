@@ -0,0 +1,83 @@
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from api.management.commands.generate_dataset import Command
+from api.models import (
+    AppUser, Product, UserFollow, UserLikedProduct, Order, OrderItem,
+    Review, Message, Notification
+)
+
+
+class GenerateDatasetCommandTest(TestCase):
+
+    def _generate(self, **options):
+        defaults = {'users': 60, 'products': 30, 'batch_size': 50, 'seed': 7, 'stdout': StringIO()}
+        defaults.update(options)
+        call_command('generate_dataset', **defaults)
+
+    def _snapshot(self):
+        return {
+            'likes': sorted(UserLikedProduct.objects.values_list('user__email', 'product__title')),
+            'follows': sorted(UserFollow.objects.values_list('follower__email', 'following__email')),
+            'reviews': sorted(Review.objects.values_list('user__email', 'product__title', 'rating')),
+        }
+
+    def test_generates_all_tables(self):
+        self._generate()
+
+        self.assertEqual(AppUser.objects.filter(email__endswith='@loadtest.invalid').count(), 60)
+        self.assertEqual(Product.objects.count(), 30)
+        self.assertGreater(UserFollow.objects.count(), 0)
+        self.assertGreater(UserLikedProduct.objects.count(), 0)
+        self.assertGreater(Order.objects.count(), 0)
+        self.assertGreater(OrderItem.objects.count(), 0)
+        self.assertGreater(Review.objects.count(), 0)
+        self.assertEqual(Notification.objects.count(), UserFollow.objects.count())
+        self.assertFalse(UserFollow.objects.filter(follower=F('following')).exists())
+
+    def test_same_seed_produces_same_dataset(self):
+        self._generate()
+        first = self._snapshot()
+
+        call_command('generate_dataset', clear=True, stdout=StringIO())
+        self._generate()
+
+        self.assertEqual(first, self._snapshot())
+
+    def test_popularity_is_heavy_tailed(self):
+        self._generate(users=200, products=50, likes=10)
+        counts = sorted(
+            UserLikedProduct.objects.values('product').annotate(n=Count('id')).values_list('n', flat=True),
+            reverse=True,
+        )
+        # The most liked product should be far more popular than the median one
+        self.assertGreater(counts[0], 3 * counts[len(counts) // 2])
+
+    def test_clear_removes_generated_users_and_activity(self):
+        kept = Product.objects.create(title='Real Serum', price=20)
+        self._generate()
+        call_command('generate_dataset', clear=True, stdout=StringIO())
+
+        self.assertFalse(AppUser.objects.filter(email__endswith='@loadtest.invalid').exists())
+        self.assertEqual(UserLikedProduct.objects.count(), 0)
+        self.assertEqual(Message.objects.count(), 0)
+        self.assertEqual(list(Product.objects.all()), [kept])
+
+    def test_copy_input_marks_null_apart_from_empty_strings(self):
+        batch = [
+            {'bio': '', 'actor_id': None, 'allergies': ['lanolin'], 'created_at': datetime(2024, 1, 2, 3, 4, 5)},
+            {'bio': 'a, "quoted" bio', 'actor_id': 7, 'allergies': [], 'created_at': None},
+        ]
+
+        text = Command._copy_buffer(batch, ['bio', 'actor_id', 'allergies', 'created_at']).read()
+
+        # COPY reads the unquoted \N as NULL and the empty field as an empty string
+        self.assertEqual(text.splitlines(), [
+            ',\\N,"[""lanolin""]",2024-01-02T03:04:05',
+            '"a, ""quoted"" bio",7,[],\\N',
+        ])
+
@@ -0,0 +1,84 @@
+"""
+Tests for conditional requests and Cache-Control on public read endpoints.
+Run: python manage.py test api.tests.test_http_cache
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import AppUser, Banner, Product, Review
+from api.utils import create_jwt
+
+
+class ConditionalRequestTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.serum = Product.objects.create(title='Serum', price=30)
+        self.toner = Product.objects.create(title='Toner', price=12)
+        self.user = AppUser.objects.create(name='Reviewer', email='reviewer@test.com')
+
+    def revalidate(self, path, response, **headers):
+        return self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+
+    def test_unchanged_listing_is_not_modified_without_queries(self):
+        first = self.client.get('/api/products/')
+
+        with self.assertNumQueries(0):
+            again = self.revalidate('/api/products/', first)
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertIn('public', again['Cache-Control'])
+        self.assertIn('s-maxage=300', first['Cache-Control'])
+        self.assertIn('Authorization', first['Vary'])
+
+    def test_query_variants_have_their_own_tags(self):
+        full = self.client.get('/api/products/')
+        sparse = self.client.get('/api/products/?fields=id')
+
+        self.assertNotEqual(full['ETag'], sparse['ETag'])
+        self.assertEqual(self.client.get('/api/products/?fields=id', HTTP_IF_NONE_MATCH=full['ETag']).status_code, 200)
+
+    def test_product_tag_follows_its_own_updates_and_reviews(self):
+        path = f'/api/products/{self.serum.id}/'
+        first = self.client.get(path)
+
+        self.toner.stock = 3
+        self.toner.save()
+        after_other_write = self.revalidate(path, first)
+        Review.objects.create(user=self.user, product=self.serum, rating=5)
+        after_review = self.revalidate(path, first)
+
+        self.assertIn('Last-Modified', first)
+        self.assertEqual(after_other_write.status_code, 304)
+        self.assertEqual(after_review.status_code, 200)
+        self.assertEqual(after_review.json()['average_rating'], 5.0)
+        self.assertEqual(self.revalidate(f'/api/products/{self.serum.id}/reviews/', after_review).status_code, 304)
+
+    def test_banners_and_about_us(self):
+        banners = self.client.get('/api/banners/')
+        about = self.client.get('/api/about-us/')
+
+        self.assertEqual(self.revalidate('/api/banners/', banners).status_code, 304)
+        self.assertEqual(self.revalidate('/api/about-us/', about).status_code, 304)
+        self.assertIn('max-age=3600', about['Cache-Control'])
+
+        Banner.objects.create(title='Sale')
+        self.assertEqual(self.revalidate('/api/banners/', banners).status_code, 200)
+
+    def test_signed_in_listing_is_private(self):
+        auth = f"Bearer {create_jwt({'user_id': self.user.id, 'email': self.user.email})}"
+        anonymous = self.client.get('/api/products/')
+
+        response = self.revalidate('/api/products/', anonymous, HTTP_AUTHORIZATION=auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_unknown_product_is_still_404(self):
+        response = self.client.get('/api/products/999/', HTTP_IF_NONE_MATCH='"anything"')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('Cache-Control', response)
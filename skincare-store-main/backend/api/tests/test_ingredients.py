@@ -0,0 +1,95 @@
+"""
+Tests for the normalized ingredient tables and SQL-level ingredient filtering.
+Run: python manage.py test api.tests.test_ingredients
+"""
+
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api import ingredients
+from api.models import AppUser, Ingredient, Product, ProductIngredient
+from api.utils import create_jwt
+
+
+def linked_names(product):
+    return list(
+        ProductIngredient.objects.filter(product=product)
+        .order_by('position')
+        .values_list('ingredient__name', flat=True)
+    )
+
+
+class IngredientSyncTest(TestCase):
+
+    def test_product_writes_keep_links_in_sync(self):
+        product = Product.objects.create(title='Serum', price=30, ingredients=[' Niacinamide', 'Water', 'water'])
+        self.assertEqual(linked_names(product), ['niacinamide', 'water'])
+
+        product.ingredients = ['Water', 'Zinc']
+        product.save()
+        self.assertEqual(linked_names(product), ['water', 'zinc'])
+        self.assertEqual(Ingredient.objects.filter(name='water').count(), 1)
+
+    def test_saves_without_ingredient_changes_skip_sync(self):
+        product = Product.objects.create(title='Serum', price=30, ingredients=['niacinamide'])
+
+        product.stock = 5
+        with self.assertNumQueries(1):
+            product.save(update_fields=['stock'])
+
+    def test_backfill_command_rebuilds_links_for_bulk_writes(self):
+        Product.objects.bulk_create([
+            Product(title=f'Bulk {i}', price=10, ingredients=['Glycerin', f'Extract {i % 3}'])
+            for i in range(7)
+        ])
+        self.assertFalse(ProductIngredient.objects.exists())
+
+        call_command('backfill_ingredients', '--batch-size', '3', stdout=StringIO())
+
+        self.assertEqual(ProductIngredient.objects.count(), 14)
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('name', flat=True)),
+            ['extract 0', 'extract 1', 'extract 2', 'glycerin']
+        )
+
+    def test_backfill_prunes_unused_ingredients(self):
+        product = Product.objects.create(title='Toner', price=10, ingredients=['witch hazel'])
+        product.delete()
+
+        call_command('backfill_ingredients', '--prune', stdout=StringIO())
+
+        self.assertFalse(Ingredient.objects.exists())
+
+
+class ExcludeIngredientsFilterTest(TestCase):
+
+    def setUp(self):
+        self.nutty = Product.objects.create(title='Nut Balm', price=8, category='balm', ingredients=['Almond Nut Oil'])
+        self.scented = Product.objects.create(title='Scented', price=9, category='balm', ingredients=['Fragrance'])
+        self.plain = Product.objects.create(title='Plain', price=7, category='balm', ingredients=['Aloe'])
+        self.empty = Product.objects.create(title='Empty', price=6, category='balm', ingredients=[])
+
+    def test_queryset_helper_filters_in_sql(self):
+        qs = ingredients.exclude_containing(Product.objects.all(), ['NUT', 'fragrance'])
+
+        with self.assertNumQueries(1):
+            ids = sorted(qs.values_list('id', flat=True))
+        self.assertEqual(ids, [self.plain.id, self.empty.id])
+
+    def test_catalog_parameter(self):
+        response = self.client.get('/api/products/?exclude_ingredients=nut, fragrance')
+
+        self.assertEqual(sorted(p['id'] for p in json.loads(response.getvalue())), [self.plain.id, self.empty.id])
+
+    def test_admin_list_parameter(self):
+        admin = AppUser.objects.create(name='Admin', email='admin@test.com', is_staff=True)
+        token = create_jwt({'user_id': admin.id, 'email': admin.email})
+
+        response = self.client.get(
+            '/api/admin/products/list/?exclude_ingredients=aloe', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+        self.assertEqual(response.json()['total'], 3)
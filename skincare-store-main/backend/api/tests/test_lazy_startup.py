@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from api import recommender_facade
+from api.models import Product
+
+
+class LazyRecommenderImportTest(TestCase):
+
+    def test_url_import_does_not_load_recommendation_stack(self):
+        code = (
+            'import sys, django; django.setup(); import api.urls; '
+            'from api import recommender_facade; '
+            "print(recommender_facade.is_loaded(), "
+            "[m for m in ('api.recommender', 'numpy', 'pandas', 'sklearn') if m in sys.modules])"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        completed = subprocess.run(
+            [sys.executable, '-c', code], cwd=str(settings.BASE_DIR),
+            env=env, capture_output=True, text=True,
+        )
+
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(completed.stdout.strip().splitlines()[-1], 'False []')
+
+    def test_proxy_resolves_to_real_class(self):
+        from api.recommender import HybridRecommender
+
+        proxy = recommender_facade.HybridRecommender
+        self.assertIs(proxy.get_personalized_recommendations, HybridRecommender.get_personalized_recommendations)
+        self.assertTrue(recommender_facade.is_loaded())
+
+
+class SeedDemoProductCommandTest(TestCase):
+
+    def test_seeds_only_empty_catalog(self):
+        call_command('seed_demo_product', stdout=StringIO())
+        self.assertTrue(Product.objects.filter(title='Demo Skincare Product').exists())
+
+        Product.objects.all().delete()
+        Product.objects.create(title='Real product', price=10)
+        call_command('seed_demo_product', stdout=StringIO())
+        self.assertFalse(Product.objects.filter(title='Demo Skincare Product').exists())
+
+    def test_force_seeds_alongside_existing_products(self):
+        Product.objects.create(title='Real product', price=10)
+        call_command('seed_demo_product', '--force', stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 2)
@@ -0,0 +1,82 @@
+"""
+Tests for per-request instrumentation and the admin metrics endpoint.
+Run: python manage.py test api.tests.test_metrics
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import caching, metrics
+from api.models import AppUser, Product
+from api.utils import create_jwt
+
+
+class ServerTimingTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.product = Product.objects.create(title='Serum', price=30)
+
+    def test_header_reports_queries_cache_and_total(self):
+        response = self.client.get(f'/api/products/{self.product.id}/')
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'cache;desc="hits=\d+ misses=\d+"')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    def test_only_api_requests_are_measured(self):
+        response = self.client.get('/not-an-api-path/')
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_collect_counts_sql_and_cache_work(self):
+        namespace = caching.Namespace('metrics-test')
+        namespace.set('key', 1)
+
+        with metrics.collect() as current:
+            Product.objects.count()
+            namespace.get('key')
+            namespace.get('missing')
+
+        self.assertEqual(current.queries, 1)
+        self.assertEqual((current.cache_hits, current.cache_misses), (1, 1))
+
+
+class AdminMetricsTest(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.admin = AppUser.objects.create(name='Admin', email='admin@test.com', is_staff=True)
+        self.shopper = AppUser.objects.create(name='Shopper', email='shopper@test.com')
+
+    def _auth(self, user):
+        return f"Bearer {create_jwt({'user_id': user.id, 'email': user.email})}"
+
+    def test_requires_admin(self):
+        self.assertEqual(self.client.get('/api/admin/metrics/').status_code, 401)
+        response = self.client.get('/api/admin/metrics/', HTTP_AUTHORIZATION=self._auth(self.shopper))
+        self.assertEqual(response.status_code, 403)
+
+    def test_prometheus_percentiles_per_endpoint(self):
+        product = Product.objects.create(title='Serum', price=30)
+        for _ in range(3):
+            self.client.get(f'/api/products/{product.id}/')
+
+        response = self.client.get('/api/admin/metrics/', HTTP_AUTHORIZATION=self._auth(self.admin))
+        body = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE api_request_duration_seconds summary', body)
+        labels = 'method="GET",endpoint="/api/products/<str:product_id>/"'
+        for q in ('0.5', '0.95', '0.99'):
+            self.assertIn(f'api_request_duration_seconds{{{labels},quantile="{q}"}}', body)
+        self.assertIn(f'api_request_duration_seconds_count{{{labels}}} 3', body)
+        self.assertIn(f'api_request_sql_queries_count{{{labels}}} 3', body)
+
+    def test_quantiles_use_nearest_rank(self):
+        ordered = list(range(1, 101))
+
+        self.assertEqual([metrics._quantile(ordered, q) for q in metrics.QUANTILES], [50, 95, 99])
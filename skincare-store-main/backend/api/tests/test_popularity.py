@@ -0,0 +1,80 @@
+"""
+Tests for the popularity snapshot behind cold-start recommendations.
+Run: python manage.py test api.tests.test_popularity
+"""
+
+from django.test import TestCase, Client
+from django.core.cache import cache
+
+from api import popularity
+from api.models import AppUser, Product, UserLikedProduct, Review
+from api.recommender import HybridRecommender
+from api.utils import create_jwt
+
+
+class PopularitySnapshotTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.users = [AppUser.objects.create(name=f'User {i}', email=f'user{i}@test.com') for i in range(4)]
+        self.products = [
+            Product.objects.create(title=f'Product {i}', price=10 + i, stock=10, category='skincare')
+            for i in range(5)
+        ]
+        # Product 1 is the most liked, product 0 the runner-up
+        for user in self.users:
+            UserLikedProduct.objects.create(user=user, product=self.products[1])
+        UserLikedProduct.objects.create(user=self.users[0], product=self.products[0])
+
+    def test_cold_start_ranks_trending_products_first(self):
+        recommendations = HybridRecommender.get_cold_start_recommendations(top_n=10)
+
+        ids = [r['product']['id'] for r in recommendations]
+        self.assertEqual(ids[:2], [self.products[1].id, self.products[0].id])
+        self.assertEqual(recommendations[0]['sources'], ['trending', 'cold_start'])
+
+    def test_snapshot_fills_with_top_rated_products(self):
+        # Reviews are recent activity too, so age them out of the trending window
+        for user in self.users[:3]:
+            review = Review.objects.create(user=user, product=self.products[4], rating=5)
+            Review.objects.filter(pk=review.pk).update(created_at='2000-01-01 00:00:00')
+
+        items = popularity.build()['items']
+
+        top_rated = [i for i in items if 'top_rated' in i['sources']]
+        self.assertEqual([i['product']['id'] for i in top_rated], [self.products[4].id])
+        self.assertEqual(top_rated[0]['product']['average_rating'], 5.0)
+
+    def test_reads_do_not_hit_the_database(self):
+        popularity.build()
+
+        with self.assertNumQueries(0):
+            HybridRecommender.get_cold_start_recommendations(top_n=5)
+            popularity.trending_ids(limit=10)
+            popularity.cold_start_json(top_n=5)
+
+    def test_missing_snapshot_is_rebuilt(self):
+        popularity.build()
+        popularity.invalidate()
+        self.products[1].delete()
+
+        ids = [r['product']['id'] for r in HybridRecommender.get_cold_start_recommendations(top_n=10)]
+
+        self.assertNotIn(self.products[1].id, ids)
+        self.assertEqual(ids[0], self.products[0].id)
+
+    def test_new_user_endpoint_serves_snapshot(self):
+        newcomer = AppUser.objects.create(name='New', email='new@test.com')
+        token = create_jwt({'user_id': newcomer.id, 'email': newcomer.email})
+
+        response = Client().get(
+            '/api/recommendations/personalized/?limit=1',
+            HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertFalse(data['user_has_history'])
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['recommendations'][0]['product']['id'], self.products[1].id)
@@ -0,0 +1,104 @@
+"""
+Tests for the two-tier product card cache.
+Run: python manage.py test api.tests.test_product_cards
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import caching, product_cards
+from api.models import AppUser, Cart, CartItem, Product, Review
+from api.product_cards import LRUCache
+from api.utils import create_jwt
+
+
+class LRUCacheTest(TestCase):
+
+    def test_bounded_by_entries_and_bytes(self):
+        lru = LRUCache(max_entries=2, max_bytes=100)
+        lru.set('a', 1, 10)
+        lru.set('b', 2, 10)
+        lru.get('a')
+        lru.set('c', 3, 10)  # evicts b, the least recently used
+        lru.set('d', 4, 85)  # evicts a to stay under 100 bytes
+
+        self.assertIsNone(lru.get('b'))
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual([lru.get('c'), lru.get('d')], [3, 4])
+        self.assertEqual(lru.stats()['bytes'], 95)
+        self.assertEqual(lru.stats()['evictions'], 2)
+
+    def test_entries_expire(self):
+        now = [0]
+        lru = LRUCache(ttl=10, clock=lambda: now[0])
+        lru.set('a', 1, 1)
+        now[0] = 11
+
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(lru.stats()['entries'], 0)
+        self.assertEqual(lru.stats()['hit_rate'], 0.0)
+
+
+class ProductCardCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.serum = Product.objects.create(title='Serum', price=30)
+        self.toner = Product.objects.create(title='Toner', price=12)
+        self.user = AppUser.objects.create(name='Shopper', email='shopper@test.com')
+
+    def test_cards_match_model_and_repeat_lookups_skip_the_database(self):
+        first = product_cards.get_many([self.serum.id, self.toner.id, 999])
+
+        with self.assertNumQueries(0):
+            again = product_cards.get_many([self.toner.id, self.serum.id])
+
+        self.assertEqual(first, {self.serum.id: self.serum.to_dict(), self.toner.id: self.toner.to_dict()})
+        self.assertEqual(again, first)
+        self.assertGreater(product_cards.stats()['hits'], 0)
+
+    def test_writes_are_seen_through_the_version_counter(self):
+        product_cards.get(self.serum.id)
+
+        self.serum.title = 'Night Serum'
+        self.serum.save()
+        renamed = product_cards.get(self.serum.id)
+        Review.objects.create(user=self.user, product=self.serum, rating=4)
+        reviewed = product_cards.get(self.serum.id)
+
+        self.assertEqual(renamed['title'], 'Night Serum')
+        self.assertEqual(reviewed['average_rating'], 4.0)
+
+    def test_local_tier_is_refilled_from_the_shared_tier(self):
+        product_cards.get(self.serum.id)
+        caching.versions.delete(product_cards.VERSION_KEY.format(self.serum.id))  # as if the local entry were stale
+
+        with self.assertNumQueries(0):
+            card = product_cards.get(self.serum.id)
+
+        self.assertEqual(card['title'], 'Serum')
+
+    def test_a_write_evicts_only_that_card(self):
+        product_cards.get_many([self.serum.id, self.toner.id])
+
+        self.toner.title = 'Mist'
+        self.toner.save()
+        product_cards.shared.delete(self.serum.id)  # so only the local tier can still serve it
+        with self.assertNumQueries(2):  # the toner and its reviews
+            cards = product_cards.get_many([self.serum.id, self.toner.id])
+
+        self.assertEqual((cards[self.serum.id]['title'], cards[self.toner.id]['title']), ('Serum', 'Mist'))
+
+    def test_callers_get_copies(self):
+        product_cards.get(self.serum.id)['allergens_found'] = ['x']
+
+        self.assertNotIn('allergens_found', product_cards.get(self.serum.id))
+
+    def test_cart_uses_cards(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.serum, qty=2)
+        auth = f"Bearer {create_jwt({'user_id': self.user.id, 'email': self.user.email})}"
+
+        items = self.client.get('/api/cart/', HTTP_AUTHORIZATION=auth).json()
+
+        self.assertEqual(items, [{'product': {**self.serum.to_dict(), 'allergens_found': []}, 'qty': 2}])
@@ -0,0 +1,114 @@
+"""
+Tests for on-demand request profiling and the admin profile endpoints.
+Run: python manage.py test api.tests.test_profiling
+"""
+
+import marshal
+import time
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import profiling
+from api.models import AppUser, Product
+from api.profiling import SamplingProfiler
+from api.utils import create_jwt
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+class ProfilerMiddlewareTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = AppUser.objects.create(name='Admin', email='admin@test.com', is_staff=True)
+        self.shopper = AppUser.objects.create(name='Shopper', email='shopper@test.com')
+        self.product = Product.objects.create(title='Serum', price=30)
+
+    def _auth(self, user):
+        return f"Bearer {create_jwt({'user_id': user.id, 'email': user.email})}"
+
+    def test_requests_without_the_header_are_not_profiled(self):
+        response = self.client.get(f'/api/products/{self.product.id}/', HTTP_AUTHORIZATION=self._auth(self.admin))
+
+        self.assertFalse(response.has_header(profiling.RESPONSE_HEADER))
+        self.assertEqual(profiling.recent(), [])
+
+    def test_non_admins_are_served_unprofiled(self):
+        response = self.client.get(
+            f'/api/products/{self.product.id}/', HTTP_X_PROFILE='1', HTTP_AUTHORIZATION=self._auth(self.shopper),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header(profiling.RESPONSE_HEADER))
+
+    def test_cprofile_records_sql_with_origins(self):
+        auth = self._auth(self.admin)
+        response = self.client.get(f'/api/products/{self.product.id}/', HTTP_X_PROFILE='cprofile', HTTP_AUTHORIZATION=auth)
+        profile_id = response[profiling.RESPONSE_HEADER]
+
+        profile = self.client.get(f'/api/admin/profiles/{profile_id}/', HTTP_AUTHORIZATION=auth).json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((profile['mode'], profile['status']), ('cprofile', 200))
+        self.assertGreater(profile['sql']['count'], 0)
+        self.assertTrue(any(
+            frame.startswith('api/views.py:')
+            for statement in profile['sql']['statements'] for frame in statement['origin']
+        ))
+        self.assertTrue(profile['top'])
+        self.assertNotIn('pstats', profile)
+
+    def test_pstats_download_loads(self):
+        auth = self._auth(self.admin)
+        response = self.client.get(f'/api/products/{self.product.id}/', HTTP_X_PROFILE='1', HTTP_AUTHORIZATION=auth)
+        profile_id = response[profiling.RESPONSE_HEADER]
+
+        download = self.client.get(f'/api/admin/profiles/{profile_id}/?format=pstats', HTTP_AUTHORIZATION=auth)
+        folded = self.client.get(f'/api/admin/profiles/{profile_id}/?format=folded', HTTP_AUTHORIZATION=auth)
+
+        stats = marshal.loads(download.content)
+        self.assertTrue(any(name == 'get_product' for _, _, name in stats))
+        self.assertEqual(folded.status_code, 400)
+
+    def test_sampling_via_query_parameter_and_listing(self):
+        auth = self._auth(self.admin)
+        response = self.client.get('/api/products/?profile=sample', HTTP_AUTHORIZATION=auth)
+        profile_id = response[profiling.RESPONSE_HEADER]
+
+        listed = self.client.get('/api/admin/profiles/', HTTP_AUTHORIZATION=auth).json()['profiles']
+        folded = self.client.get(f'/api/admin/profiles/{profile_id}/?format=folded', HTTP_AUTHORIZATION=auth)
+
+        self.assertEqual(_body(response), _body(self.client.get('/api/products/', HTTP_AUTHORIZATION=auth)))
+        self.assertEqual([(entry['id'], entry['mode']) for entry in listed], [(profile_id, 'sample')])
+        self.assertEqual(folded.status_code, 200)
+
+    def test_endpoints_require_admin(self):
+        self.assertEqual(self.client.get('/api/admin/profiles/').status_code, 401)
+        response = self.client.get('/api/admin/profiles/missing/', HTTP_AUTHORIZATION=self._auth(self.shopper))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get('/api/admin/profiles/missing/', HTTP_AUTHORIZATION=self._auth(self.admin))
+        self.assertEqual(response.status_code, 404)
+
+
+class SamplingProfilerTest(TestCase):
+
+    def test_samples_the_busy_function(self):
+        sampler = SamplingProfiler(interval=0.001)
+        sampler.enable()
+        try:
+            _spin(0.1)
+        finally:
+            sampler.disable()
+
+        spin = next(entry for entry in sampler.top() if entry['function'].endswith(':_spin'))
+        self.assertGreater(spin['own_samples'], 0)
+        self.assertIn(':_spin ', sampler.folded())
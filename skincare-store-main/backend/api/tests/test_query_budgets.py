@@ -0,0 +1,388 @@
+"""
+Query budgets for every route in api/urls.py.
+
+Each route is called against the same seeded dataset at two sizes, with cold
+caches. Its SQL count must stay within its budget at the larger size, and
+must not grow with the size of the dataset (more products, orders, followers,
+messages, ...). Routes whose writes legitimately scale with their input, one
+row per cart line for instance, declare that with `per_row`. A failure lists
+the statements that repeated, which is where an N+1 usually shows.
+
+New routes must be added to ROUTES; test_every_route_has_a_budget fails
+otherwise.
+
+Run: python manage.py test api.tests.test_query_budgets --settings=skincare_backend.test_settings
+"""
+
+import hashlib
+import hmac
+import json
+import re
+import tempfile
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+
+from api import autocomplete, profiling, urls
+from api.cashfree_utils import cashfree
+from api.models import (
+    Address, AppUser, Banner, Booking, Cart, CartItem, Conversation, Message, Notification, Order, OrderItem,
+    Payment, Product, Review, UserFollow, UserLikedProduct, Wallet, WalletTransaction,
+)
+from api.recommender import ProductFeatureVector
+from api.utils import create_jwt, create_refresh_token
+
+
+SMALL, LARGE = 2, 6
+
+
+@dataclass
+class Route:
+    route: str  # the pattern in api/urls.py
+    budget: int  # most queries one call may run
+    method: str = 'get'
+    path: str = None  # route with its converters filled in from the fixture, e.g. 'products/{product}/'
+    data: object = None  # dict, or callable(fixture) -> dict
+    user: str = 'shopper'  # 'shopper', 'admin' or None
+    form: bool = False  # send data as multipart rather than JSON
+    per_row: int = 0  # queries each extra seeded row may add
+    headers: object = field(default_factory=dict)  # extra request META, or callable(fixture) -> dict
+    before: object = None  # callable(fixture) run after caches are cleared, for state kept only in the cache
+
+    def url(self, fixture):
+        return '/api/' + (self.path or self.route).format(**vars(fixture))
+
+    def payload(self, fixture):
+        return self.data(fixture) if callable(self.data) else self.data
+
+
+def _webhook_headers(fixture):
+    body = json.dumps(_webhook_body(fixture))
+    signature = hmac.new(cashfree.secret_key.encode(), f'1700000000{body}'.encode(), hashlib.sha256).hexdigest()
+    return {'HTTP_X_WEBHOOK_TIMESTAMP': '1700000000', 'HTTP_X_WEBHOOK_SIGNATURE': signature}
+
+
+def _webhook_body(fixture):
+    return {'type': 'PAYMENT_SUCCESS_WEBHOOK', 'data': {'order': {'order_id': fixture.cashfree_order_id}}}
+
+
+def _store_profile(fixture):
+    profiling.save({
+        'id': 'budget', 'mode': 'sample', 'method': 'GET', 'path': '/api/products/', 'status': 200,
+        'created_at': timezone.now().isoformat(), 'duration_ms': 1.0,
+        'sql': {'count': 0, 'duration_ms': 0.0, 'statements': []}, 'top': [], 'folded': '',
+    })
+
+
+ROUTES = [
+    # Catalog
+    Route('products/', 5),
+    Route('products/create/', 7, 'post', user='admin', form=True,
+          data={'title': 'New Serum', 'price': '20', 'stock': '5', 'ingredients': 'Water\nGlycerin'}),
+    Route('products/share/', 9, 'post', data=lambda f: {'product_id': f.product, 'recipient_id': f.friend}),
+    Route('products/search/', 6, path='products/search/?q=serum'),
+    Route('products/autocomplete/', 4, path='products/autocomplete/?q=ser'),
+    Route('products/filter/', 5, path='products/filter/?category=serum'),
+    Route('products/changes/', 5),
+    Route('products/batch/', 5, path='products/batch/?ids={product_ids}'),
+    Route('products/<str:product_id>/friends-purchased/', 3, path='products/{product}/friends-purchased/'),
+    Route('products/<str:product_id>/', 3, path='products/{product}/'),
+    Route('products/<int:product_id>/reviews/', 5, path='products/{product}/reviews/', user=None),
+    Route('products/<int:product_id>/reviews/create/', 4, 'post', path='products/{spare_product}/reviews/create/',
+          data={'rating': 4, 'comment': 'Nice'}),
+    # Auth
+    Route('auth/register/', 4, 'post', user=None,
+          data={'name': 'New', 'email': 'new@test.com', 'password': 'Secret123!'}),
+    Route('auth/login/', 1, 'post', user=None, data={'email': 'shopper@test.com', 'password': 'Secret123!'}),
+    Route('auth/refresh/', 0, 'post', user=None, data=lambda f: {'refresh_token': f.refresh_token}),
+    Route('auth/change-password/', 2, 'post', data={'old_password': 'Secret123!', 'new_password': 'Secret456!'}),
+    # Cart
+    Route('cart/add/', 9, 'post', data=lambda f: {'product_id': f.spare_product, 'qty': 1}),
+    Route('cart/', 7),
+    Route('cart/update/', 5, 'post', data=lambda f: {'product_id': f.product, 'qty': 2}),
+    Route('cart/item/<int:product_id>/remove/', 4, 'delete', path='cart/item/{product}/remove/'),
+    # Orders and bookings
+    Route('orders/create/', 8, 'post', data=lambda f: {'items': [{'product': {'id': f.product}, 'qty': 1}], 'total': 30}),
+    Route('orders/', 6),
+    Route('orders/my-orders/', 7),
+    Route('orders/<int:order_id>/', 7, path='orders/{order}/'),
+    Route('bookings/create/', 8, 'post', data=lambda f: {'product_id': f.product, 'qty': 1}),
+    Route('bookings/', 5),
+    Route('bookings/<int:booking_id>/', 6, path='bookings/{booking}/'),
+    # Profile and addresses
+    Route('profile/', 1),
+    Route('profile/update/', 2, 'put', data={'name': 'Renamed', 'bio': 'Hi'}),
+    Route('addresses/', 2),
+    Route('addresses/create/', 2, 'post', data={
+        'address_type': 'shipping', 'full_name': 'Shopper', 'phone': '5550100100', 'address_line1': '2 Side St',
+        'city': 'Almaty', 'state': 'AL', 'postal_code': '050000', 'country': 'KZ',
+    }),
+    Route('addresses/<int:address_id>/', 3, 'put', path='addresses/{address}/', data={
+        'address_type': 'billing', 'full_name': 'Shopper', 'phone': '5550100100', 'address_line1': '3 Side St',
+        'city': 'Almaty', 'state': 'AL', 'postal_code': '050000', 'country': 'KZ',
+    }),
+    Route('addresses/<int:address_id>/delete/', 5, 'delete', path='addresses/{address}/delete/'),
+    # Likes
+    Route('liked-products/', 6),
+    Route('liked-products/toggle/', 6, 'post', data=lambda f: {'product_id': f.spare_product}),
+    Route('liked-products/like/', 6, 'post', data=lambda f: {'product_id': f.spare_product}),
+    Route('liked-products/<int:product_id>/unlike/', 3, 'delete', path='liked-products/{product}/unlike/'),
+    # Content
+    Route('about-us/', 0, user=None),
+    Route('banners/', 1, user=None),
+    Route('admin/banners/', 3, user='admin'),
+    # Admin
+    Route('admin/orders/', 8, user='admin'),
+    Route('admin/orders/<int:order_id>/status/', 4, 'patch', path='admin/orders/{order}/status/', user='admin',
+          data={'status': 'processing'}),
+    Route('admin/products/list/', 7, user='admin'),
+    Route('admin/products/<int:product_id>/stock/', 5, 'patch', path='admin/products/{product}/stock/',
+          user='admin', data={'stock': 50}),
+    Route('admin/products/<int:product_id>/update/', 6, 'post', path='admin/products/{product}/update/',
+          user='admin', form=True, data={'title': 'Serum v2', 'price': '31'}),
+    Route('admin/products/<int:product_id>/delete/', 18, 'delete', path='admin/products/{spare_product}/delete/',
+          user='admin'),
+    Route('admin/products/bulk-update/', 5, 'post', user='admin',
+          data=lambda f: [{'id': f.product, 'stock': 7}]),
+    Route('admin/dashboard/', 5, user='admin'),
+    Route('admin/dashboard/recent-orders/', 3, user='admin'),
+    Route('admin/dashboard/low-stock/', 3, user='admin', path='admin/dashboard/low-stock/?threshold=100'),
+    Route('admin/dashboard/top-products/', 4, user='admin'),
+    Route('admin/metrics/', 2, user='admin'),
+    Route('admin/profiles/', 2, user='admin', before=_store_profile),
+    Route('admin/profiles/<str:profile_id>/', 2, path='admin/profiles/budget/', user='admin',
+          before=_store_profile),
+    # Social
+    Route('social/follow/<int:user_id>/', 7, 'post', path='social/follow/{stranger}/'),
+    Route('social/unfollow/<int:user_id>/', 6, 'post', path='social/unfollow/{friend}/'),
+    Route('social/followers/<int:user_id>/', 8, path='social/followers/{shopper}/'),
+    Route('social/following/<int:user_id>/', 8, path='social/following/{shopper}/'),
+    Route('social/users/<int:user_id>/mutual-followers/', 4, path='social/users/{friend}/mutual-followers/'),
+    Route('social/users/<int:user_id>/profile/', 7, path='social/users/{friend}/profile/'),
+    Route('social/users/search/', 7, path='social/users/search/?q=fan'),
+    Route('social/users/suggested/', 7),
+    Route('social/notifications/', 3),
+    Route('social/notifications/<int:notification_id>/read/', 4, 'post',
+          path='social/notifications/{notification}/read/'),
+    Route('social/notifications/mark-all-read/', 2, 'post'),
+    Route('social/notifications/unread-count/', 3),
+    Route('social/friends-activities/', 3),
+    # Chat
+    Route('chat/conversations/', 5),
+    Route('chat/conversations/<int:other_user_id>/', 12, path='chat/conversations/{friend}/'),
+    Route('chat/messages/<int:conversation_id>/', 6, path='chat/messages/{conversation}/'),
+    Route('chat/messages/<int:conversation_id>/send/', 5, 'post', path='chat/messages/{conversation}/send/',
+          data={'content': 'Hello again'}),
+    Route('chat/messages/<int:message_id>/edit/', 4, 'put', path='chat/messages/{message}/edit/',
+          data={'content': 'Edited'}),
+    Route('chat/messages/<int:message_id>/delete/', 4, 'delete', path='chat/messages/{message}/delete/'),
+    Route('chat/unread-count/', 2),
+    # Allergies
+    Route('allergies/check/<int:product_id>/', 6, path='allergies/check/{product}/'),
+    Route('allergies/check-cart/', 9, 'post', data=lambda f: {'product_ids': f.cart_product_ids}),
+    Route('allergies/check-batch/', 2, path='allergies/check-batch/?ids={product_ids}'),
+    Route('allergies/update/', 2, 'put', data={'allergies': ['fragrance', 'parabens']}),
+    # Wallet
+    Route('wallet/balance/', 2),
+    Route('wallet/add-money/', 4, 'post', data={'amount': 100}),
+    Route('wallet/transactions/', 3),
+    # Checkouts insert one order line per cart line
+    Route('wallet/pay-order/', 14, 'post', per_row=1, data={'total': 30, 'use_wallet': True}),
+    # Payment
+    Route('payment/create-order/', 13, 'post', per_row=1, data={'payment_method': 'cod'}),
+    Route('payment/retry-order/', 3, 'post', data=lambda f: {'order_id': f.order, 'payment_method': 'cod'}),
+    Route('payment/verify/', 7, 'post', data=lambda f: {'order_number': f.order_number}),
+    Route('payment/webhook/', 7, 'post', user=None, data=_webhook_body, headers=_webhook_headers),
+    Route('payment/quick-buy/', 4, 'post', data=lambda f: {'product_id': f.product, 'qty': 1}),
+    # Recommendations
+    # Each call starts without published artifacts, so these include building the feature vectors;
+    # the personalized count also depends on which strategies find candidates
+    Route('recommendations/personalized/', 46),
+    Route('recommendations/similar/<int:product_id>/', 6, path='recommendations/similar/{product}/', user=None),
+    Route('recommendations/friends-trending/', 7),
+    Route('recommendations/stats/', 7, user='admin'),
+    Route('recommendations/refresh-cache/', 6, 'post', user='admin'),
+]
+
+
+def seed(rows):
+    """The shared dataset: `rows` of everything a page can list, plus fixed anchors."""
+    shopper = AppUser.objects.create(name='Shopper', email='shopper@test.com', allergies=['fragrance'])
+    shopper.set_password('Secret123!')
+    shopper.save()
+    admin = AppUser.objects.create(name='Admin', email='admin@test.com', is_staff=True)
+    friend = AppUser.objects.create(name='Friend', email='friend@test.com')
+    stranger = AppUser.objects.create(name='Stranger', email='stranger@test.com')
+    fans = [AppUser.objects.create(name=f'Fan {i}', email=f'fan{i}@test.com') for i in range(rows)]
+
+    products = [
+        Product.objects.create(
+            title=f'Serum {i}', price=30 + i, stock=20, category='serum',
+            ingredients=['Water', 'Glycerin', 'Fragrance' if i % 2 else 'Niacinamide'],
+        )
+        for i in range(rows)
+    ]
+    spare = Product.objects.create(title='Spare Toner', price=12, stock=20, category='toner')
+
+    for user in [friend, *fans]:
+        UserFollow.objects.create(follower=user, following=shopper)
+        UserFollow.objects.create(follower=shopper, following=user)
+        Notification.objects.create(user=shopper, actor=user, notification_type='follow', message='followed you')
+    for i, product in enumerate(products):
+        Review.objects.create(user=fans[i], product=product, rating=4, comment='Good')
+        Review.objects.create(user=friend, product=product, rating=5, comment='Great')
+        UserLikedProduct.objects.create(user=shopper, product=product)
+        UserLikedProduct.objects.create(user=friend, product=product)
+        Booking.objects.create(user=shopper, product=product, qty=1, delivery_date=date(2030, 1, 1))
+
+    cart = Cart.objects.create(user=shopper)
+    for product in products:
+        CartItem.objects.create(cart=cart, product=product, qty=1)
+
+    addresses = [
+        Address.objects.create(
+            user=shopper, address_type='shipping', full_name='Shopper', phone='5550100',
+            address_line1=f'{i} Main St', city='Almaty', state='AL', postal_code='050000',
+        )
+        for i in range(rows)
+    ]
+    orders = []
+    for i in range(rows):
+        for buyer in (shopper, friend):
+            order = Order.objects.create(user=buyer, total=60, status='confirmed', shipping_address=addresses[i])
+            OrderItem.objects.create(order=order, product=products[i], qty=1, price=30)
+            OrderItem.objects.create(order=order, product=products[(i + 1) % rows], qty=1, price=30)
+            if buyer is shopper:
+                orders.append(order)
+    payment = Payment.objects.create(order=orders[0], amount=60, cashfree_order_id='cf_budget_1')
+
+    wallet = Wallet.objects.create(user=shopper, balance=Decimal('5000'))
+    for i in range(rows):
+        WalletTransaction.objects.create(wallet=wallet, transaction_type='credit', amount=10, description='Top up')
+
+    conversation = Conversation.objects.create(user1=shopper, user2=friend)
+    messages = [
+        Message.objects.create(conversation=conversation, sender=sender, content=f'Message {i}')
+        for i in range(rows) for sender in (shopper, friend)
+    ]
+    for fan in fans:
+        chat = Conversation.objects.create(user1=fan, user2=shopper)
+        Message.objects.create(conversation=chat, sender=fan, content='Hi')
+    for i in range(rows):
+        Banner.objects.create(title=f'Banner {i}', banner_type='featured', order=i)
+
+    return SimpleNamespace(
+        users={'shopper': shopper, 'admin': admin},
+        shopper=shopper.id, friend=friend.id, stranger=stranger.id, admin=admin.id,
+        product=products[0].id, spare_product=spare.id,
+        product_ids=','.join(str(p.id) for p in products),
+        cart_product_ids=[p.id for p in products],
+        order=orders[0].id, order_number=orders[0].order_number,
+        booking=Booking.objects.filter(user=shopper).first().id,
+        address=addresses[0].id, notification=Notification.objects.filter(user=shopper).first().id,
+        conversation=conversation.id, message=messages[0].id,
+        cashfree_order_id=payment.cashfree_order_id,
+        refresh_token=create_refresh_token({'user_id': shopper.id, 'email': shopper.email}),
+    )
+
+
+def _auth(user):
+    return {'HTTP_AUTHORIZATION': f"Bearer {create_jwt({'user_id': user.id, 'email': user.email})}"}
+
+
+def _shape(sql):
+    """SQL with its literals replaced, so repeats of one statement with different ids group together."""
+    return re.sub(r"'[^']*'|\b\d+\b", '?', sql)
+
+
+def _report(queries):
+    """The statements that repeated, or all of them when none did."""
+    counts = Counter(_shape(query['sql']) for query in queries)
+    repeated = [f'\n  {count}x {sql[:300]}' for sql, count in counts.most_common(5) if count > 1]
+    if repeated:
+        return '\nRepeated queries:' + ''.join(repeated)
+    return '\nQueries:' + ''.join(f'\n  {query["sql"][:300]}' for query in queries)
+
+
+class QueryBudgetTest(TestCase):
+
+    def _measure(self, case, fixture):
+        """The queries run by one call, with cold caches and its writes rolled back afterwards."""
+        # Recommender artifacts start unpublished, and none built from this dataset outlive the call
+        ProductFeatureVector._version = ProductFeatureVector._feature_matrix = None
+        try:
+            with tempfile.TemporaryDirectory() as artifacts, override_settings(RECOMMENDER_ARTIFACT_DIR=artifacts):
+                return self._call(case, fixture)
+        finally:
+            ProductFeatureVector._version = ProductFeatureVector._feature_matrix = None
+
+    def _call(self, case, fixture):
+        cache.clear()
+        if case.before:
+            case.before(fixture)
+        client_kwargs = dict(case.headers(fixture) if callable(case.headers) else case.headers)
+        if case.user:
+            client_kwargs.update(_auth(fixture.users[case.user]))
+        payload = case.payload(fixture)
+        if payload is not None and not case.form:
+            client_kwargs['data'] = json.dumps(payload)
+            client_kwargs['content_type'] = 'application/json'
+        elif payload is not None:
+            client_kwargs['data'] = payload
+
+        # The gateway is not called over the network; autocomplete rebuilds without its throttle
+        paid = {'success': True, 'payment_status': 'PAID', 'data': {}}
+        with transaction.atomic(), mock.patch.object(cashfree, 'verify_payment', return_value=paid), \
+                mock.patch.object(autocomplete, 'REBUILD_INTERVAL', 0):
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, case.method)(case.url(fixture), **client_kwargs)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+            transaction.set_rollback(True)
+
+        return response.status_code, body, list(queries.captured_queries)
+
+    def _measure_all(self, rows):
+        with transaction.atomic():
+            fixture = seed(rows)
+            measured = {id(case): self._measure(case, fixture) for case in ROUTES}
+            transaction.set_rollback(True)
+        return measured
+
+    def test_routes_stay_within_budget(self):
+        small = self._measure_all(SMALL)
+        large = self._measure_all(LARGE)
+
+        for case in ROUTES:
+            with self.subTest(route=case.route, method=case.method.upper()):
+                (status, body, few), (_, _, many) = small[id(case)], large[id(case)]
+                self.assertLess(status, 400, body[:300])
+
+                growth = len(many) - len(few)
+                self.assertLessEqual(
+                    growth, case.per_row * (LARGE - SMALL),
+                    f'{len(few)} queries with {SMALL} rows of data, {len(many)} with {LARGE}{_report(many)}',
+                )
+                worst = max(few, many, key=len)
+                self.assertLessEqual(len(worst), case.budget, f'budget {case.budget}, ran {len(worst)}{_report(worst)}')
+
+    def test_every_route_has_a_budget(self):
+        def patterns(resolver, prefix=''):
+            for entry in resolver.url_patterns:
+                if isinstance(entry, URLResolver):
+                    yield from patterns(entry, prefix + str(entry.pattern))
+                elif isinstance(entry, URLPattern):
+                    yield prefix + str(entry.pattern)
+
+        routes = set(patterns(SimpleNamespace(url_patterns=urls.urlpatterns)))
+
+        self.assertEqual(routes - {case.route for case in ROUTES}, set())
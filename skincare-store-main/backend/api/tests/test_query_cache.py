@@ -0,0 +1,91 @@
+"""
+Tests for signal-invalidated queryset result caching.
+Run: python manage.py test api.tests.test_query_cache
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import query_cache
+from api.models import Address, AppUser, Banner, Product, Review
+from api.utils import create_jwt
+
+
+class QueryCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.serum = Product.objects.create(title='Serum', price=30, stock=2)
+        self.user = AppUser.objects.create(name='Shopper', email='shopper@test.com')
+
+    def test_repeat_fetch_skips_the_database(self):
+        first = query_cache.fetch(Product.objects.values('id', 'title'), timeout=60)
+
+        with self.assertNumQueries(0):
+            again = query_cache.fetch(Product.objects.values('id', 'title'), timeout=60)
+
+        self.assertEqual(again, first)
+        self.assertEqual(first, [{'id': self.serum.id, 'title': 'Serum'}])
+
+    def test_write_to_a_read_table_invalidates(self):
+        query_cache.fetch(Product.objects.values_list('title', flat=True), timeout=60)
+
+        Product.objects.create(title='Toner', price=12)
+
+        self.assertEqual(
+            sorted(query_cache.fetch(Product.objects.values_list('title', flat=True), timeout=60)),
+            ['Serum', 'Toner'],
+        )
+
+    def test_joined_tables_invalidate_too(self):
+        reviews = Review.objects.values_list('user__name', flat=True)
+        Review.objects.create(user=self.user, product=self.serum, rating=5)
+        query_cache.fetch(reviews, timeout=60)
+
+        self.user.name = 'Renamed'
+        self.user.save()
+
+        self.assertEqual(query_cache.fetch(reviews, timeout=60), ['Renamed'])
+
+    def test_unrelated_writes_keep_the_entry(self):
+        query_cache.fetch(Product.objects.values_list('title', flat=True), timeout=60)
+
+        Address.objects.create(user=self.user, address_type='shipping', address_line1='1 Main St', city='Almaty')
+
+        with self.assertNumQueries(0):
+            query_cache.fetch(Product.objects.values_list('title', flat=True), timeout=60)
+
+    def test_count(self):
+        self.assertEqual(query_cache.count(Product.objects.all(), timeout=60), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(query_cache.count(Product.objects.all(), timeout=60), 1)
+
+        self.serum.delete()
+
+        self.assertEqual(query_cache.count(Product.objects.all(), timeout=60), 0)
+
+    def test_rejects_queries_it_cannot_invalidate(self):
+        with self.assertRaises(ValueError):
+            query_cache.fetch(Banner.objects.all(), timeout=60)
+        with self.assertRaises(ValueError):
+            query_cache.fetch(Product.objects.prefetch_related('reviews'), timeout=60)
+
+    def test_empty_lookup(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(query_cache.fetch(Product.objects.filter(id__in=[]), timeout=60), [])
+
+
+class CachedEndpointTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = AppUser.objects.create(name='Shopper', email='shopper@test.com')
+        self.auth = f"Bearer {create_jwt({'user_id': self.user.id, 'email': self.user.email})}"
+
+    def test_addresses_reflect_new_address(self):
+        self.client.get('/api/addresses/', HTTP_AUTHORIZATION=self.auth)
+
+        Address.objects.create(user=self.user, address_type='shipping', address_line1='1 Main St', city='Almaty')
+        addresses = self.client.get('/api/addresses/', HTTP_AUTHORIZATION=self.auth).json()
+
+        self.assertEqual([a['address_line1'] for a in addresses], ['1 Main St'])
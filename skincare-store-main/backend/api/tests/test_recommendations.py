@@ -6,6 +6,7 @@ Run: python manage.py test api.tests.test_recommendations
 import json
 from django.test import TestCase, Client
 from django.core.cache import cache
+from api import caching
 from api.models import (
     Product, AppUser, UserLikedProduct, Order, OrderItem, 
     Review, UserFollow, Cart
@@ -510,16 +511,16 @@ class CacheFunctionsTest(TestCase):
     def test_invalidate_user_cache(self):
         """Test user cache invalidation."""
         # Set some cache values
-        cache.set(f'recommendations_user_{self.user.id}_limit_20', {'test': 'data'}, 3600)
+        caching.recommendations.set('limit_20', {'test': 'data'}, 3600, scope=self.user.id)
         
         # Verify cache exists
-        self.assertIsNotNone(cache.get(f'recommendations_user_{self.user.id}_limit_20'))
+        self.assertIsNotNone(caching.recommendations.get('limit_20', scope=self.user.id))
         
         # Invalidate
         invalidate_user_recommendation_cache(self.user.id)
         
         # Verify cache is cleared
-        self.assertIsNone(cache.get(f'recommendations_user_{self.user.id}_limit_20'))
+        self.assertIsNone(caching.recommendations.get('limit_20', scope=self.user.id))
     
     def test_warm_user_cache(self):
         """Test warming user cache."""
@@ -532,7 +533,7 @@ class CacheFunctionsTest(TestCase):
         self.assertTrue(success)
         
         # Verify cache is populated
-        cached_data = cache.get(f'recommendations_user_{self.user.id}_limit_20')
+        cached_data = caching.recommendations.get('limit_20', scope=self.user.id)
         self.assertIsNotNone(cached_data)
         self.assertTrue(cached_data['success'])
 
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity
+from django.test import TestCase, override_settings
+
+from api.models import AppUser, Product, UserLikedProduct, Review
+from api.recommender import (
+    CollaborativeFilteringRecommender,
+    ContentBasedRecommender,
+    InteractionMatrix,
+    ProductFeatureVector,
+)
+from api.recommender_artifacts import ArtifactStore, KEEP_VERSIONS, feature_store, interaction_store
+
+
+class ArtifactStoreTest(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ArtifactStore('test', root=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_load_returns_none_before_publish(self):
+        self.assertIsNone(self.store.load())
+
+    def test_publish_and_load_memory_maps_read_only(self):
+        dense = np.arange(12, dtype=np.float32).reshape(3, 4)
+        sparse = csr_matrix(np.array([[0, 1.5], [2.0, 0]]))
+        self.store.publish({'dense': dense, 'sparse': sparse})
+
+        artifacts = self.store.load()
+
+        self.assertIsInstance(artifacts.arrays['dense'], np.memmap)
+        self.assertFalse(artifacts.arrays['dense'].flags.writeable)
+        np.testing.assert_array_equal(artifacts['dense'], dense)
+        np.testing.assert_array_equal(artifacts['sparse'].toarray(), sparse.toarray())
+        self.assertIn('sparse', artifacts)
+
+    def test_publish_swaps_pointer_to_new_version(self):
+        first = self.store.publish({'values': np.array([1, 2, 3])})
+        self.assertEqual(self.store.load().version, first)
+
+        # Another process (simulated by a second store instance) publishes a rebuild
+        second = ArtifactStore('test', root=self.root).publish({'values': np.array([4, 5])})
+
+        artifacts = self.store.load()
+        self.assertEqual(artifacts.version, second)
+        np.testing.assert_array_equal(artifacts['values'], [4, 5])
+
+    def test_old_versions_are_pruned(self):
+        for i in range(KEEP_VERSIONS + 2):
+            self.store.publish({'values': np.array([i])})
+
+        versions = [
+            entry for entry in os.listdir(self.store.directory)
+            if os.path.isdir(os.path.join(self.store.directory, entry))
+        ]
+        self.assertEqual(len(versions), KEEP_VERSIONS)
+        self.assertIn(self.store.current_version(), versions)
+
+
+class SharedRecommenderArtifactsTest(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings_override = override_settings(RECOMMENDER_ARTIFACT_DIR=self.root)
+        self.settings_override.enable()
+        ProductFeatureVector._version = None
+        ProductFeatureVector._feature_matrix = None
+
+        self.users = [AppUser.objects.create(name=f'U{i}', email=f'u{i}@test.com') for i in range(4)]
+        self.products = [
+            Product.objects.create(title='Moisturizer A', price=30, category='moisturizer',
+                                   ingredients=['hyaluronic acid', 'glycerin'], benefits=['hydration']),
+            Product.objects.create(title='Moisturizer B', price=35, category='moisturizer',
+                                   ingredients=['hyaluronic acid', 'peptides'], benefits=['hydration']),
+            Product.objects.create(title='Cleanser', price=15, category='cleanser',
+                                   ingredients=['salicylic acid'], benefits=['acne control']),
+            Product.objects.create(title='Serum', price=60, category='serum',
+                                   ingredients=['vitamin c', 'hyaluronic acid'], benefits=['brightening']),
+        ]
+        for user, liked in [(0, [0, 1]), (1, [0, 1, 2]), (2, [3]), (3, [0, 1, 3])]:
+            for idx in liked:
+                UserLikedProduct.objects.create(user=self.users[user], product=self.products[idx])
+        Review.objects.create(user=self.users[1], product=self.products[0], rating=5)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        ProductFeatureVector._version = None
+        ProductFeatureVector._feature_matrix = None
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_neighbour_table_matches_brute_force_similarity(self):
+        _, matrix, product_ids = ProductFeatureVector.build_feature_vectors()
+        similarities = cosine_similarity(matrix)
+
+        for row, product_id in enumerate(product_ids):
+            expected = [
+                (product_ids[i], similarities[row, i])
+                for i in np.argsort(-similarities[row], kind='stable')
+                if i != row and similarities[row, i] > 0.1
+            ][:3]
+            result = ContentBasedRecommender.get_similar_products(product_id, top_n=3)
+            self.assertEqual([r['product_id'] for r in result], [pid for pid, _ in expected])
+            for item, (_, score) in zip(result, expected):
+                self.assertAlmostEqual(item['similarity_score'], score, places=5)
+
+    def test_other_process_maps_published_feature_vectors(self):
+        ProductFeatureVector.build_feature_vectors()
+
+        # A fresh worker has nothing cached and must map rather than rebuild
+        ProductFeatureVector._version = None
+        ProductFeatureVector._feature_matrix = None
+        vectorizer, matrix, product_ids = ProductFeatureVector.get_feature_vectors()
+
+        mapped = feature_store.load().arrays
+        self.assertIsNone(vectorizer)
+        self.assertTrue(np.shares_memory(matrix.data, mapped['feature_matrix.data']))
+        self.assertTrue(np.shares_memory(matrix.indices, mapped['feature_matrix.indices']))
+        self.assertEqual(product_ids, sorted(p.id for p in self.products))
+
+    def test_shared_similar_users_match_live_computation(self):
+        target = self.users[0].id
+        live = CollaborativeFilteringRecommender.find_similar_users(target, top_n=5)
+        self.assertTrue(live)
+
+        InteractionMatrix.build()
+        shared = CollaborativeFilteringRecommender.find_similar_users(target, top_n=5)
+
+        self.assertEqual([uid for uid, _ in shared], [uid for uid, _ in live])
+        for (_, a), (_, b) in zip(shared, live):
+            self.assertAlmostEqual(a, b)
+
+    def test_shared_similar_users_read_the_mapped_matrix_in_place(self):
+        InteractionMatrix.build()
+        by_product = InteractionMatrix.load()[3]
+        mapped = interaction_store.load().arrays
+
+        with mock.patch.object(csr_matrix, 'copy', side_effect=AssertionError('matrix copied')):
+            self.assertTrue(CollaborativeFilteringRecommender.find_similar_users(self.users[0].id, top_n=5))
+        self.assertTrue(np.shares_memory(by_product.indices, mapped['by_product.indices']))
+
+    def test_user_based_recommendations_use_shared_rows(self):
+        InteractionMatrix.build()
+        recommendations = CollaborativeFilteringRecommender.get_user_based_recommendations(
+            self.users[0].id, top_n=5
+        )
+
+        recommended = [r['product_id'] for r in recommendations]
+        self.assertIn(self.products[2].id, recommended)
+        self.assertNotIn(self.products[0].id, recommended)
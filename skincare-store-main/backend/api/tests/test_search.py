@@ -0,0 +1,95 @@
+"""
+Tests for product search (in-process index; PostgreSQL uses the trigger-maintained tsvector).
+Run: python manage.py test api.tests.test_search
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api import search
+from api.models import Product
+
+
+class ProductSearchTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.title_match = Product.objects.create(
+            title='Vitamin C Serum', price=30, category='serum',
+            description='Brightening daily serum.', ingredients=['ascorbic acid'], benefits=['glow']
+        )
+        self.description_match = Product.objects.create(
+            title='Night Cream', price=40, category='moisturizer',
+            description='Rich cream with a touch of vitamin c for overnight repair.',
+            ingredients=['shea butter'], benefits=['repair']
+        )
+        self.ingredient_match = Product.objects.create(
+            title='Calming Toner', price=15, category='toner',
+            description='Alcohol free toner.', ingredients=['Niacinamide', 'Vitamin C'], benefits=['soothing']
+        )
+        self.unrelated = Product.objects.create(
+            title='Clay Mask', price=20, category='mask', description='Deep cleansing clay.', ingredients=['kaolin']
+        )
+
+    def test_weighted_ranking(self):
+        hits = search.search('vitamin c')['hits']
+
+        self.assertEqual(
+            [pid for pid, _, _ in hits],
+            [self.title_match.id, self.ingredient_match.id, self.description_match.id]
+        )
+        ranks = [rank for _, rank, _ in hits]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(search.search('vitamin kaolin')['total'], 0)
+        self.assertEqual(search.search('clay cleansing')['hits'][0][0], self.unrelated.id)
+
+    def test_highlights(self):
+        _, _, highlights = search.search('serum')['hits'][0]
+
+        self.assertEqual(highlights['title'], 'Vitamin C <mark>Serum</mark>')
+        self.assertEqual(highlights['description'], 'Brightening daily <mark>serum</mark>.')
+
+    def test_highlights_escape_product_text(self):
+        Product.objects.create(
+            title='<img src=x onerror=alert(1)> Peptide', price=10,
+            description='Peptide & "friends" <script>alert(1)</script>',
+        )
+
+        _, _, highlights = search.search('peptide')['hits'][0]
+
+        self.assertEqual(highlights['title'], '&lt;img src=x onerror=alert(1)&gt; <mark>Peptide</mark>')
+        self.assertEqual(
+            highlights['description'],
+            '<mark>Peptide</mark> &amp; &quot;friends&quot; &lt;script&gt;alert(1)&lt;/script&gt;',
+        )
+
+    def test_long_descriptions_are_cut_to_a_snippet_around_the_match(self):
+        words = ['filler'] * 100 + ['retinol'] + ['filler'] * 100
+        Product.objects.create(title='Long', price=10, description=' '.join(words))
+
+        _, _, highlights = search.search('retinol')['hits'][0]
+
+        self.assertEqual(len(highlights['description'].split()), search.SNIPPET_WORDS)
+        self.assertIn('<mark>retinol</mark>', highlights['description'])
+
+    def test_index_follows_product_writes(self):
+        self.assertEqual(search.search('peptide')['total'], 0)
+
+        self.unrelated.ingredients = ['kaolin', 'peptide']
+        self.unrelated.save()
+
+        self.assertEqual(search.search('peptide')['hits'][0][0], self.unrelated.id)
+
+    def test_endpoint_paginates(self):
+        response = self.client.get('/api/products/search/?q=vitamin&page=2&page_size=2')
+
+        data = response.json()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['page'], 2)
+        self.assertEqual([r['product']['id'] for r in data['results']], [self.description_match.id])
+        self.assertIn('<mark>vitamin</mark>', data['results'][0]['highlights']['description'])
+
+    def test_endpoint_requires_query(self):
+        self.assertEqual(self.client.get('/api/products/search/?q=%20').status_code, 400)
@@ -0,0 +1,92 @@
+"""
+Tests for the declarative serializers and their endpoints.
+Run: python manage.py test api.tests.test_serializers
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import AppUser, Order, OrderItem, Payment, Product, UserFollow
+from api.serializers import OrderSerializer, ProjectionError, UserSerializer, render
+from api.utils import create_jwt
+
+
+class SerializerTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = AppUser.objects.create(name='Buyer', email='buyer@test.com')
+        self.token = create_jwt({'user_id': self.user.id, 'email': self.user.email})
+        self.serum = Product.objects.create(title='Serum', price=30, stock=4, category='serum')
+        self.toner = Product.objects.create(title='Toner', price=12, category='toner')
+        self.orders = []
+        for i in range(3):
+            order = Order.objects.create(user=self.user, total=42)
+            OrderItem.objects.create(order=order, product=self.serum, qty=1, price=30)
+            OrderItem.objects.create(order=order, product=self.toner, qty=1, price=12)
+            Payment.objects.create(order=order, amount=42, status='failed')
+            Payment.objects.create(order=order, amount=42, status='success')
+            self.orders.append(order)
+
+    def get(self, path, **params):
+        return self.client.get(path, params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_default_projection_matches_to_dict(self):
+        order = self.orders[0]
+        expected = order.to_dict()
+        expected['payment'] = Payment.objects.filter(order=order).first().to_dict()
+
+        data = self.get(f'/api/orders/{order.id}/').json()
+
+        self.assertEqual(data['order'], expected)
+        self.assertEqual(data['order']['payment']['status'], 'success')
+
+    def test_order_page_queries_do_not_grow_with_orders(self):
+        self.get('/api/orders/my-orders/')  # warm the catalog snapshot
+
+        # user, orders, items, payments
+        with self.assertNumQueries(4):
+            data = self.get('/api/orders/my-orders/').json()
+
+        self.assertEqual(len(data['orders']), 3)
+        self.assertEqual([item['product']['title'] for item in data['orders'][0]['items']], ['Serum', 'Toner'])
+
+    def test_view_and_fields(self):
+        card = self.get('/api/orders/my-orders/', view='card', product_view='card').json()['orders'][0]
+        sparse = json.loads(self.get('/api/products/', fields='id,title').getvalue())
+        nested = self.get('/api/orders/', product_view='card').json()[0]
+
+        self.assertNotIn('items', card)
+        self.assertEqual(sparse, [{'id': self.serum.id, 'title': 'Serum'}, {'id': self.toner.id, 'title': 'Toner'}])
+        self.assertNotIn('reviews', nested['items'][0]['product'])
+        self.assertEqual(nested['items'][0]['product']['title'], 'Serum')
+
+    def test_unknown_view_or_field_is_rejected(self):
+        self.assertEqual(self.get('/api/products/', fields='id,secret').status_code, 400)
+        self.assertEqual(self.get('/api/products/', view='admin').status_code, 400)
+        self.assertEqual(self.get('/api/orders/', product_view='admin').status_code, 400)
+        with self.assertRaises(ProjectionError):
+            OrderSerializer('nope')
+
+    def test_user_counts_are_batched(self):
+        users = [AppUser.objects.create(name=f'Friend {i}', email=f'friend{i}@test.com') for i in range(4)]
+        for user in users:
+            UserFollow.objects.create(follower=self.user, following=user)
+            UserFollow.objects.create(follower=user, following=self.user)
+        UserFollow.objects.create(follower=users[0], following=users[1])
+
+        serializer = UserSerializer(context={'requesting_user': self.user})
+        with self.assertNumQueries(4):
+            rows = serializer.many(users)
+
+        self.assertEqual(rows, [user.to_profile_dict(requesting_user=self.user) for user in users])
+
+    def test_render_encodes_decimals_and_datetimes(self):
+        response = render({'price': Decimal('9.50'), 'at': datetime(2024, 5, 1, 12, 30)}, status=201)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content), {'price': 9.5, 'at': '2024-05-01T12:30:00'})
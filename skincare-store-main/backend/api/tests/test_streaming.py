@@ -0,0 +1,77 @@
+"""
+Tests for streamed JSON list responses.
+Run: python manage.py test api.tests.test_streaming
+"""
+
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+
+from api import serializers, views
+from api.models import AppUser, Product, Review, Wallet, WalletTransaction
+from api.serializers import stream
+from api.utils import create_jwt
+
+
+class StreamTest(TestCase):
+
+    def test_rows_are_written_in_chunks(self):
+        with mock.patch.object(serializers, 'STREAM_CHUNK_SIZE', 2):
+            response = stream({'n': n} for n in range(4))
+            chunks = list(response.streaming_content)
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(chunks, [b'[', b'{"n":0},{"n":1}', b',{"n":2},{"n":3}', b']'])
+        self.assertEqual(json.loads(b''.join(chunks)), [{'n': n} for n in range(4)])
+
+    def test_empty_and_enveloped_arrays(self):
+        self.assertEqual(json.loads(stream([]).getvalue()), [])
+        self.assertEqual(json.loads(stream(['[1]'], encoded=True).getvalue()), [[1]])
+        self.assertEqual(json.loads(stream([], key='rows').getvalue()), {'rows': []})
+        self.assertEqual(
+            json.loads(stream([1, 2], key='rows', extra={'total': 2}).getvalue()),
+            {'rows': [1, 2], 'total': 2},
+        )
+
+
+class StreamedEndpointTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = AppUser.objects.create(name='Shopper', email='shopper@test.com')
+        self.auth = f"Bearer {create_jwt({'user_id': self.user.id, 'email': self.user.email})}"
+
+    def test_product_listing_streams_every_product(self):
+        products = [Product.objects.create(title=f'Product {i}', price=i + 1) for i in range(5)]
+
+        with mock.patch.object(serializers, 'STREAM_CHUNK_SIZE', 2), mock.patch.object(views, 'STREAM_CHUNK_SIZE', 2):
+            anonymous = json.loads(self.client.get('/api/products/').getvalue())
+            signed_in = json.loads(self.client.get('/api/products/', HTTP_AUTHORIZATION=self.auth).getvalue())
+
+        self.assertEqual([p['id'] for p in anonymous], [p.id for p in products])
+        self.assertEqual([p['id'] for p in signed_in], [p.id for p in products])
+        self.assertEqual(signed_in[0]['allergens_found'], [])
+
+    def test_reviews_stream_newest_first(self):
+        product = Product.objects.create(title='Serum', price=10)
+        first = Review.objects.create(user=self.user, product=product, rating=3)
+        second = Review.objects.create(user=self.user, product=product, rating=5)
+        Review.objects.filter(pk=first.pk).update(created_at=second.created_at.replace(year=2000))
+
+        data = json.loads(self.client.get(f'/api/products/{product.id}/reviews/').getvalue())
+
+        self.assertEqual([r['id'] for r in data], [second.id, first.id])
+
+    def test_wallet_transactions_keep_their_envelope(self):
+        wallet = Wallet.objects.create(user=self.user, balance=150)
+        WalletTransaction.objects.create(wallet=wallet, transaction_type='credit', amount=50, description='Top up')
+
+        response = self.client.get('/api/wallet/transactions/', HTTP_AUTHORIZATION=self.auth)
+        data = json.loads(response.getvalue())
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(data['wallet_balance'], 150.0)
+        self.assertEqual([t['description'] for t in data['transactions']], ['Top up'])
@@ -5,6 +5,11 @@ urlpatterns = [
     path('products/', views.list_products),
     path('products/create/', views.create_product),
     path('products/share/', views.share_product),  # MUST come before <str:product_id>
+    path('products/search/', views.search_products),
+    path('products/autocomplete/', views.autocomplete_products),
+    path('products/filter/', views.filter_products),
+    path('products/changes/', views.product_changes),
+    path('products/batch/', views.batch_products),
     path('products/<str:product_id>/friends-purchased/', views.get_friends_purchased),
     path('products/<str:product_id>/', views.get_product),
     path('auth/register/', views.register),
@@ -60,6 +65,9 @@ urlpatterns = [
     path('admin/dashboard/recent-orders/', views.admin_recent_orders),
     path('admin/dashboard/low-stock/', views.admin_low_stock),
     path('admin/dashboard/top-products/', views.admin_top_selling),
+    path('admin/metrics/', views.admin_metrics),
+    path('admin/profiles/', views.admin_profiles),
+    path('admin/profiles/<str:profile_id>/', views.admin_profile_detail),
     # Reviews
     path('products/<int:product_id>/reviews/', views.get_reviews),
     path('products/<int:product_id>/reviews/create/', views.add_review),
@@ -100,6 +108,7 @@ urlpatterns = [
     # Allergy Management
     path('allergies/check/<int:product_id>/', views.check_product_allergies),
     path('allergies/check-cart/', views.check_cart_allergies),
+    path('allergies/check-batch/', views.check_batch_allergies),
     path('allergies/update/', views.update_user_allergies),
     
     # Wallet
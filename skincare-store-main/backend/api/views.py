@@ -1,5 +1,6 @@
+import itertools
 import json
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
 from django.views.decorators.csrf import csrf_exempt
 from django.http.multipartparser import MultiPartParser
 from rest_framework.decorators import api_view
@@ -34,23 +35,264 @@ from .validators import (
     validate_name
 )
 from .permissions import IsRegularUser
+from . import (
+    allergens, autocomplete, caching, catalog, changes, compression, facets, fuzzy, http_cache, ingredients,
+    metrics, product_cards, profiling, query_cache, search,
+)
+from .serializers import (
+    STREAM_CHUNK_SIZE, MessageSerializer, OrderSerializer, ProductSerializer, ProjectionError, UserSerializer,
+    dumps, render, stream,
+)
 
 
 def jsonify_python(obj, status=200):
     return JsonResponse(obj, safe=False, status=status)
 
 
+MAX_BATCH_PRODUCTS = 200
+
+
+def _csv_param(request, name):
+    """Comma-separated query parameter as a list of non-empty, stripped values."""
+    return [value.strip() for value in request.GET.get(name, '').split(',') if value.strip()]
+
+
+def _request_allergies(request):
+    """Allergies of the authenticated user, or None for anonymous or invalid requests."""
+    token = request.headers.get("Authorization", "").replace("Bearer ", "")
+    if not token:
+        return None
+    data = decode_jwt(token)
+    if not data or "error" in data:
+        return None
+    return AppUser.objects.filter(pk=data.get("user_id")).values_list('allergies', flat=True).first()
+
+
+def _catalog_etag(request, *args, **kwargs):
+    return f'catalog-{catalog.version()}-{http_cache.variant(request)}'
+
+
+def _product_modified(request, product_id):
+    return catalog.get_snapshot().modified(int(product_id)) if str(product_id).isdigit() else None
+
+
+def _product_etag(request, product_id):
+    modified = _product_modified(request, product_id)
+    if modified is None:
+        return None
+    return f'product-{product_id}-{modified.timestamp():.6f}-{http_cache.variant(request)}'
+
+
+@http_cache.public(etag=_catalog_etag, personal=True)
 def list_products(request):
-    prods = [p.to_dict() for p in Product.objects.all()]
-    return jsonify_python(prods)
+    """GET /api/products/ - every product; ?view=card or ?fields=id,title,price to slim it down."""
+    try:
+        serializer = ProductSerializer.from_request(request)
+    except ProjectionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    snapshot = catalog.get_snapshot()
+    rows = range(len(snapshot))
+    # ?exclude_ingredients=nut,fragrance drops products with a matching ingredient
+    exclude = _csv_param(request, 'exclude_ingredients')
+    if exclude:
+        rows = snapshot.rows_without_ingredients(exclude).nonzero()[0]
+    # Signed-in shoppers get per-product allergy flags for the warning badges
+    allergies = _request_allergies(request)
+    if allergies is None and serializer.is_full():
+        if not exclude:
+            # The anonymous full listing is the hottest payload: send it precompressed
+            return compression.precompressed_response(snapshot.listing())
+        return stream((snapshot.cards[row] for row in rows), encoded=True)
+    return stream(_projected_products(snapshot, rows, serializer, allergies))
+
+
+def _projected_products(snapshot, rows, serializer, allergies):
+    """Snapshot rows as projected product dicts, copied a chunk at a time."""
+    for start in range(0, len(rows), STREAM_CHUNK_SIZE):
+        prods = snapshot.products_at(rows[start:start + STREAM_CHUNK_SIZE])
+        if allergies is not None:
+            allergens.annotate(prods, allergies)
+        yield from serializer.many(prods)
+
+
+def batch_products(request):
+    """
+    GET /api/products/batch/?ids=3,1,2&fields=id,title,price
+    Many products in the requested order, served from the catalog snapshot.
+    `fields` (or `view=card`) optionally limits each product to the listed keys.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    
+    try:
+        product_ids = list(dict.fromkeys(int(pid) for pid in _csv_param(request, 'ids')))
+    except ValueError:
+        return JsonResponse({"error": "ids must be a comma-separated list of integers"}, status=400)
+    if not product_ids:
+        return JsonResponse({"error": "No products provided"}, status=400)
+    if len(product_ids) > MAX_BATCH_PRODUCTS:
+        return JsonResponse({"error": f"At most {MAX_BATCH_PRODUCTS} ids per request"}, status=400)
+    
+    try:
+        serializer = ProductSerializer.from_request(request)
+    except ProjectionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
+    products = _products_by_id(product_ids)
+    found = {product['id'] for product in products}
+    allergies = _request_allergies(request)
+    if allergies is not None:
+        allergens.annotate(products, allergies)
+    
+    return render({
+        "products": serializer.many(products),
+        "missing": [product_id for product_id in product_ids if product_id not in found]
+    })
+
+
+def product_changes(request):
+    """
+    GET /api/products/changes/?since=<cursor>&limit=500
+    Products created, updated or deleted after `since` (omit it for a full sync).
+    Keep requesting with the returned `cursor` while `has_more` is true.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    
+    try:
+        cursor = changes.decode(request.GET.get('since', ''))
+        limit = max(1, min(changes.MAX_PAGE_SIZE, int(request.GET.get('limit', changes.DEFAULT_PAGE_SIZE))))
+    except changes.InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    
+    updated, deleted, next_cursor, has_more = changes.changes_since(cursor, limit)
+    return JsonResponse({
+        "updated": _products_by_id(updated),
+        "deleted": deleted,
+        "cursor": changes.encode(next_cursor),
+        "has_more": has_more
+    })
 
 
+def filter_products(request):
+    """
+    GET /api/products/filter/?category=serum,toner&price_tier=15_30&in_stock=1&trending=1
+        &min_rating=4&exclude_ingredients=fragrance&sort=price&page=1&page_size=24
+    Storefront filtering: a page of products plus counts for every facet value.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    
+    try:
+        serializer = ProductSerializer.from_request(request)
+        selection = facets.parse(request.GET, lambda name: _csv_param(request, name))
+        page = max(1, int(request.GET.get('page', 1)))
+        page_size = max(1, min(100, int(request.GET.get('page_size', 24))))
+    except (facets.FacetError, ProjectionError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except ValueError:
+        return JsonResponse({"error": "Invalid page or page_size"}, status=400)
+    
+    offset = (page - 1) * page_size
+    products, total, facet_counts = facets.filter_products(
+        selection, offset=offset, limit=page_size, sort=request.GET.get('sort')
+    )
+    allergies = _request_allergies(request)
+    if allergies is not None:
+        allergens.annotate(products, allergies)
+    
+    return render({
+        "results": serializer.many(products),
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "has_more": total > offset + page_size,
+        "facets": facet_counts
+    })
+
+
+def search_products(request):
+    """
+    GET /api/products/search/?q=<text>&page=1&page_size=20
+    Ranked full-text search over title, description, category, ingredients and benefits,
+    with <mark> highlight snippets (escaped HTML) for title and description. When nothing matches
+    (typically a typo), falls back to trigram similarity on title and category.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({"error": "q is required"}, status=400)
+    
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+        page_size = max(1, min(100, int(request.GET.get('page_size', 20))))
+    except ValueError:
+        return JsonResponse({"error": "Invalid page or page_size"}, status=400)
+    
+    offset = (page - 1) * page_size
+    found = search.search(query, offset=offset, limit=page_size)
+    fuzzy_match = found['total'] == 0
+    if fuzzy_match:
+        similar = fuzzy.search_products(query, offset=offset, limit=page_size)
+        found = {'total': similar['total'], 'hits': [(pid, score, {}) for pid, score in similar['hits']]}
+    products = catalog.get_snapshot().products_for([pid for pid, _, _ in found['hits']], as_map=True)
+    results = [
+        {'product': products[pid], 'rank': rank, 'highlights': highlights}
+        for pid, rank, highlights in found['hits']
+        if pid in products
+    ]
+    
+    allergies = _request_allergies(request)
+    if allergies is not None:
+        allergens.annotate([r['product'] for r in results], allergies)
+    
+    return JsonResponse({
+        "query": query,
+        "total": found['total'],
+        "fuzzy": fuzzy_match,
+        "page": page,
+        "page_size": page_size,
+        "results": results
+    })
+
+
+def autocomplete_products(request):
+    """
+    GET /api/products/autocomplete/?q=<prefix>&limit=8
+    Popularity-ranked type-ahead over product titles, categories and ingredient names.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(autocomplete.MAX_SUGGESTIONS, int(request.GET.get('limit', 8))))
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    
+    return JsonResponse({
+        "query": query,
+        "suggestions": autocomplete.suggest(query, limit)
+    })
+
+
+@http_cache.public(etag=_product_etag, last_modified=_product_modified)
 def get_product(request, product_id):
     try:
-        p = Product.objects.get(pk=product_id)
-    except Product.DoesNotExist:
+        serializer = ProductSerializer.from_request(request)
+    except ProjectionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    snapshot = catalog.get_snapshot()
+    product = snapshot.product(int(product_id)) if product_id.isdigit() else None
+    if product is None:
         return JsonResponse({"error": "Product not found"}, status=404)
-    return jsonify_python(p.to_dict())
+    if serializer.is_full():
+        return HttpResponse(snapshot.card(product['id']), content_type='application/json')
+    return render(serializer.one(product))
 
 
 @csrf_exempt
@@ -311,12 +553,10 @@ def get_cart(request):
     except AppUser.DoesNotExist:
         return JsonResponse({"error": "Unauthorized"}, status=401)
     cart, _ = Cart.objects.get_or_create(user=user)
-    items = []
-    for it in cart.items.select_related('product').all():
-        items.append({
-            'product': it.product.to_dict(),
-            'qty': it.qty,
-        })
+    cart_items = list(cart.items.values_list('product_id', 'qty'))
+    cards = product_cards.get_many([product_id for product_id, _ in cart_items])
+    items = [{'product': cards[product_id], 'qty': qty} for product_id, qty in cart_items if product_id in cards]
+    allergens.annotate([it['product'] for it in items], user.allergies)
     return jsonify_python(items)
 
 
@@ -464,8 +704,35 @@ def get_bookings(request):
     except AppUser.DoesNotExist:
         return JsonResponse({"error": "Unauthorized"}, status=401)
 
-    bookings = Booking.objects.filter(user=user).select_related('product').order_by('-booking_date')
-    return JsonResponse([b.to_dict() for b in bookings], safe=False)
+    bookings = Booking.objects.filter(user=user).order_by('-booking_date')
+    return stream(_booking_rows(bookings))
+
+
+def _booking_rows(bookings):
+    # Booking.to_dict() shape, with product cards looked up a chunk at a time
+    chunk = []
+    for booking in bookings.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        chunk.append(booking)
+        if len(chunk) == STREAM_CHUNK_SIZE:
+            yield from _serialize_bookings(chunk)
+            chunk = []
+    yield from _serialize_bookings(chunk)
+
+
+def _serialize_bookings(bookings):
+    cards = product_cards.get_many([booking.product_id for booking in bookings])
+    for booking in bookings:
+        yield {
+            'id': booking.id,
+            'user_id': booking.user_id,
+            'product': cards.get(booking.product_id),
+            'booking_date': booking.booking_date.isoformat(),
+            'delivery_date': booking.delivery_date.isoformat() if booking.delivery_date else None,
+            'status': booking.status,
+            'payment_status': booking.payment_status,
+            'qty': booking.qty,
+            'notes': booking.notes,
+        }
 
 
 def get_booking(request, booking_id):
@@ -521,20 +788,33 @@ def add_review(request, product_id):
     review = Review.objects.create(user=user, product=product, rating=rating, comment=comment)
     
     # Invalidate recommendation cache
-    from .recommender import invalidate_user_recommendation_cache
+    from .recommender_facade import invalidate_user_recommendation_cache
     invalidate_user_recommendation_cache(user.id)
     
     return JsonResponse({"review": review.to_dict(), "message": "Review added"}, status=201)
 
 
+@http_cache.public(etag=_product_etag, last_modified=_product_modified)
 def get_reviews(request, product_id):
     try:
         product = Product.objects.get(pk=product_id)
     except Product.DoesNotExist:
         return JsonResponse({"error": "Product not found"}, status=404)
 
-    reviews = product.reviews.select_related('user').all().order_by('-created_at')
-    return JsonResponse([r.to_dict() for r in reviews], safe=False)
+    # Review.to_dict() fields only, so no reviewer account data is cached
+    reviews = product.reviews.order_by('-created_at').values(
+        'id', 'user_id', 'user__name', 'rating', 'comment', 'created_at'
+    )
+    return stream(
+        {
+            'id': review['id'],
+            'user': {'id': review['user_id'], 'name': review['user__name']},
+            'rating': review['rating'],
+            'comment': review['comment'],
+            'created_at': review['created_at'].isoformat(),
+        }
+        for review in query_cache.fetch(reviews, timeout=600)
+    )
 
 
 @csrf_exempt
@@ -701,7 +981,10 @@ def get_addresses(request):
     
     try:
         user = AppUser.objects.get(pk=data["user_id"])
-        addresses = [addr.to_dict() for addr in user.addresses.all().order_by('-is_default', '-created_at')]
+        addresses = [
+            addr.to_dict()
+            for addr in query_cache.fetch(user.addresses.all().order_by('-is_default', '-created_at'), timeout=300)
+        ]
         return JsonResponse(addresses, safe=False)
     except AppUser.DoesNotExist:
         return JsonResponse({"error": "User not found"}, status=404)
@@ -897,29 +1180,18 @@ def get_my_orders(request):
         error_msg = data.get("error", "Unauthorized") if data else "Unauthorized"
         return JsonResponse({"error": error_msg}, status=401)
     
+    try:
+        serializer = OrderSerializer.from_request(
+            request, context={'product_view': request.GET.get('product_view', 'detail')},
+            default=('id', 'total', 'status', 'created_at', 'items'),
+        )
+    except ProjectionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
     try:
         user = AppUser.objects.get(pk=data["user_id"])
-        orders = Order.objects.filter(user=user).prefetch_related('items__product').order_by('-created_at')
-        
-        orders_data = []
-        for order in orders:
-            order_items = []
-            for item in order.items.all():
-                order_items.append({
-                    'product': item.product.to_dict(),
-                    'qty': item.qty,
-                    'price': float(item.price)
-                })
-            
-            orders_data.append({
-                'id': order.id,
-                'total': float(order.total),
-                'status': order.status,
-                'created_at': order.created_at.isoformat(),
-                'items': order_items
-            })
-        
-        return JsonResponse(orders_data, safe=False)
+        orders = serializer.prepare(Order.objects.filter(user=user).order_by('-created_at'))
+        return render(serializer.many(orders))
     except AppUser.DoesNotExist:
         return JsonResponse({"error": "User not found"}, status=404)
 
@@ -937,8 +1209,13 @@ def get_liked_products(request):
     
     try:
         user = AppUser.objects.get(pk=data["user_id"])
-        liked = UserLikedProduct.objects.filter(user=user).select_related('product')
-        liked_data = [lp.to_dict() for lp in liked]
+        liked = list(UserLikedProduct.objects.filter(user=user))
+        cards = product_cards.get_many([lp.product_id for lp in liked])
+        liked_data = [
+            {'id': lp.id, 'product': cards[lp.product_id], 'liked_at': lp.created_at.isoformat()}
+            for lp in liked if lp.product_id in cards
+        ]
+        allergens.annotate([lp['product'] for lp in liked_data], user.allergies)
         return JsonResponse(liked_data, safe=False)
     except AppUser.DoesNotExist:
         return JsonResponse({"error": "User not found"}, status=404)
@@ -983,7 +1260,7 @@ def like_product(request):
     liked = UserLikedProduct.objects.create(user=user, product=product)
     
     # Invalidate recommendation cache
-    from .recommender import invalidate_user_recommendation_cache
+    from .recommender_facade import invalidate_user_recommendation_cache
     invalidate_user_recommendation_cache(user.id)
     
     return JsonResponse({
@@ -1011,7 +1288,7 @@ def unlike_product(request, product_id):
         liked.delete()
         
         # Invalidate recommendation cache
-        from .recommender import invalidate_user_recommendation_cache
+        from .recommender_facade import invalidate_user_recommendation_cache
         invalidate_user_recommendation_cache(user.id)
         
         return JsonResponse({"message": "Product removed from favorites"})
@@ -1058,7 +1335,7 @@ def toggle_like_product(request):
         liked_product.delete()
         
         # Invalidate recommendation cache
-        from .recommender import invalidate_user_recommendation_cache
+        from .recommender_facade import invalidate_user_recommendation_cache
         invalidate_user_recommendation_cache(user.id)
         
         return JsonResponse({
@@ -1070,7 +1347,7 @@ def toggle_like_product(request):
         liked = UserLikedProduct.objects.create(user=user, product=product)
         
         # Invalidate recommendation cache
-        from .recommender import invalidate_user_recommendation_cache
+        from .recommender_facade import invalidate_user_recommendation_cache
         invalidate_user_recommendation_cache(user.id)
         
         return JsonResponse({
@@ -1082,25 +1359,32 @@ def toggle_like_product(request):
 
 # ABOUT US ENDPOINT
 
+ABOUT_US = {
+    "company_name": "Novacell",
+    "description": "Your trusted destination for premium skincare products. We believe in natural beauty and provide high-quality products to help you achieve healthy, glowing skin.",
+    "mission": "To provide accessible, effective skincare solutions that enhance natural beauty and promote skin health.",
+    "founded": "2024",
+    "contact": {
+        "email": "support@skincarestore.com",
+        "phone": "+1-800-SKINCARE",
+        "address": "123 Beauty Lane, Wellness City, CA 90210"
+    },
+    "social_media": {
+        "instagram": "@skincarestore",
+        "facebook": "facebook.com/skincarestore",
+        "twitter": "@skincarestore"
+    }
+}
+
+
+def _about_us_etag(request):
+    return f"about-us-{compression.version('about_us')}"
+
+
+@http_cache.public(etag=_about_us_etag, max_age=3600, shared_max_age=86400)
 def about_us(request):
     """Get about us information."""
-    about_data = {
-        "company_name": "Novacell",
-        "description": "Your trusted destination for premium skincare products. We believe in natural beauty and provide high-quality products to help you achieve healthy, glowing skin.",
-        "mission": "To provide accessible, effective skincare solutions that enhance natural beauty and promote skin health.",
-        "founded": "2024",
-        "contact": {
-            "email": "support@skincarestore.com",
-            "phone": "+1-800-SKINCARE",
-            "address": "123 Beauty Lane, Wellness City, CA 90210"
-        },
-        "social_media": {
-            "instagram": "@skincarestore",
-            "facebook": "facebook.com/skincarestore",
-            "twitter": "@skincarestore"
-        }
-    }
-    return JsonResponse(about_data)
+    return compression.cached_response('about_us', lambda: dumps(ABOUT_US))
 
 
 # BANNERS
@@ -1124,6 +1408,10 @@ def admin_products_list(request):
     if category:
         qs = qs.filter(category__iexact=category)
 
+    exclude = _csv_param(request, 'exclude_ingredients')
+    if exclude:
+        qs = ingredients.exclude_containing(qs, exclude)
+
     stock_status = request.GET.get('stock_status')  # in_stock, out_of_stock, all
     if stock_status == 'in_stock':
         qs = qs.filter(stock__gt=0)
@@ -1149,13 +1437,19 @@ def admin_products_list(request):
     page = max(1, page)
     page_size = max(1, min(100, page_size))
 
+    try:
+        serializer = ProductSerializer.from_request(request, admin=True)
+    except ProjectionError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
     total = qs.count()
     start = (page - 1) * page_size
     end = start + page_size
 
-    products = [p.to_dict() for p in qs.order_by('-id')[start:end]]
+    product_ids = list(qs.order_by('-id').values_list('id', flat=True)[start:end])
+    products = serializer.many(_products_by_id(product_ids))
 
-    return JsonResponse({'total': total, 'page': page, 'page_size': page_size, 'results': products}, safe=False)
+    return render({'total': total, 'page': page, 'page_size': page_size, 'results': products})
 
 
 @csrf_exempt
@@ -1360,6 +1654,7 @@ def admin_product_update(request, product_id):
             product.images = new_images
         
         product.save()
+        popularity.invalidate()
         print(f"[admin_product_update] Product {product.id} saved successfully. New values: title={product.title}, price={product.price}, stock={product.stock}")
         return JsonResponse({'id': product.id, 'message': 'Product updated successfully'})
     else:
@@ -1391,6 +1686,7 @@ def admin_product_update(request, product_id):
             product.how_to_use = [h.strip() for h in body['how_to_use'] if isinstance(h, str) and h.strip()]
 
         product.save()
+        popularity.invalidate()
         return JsonResponse({'id': product.id, 'message': 'Product updated successfully'})
 
 
@@ -1407,6 +1703,7 @@ def admin_product_delete(request, product_id):
     try:
         product = Product.objects.get(pk=product_id)
         product.delete()
+        popularity.invalidate()
         return JsonResponse({'message': 'Product deleted successfully'})
     except Product.DoesNotExist:
         return JsonResponse({'error': 'Product not found'}, status=404)
@@ -1419,7 +1716,7 @@ def admin_orders(request):
     if err:
         return err
 
-    qs = Order.objects.select_related('user').prefetch_related('items__product').all()
+    qs = Order.objects.select_related('user').prefetch_related('items').all()
 
     status = request.GET.get('status')
     if status:
@@ -1438,38 +1735,51 @@ def admin_orders(request):
             models.Q(user__name__icontains=customer) | models.Q(user__email__icontains=customer)
         )
 
-    result = []
-    for o in qs.order_by('-created_at'):
-        items = []
-        for it in o.items.all():
-            items.append({'product': it.product.to_dict(), 'qty': it.qty, 'price': float(it.price)})
-
-        # shipping address
-        addr = None
-        addrobj = Address.objects.filter(user=o.user).order_by('-is_default', '-created_at').first()
-        if addrobj:
-            addr = {
-                'full_name': addrobj.full_name,
-                'phone': addrobj.phone,
-                'address_line1': addrobj.address_line1,
-                'address_line2': addrobj.address_line2,
-                'city': addrobj.city,
-                'state': addrobj.state,
-                'postal_code': addrobj.postal_code,
-                'country': addrobj.country,
-            }
-
-        result.append({
-            'id': o.id,
-            'user': {'id': o.user.id, 'name': o.user.name, 'email': o.user.email},
-            'total': float(o.total),
-            'status': o.status,
-            'created_at': o.created_at.isoformat(),
-            'items': items,
-            'shipping_address': addr,
-        })
+    return stream(_admin_order_rows(qs.order_by('-created_at')))
+
+
+def _admin_order_rows(qs):
+    # Items and the customers' addresses are prefetched per chunk of orders;
+    # each chunk's product cards come from the card cache in one lookup
+    orders = qs.prefetch_related(
+        models.Prefetch('user__addresses', queryset=Address.objects.order_by('-is_default', '-created_at'))
+    ).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    while chunk := list(itertools.islice(orders, STREAM_CHUNK_SIZE)):
+        cards = product_cards.get_many([it.product_id for o in chunk for it in o.items.all()])
+        yield from (_admin_order_row(o, cards) for o in chunk)
+
+
+def _admin_order_row(o, cards):
+    items = [
+        {'product': cards.get(it.product_id), 'qty': it.qty, 'price': float(it.price)}
+        for it in o.items.all()
+    ]
+
+    # shipping address
+    addr = None
+    addresses = o.user.addresses.all()
+    addrobj = addresses[0] if addresses else None
+    if addrobj:
+        addr = {
+            'full_name': addrobj.full_name,
+            'phone': addrobj.phone,
+            'address_line1': addrobj.address_line1,
+            'address_line2': addrobj.address_line2,
+            'city': addrobj.city,
+            'state': addrobj.state,
+            'postal_code': addrobj.postal_code,
+            'country': addrobj.country,
+        }
 
-    return JsonResponse(result, safe=False)
+    return {
+        'id': o.id,
+        'user': {'id': o.user.id, 'name': o.user.name, 'email': o.user.email},
+        'total': float(o.total),
+        'status': o.status,
+        'created_at': o.created_at.isoformat(),
+        'items': items,
+        'shipping_address': addr,
+    }
 
 
 @csrf_exempt
@@ -1505,6 +1815,49 @@ def admin_update_order_status(request, order_id):
     return JsonResponse({'message': 'Order status updated', 'order_id': order.id, 'status': order.status})
 
 
+def admin_metrics(request):
+    """Per-endpoint latency, SQL and cache metrics of this process, in Prometheus text format."""
+    user, err = _require_admin(request)
+    if err:
+        return err
+    body = metrics.render(cache_stats=caching.stats(), product_cards=product_cards.stats())
+    return HttpResponse(body, content_type=metrics.CONTENT_TYPE)
+
+
+def admin_profiles(request):
+    """Latest request profiles, newest first (see api.profiling)."""
+    user, err = _require_admin(request)
+    if err:
+        return err
+    return JsonResponse({'profiles': profiling.recent()})
+
+
+def admin_profile_detail(request, profile_id):
+    """One request profile: its SQL with origins and its top functions.
+
+    ?format=pstats downloads a cProfile profile as a .prof file;
+    ?format=folded returns a sampled profile's stacks for flamegraph tools.
+    """
+    user, err = _require_admin(request)
+    if err:
+        return err
+    profile = profiling.get(profile_id)
+    if profile is None:
+        return JsonResponse({"error": "Profile not found"}, status=404)
+
+    fmt = request.GET.get('format')
+    if fmt is None:
+        return JsonResponse({key: value for key, value in profile.items() if key not in ('pstats', 'folded')})
+    if fmt not in ('pstats', 'folded') or fmt not in profile:
+        available = 'pstats' if 'pstats' in profile else 'folded'
+        return JsonResponse({"error": f"format must be {available} for this profile"}, status=400)
+    if fmt == 'folded':
+        return HttpResponse(profile['folded'], content_type='text/plain; charset=utf-8')
+    response = HttpResponse(profile['pstats'], content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="{profile_id}.prof"'
+    return response
+
+
 def admin_dashboard(request):
     """Return basic dashboard statistics: total products, total orders, total revenue."""
     user, err = _require_admin(request)
@@ -1558,8 +1911,8 @@ def admin_low_stock(request):
     except Exception:
         return JsonResponse({'error': 'threshold must be integer'}, status=400)
 
-    prods = Product.objects.filter(stock__lte=threshold).order_by('stock')[:100]
-    out = [{'id': p.id, 'title': p.title, 'stock': p.stock, 'price': float(p.price)} for p in prods]
+    prods = Product.objects.filter(stock__lte=threshold).order_by('stock').values('id', 'title', 'stock', 'price')[:100]
+    out = [{**p, 'price': float(p['price'])} for p in query_cache.fetch(prods, timeout=60)]
     return JsonResponse({'threshold': threshold, 'count': len(out), 'results': out})
 
 
@@ -1575,17 +1928,19 @@ def admin_top_selling(request):
         limit = 10
 
     # Aggregate OrderItem quantities by product id
-    sales = OrderItem.objects.values('product').annotate(total_qty=models.Sum('qty')).order_by('-total_qty')[:limit]
+    sales = query_cache.fetch(
+        OrderItem.objects.values('product').annotate(total_qty=models.Sum('qty')).order_by('-total_qty')[:limit],
+        timeout=300,
+    )
     product_ids = [s['product'] for s in sales]
-    products = {p.id: p for p in Product.objects.filter(id__in=product_ids)}
+    titles = dict(query_cache.fetch(Product.objects.filter(id__in=product_ids).values_list('id', 'title'), timeout=300))
 
     out = []
     for s in sales:
         pid = s['product']
-        p = products.get(pid)
         out.append({
             'product_id': pid,
-            'title': p.title if p else None,
+            'title': titles.get(pid),
             'total_qty': int(s['total_qty'] or 0),
         })
 
@@ -1791,7 +2146,7 @@ def follow_user(request, user_id):
     )
     
     # Invalidate recommendation cache (social connections affect recommendations)
-    from .recommender import invalidate_user_recommendation_cache
+    from .recommender_facade import invalidate_user_recommendation_cache
     invalidate_user_recommendation_cache(current_user.id)
     
     return JsonResponse({
@@ -1834,7 +2189,7 @@ def unfollow_user(request, user_id):
         return JsonResponse({"error": "You are not following this user"}, status=400)
     
     # Invalidate recommendation cache (social connections affect recommendations)
-    from .recommender import invalidate_user_recommendation_cache
+    from .recommender_facade import invalidate_user_recommendation_cache
     invalidate_user_recommendation_cache(current_user.id)
     
     return JsonResponse({
@@ -1874,11 +2229,9 @@ def get_followers(request, user_id):
     followers = UserFollow.objects.filter(following=target_user).select_related('follower')[offset:offset + page_size]
     total_count = UserFollow.objects.filter(following=target_user).count()
     
-    followers_data = []
-    for follow in followers:
-        follower = follow.follower
-        follower_data = follower.to_profile_dict(requesting_user=current_user)
-        followers_data.append(follower_data)
+    followers_data = AppUser.to_profile_dicts(
+        [follow.follower for follow in followers], requesting_user=current_user
+    )
     
     return JsonResponse({
         "followers": followers_data,
@@ -1919,11 +2272,9 @@ def get_following(request, user_id):
     following = UserFollow.objects.filter(follower=target_user).select_related('following')[offset:offset + page_size]
     total_count = UserFollow.objects.filter(follower=target_user).count()
     
-    following_data = []
-    for follow in following:
-        followed_user = follow.following
-        followed_data = followed_user.to_profile_dict(requesting_user=current_user)
-        following_data.append(followed_data)
+    following_data = AppUser.to_profile_dicts(
+        [follow.following for follow in following], requesting_user=current_user
+    )
     
     return JsonResponse({
         "following": following_data,
@@ -1991,25 +2342,22 @@ def search_users(request):
     page_size = int(request.GET.get('page_size', 20))
     offset = (page - 1) * page_size
     
-    users = AppUser.objects.filter(
-        models.Q(name__icontains=query) | models.Q(email__icontains=query)
-    )[offset:offset + page_size]
-    
-    total_count = AppUser.objects.filter(
-        models.Q(name__icontains=query) | models.Q(email__icontains=query)
-    ).count()
+    # Ranked trigram matches and their count come from one query
+    found = fuzzy.search_users(query, offset=offset, limit=page_size)
+    users = AppUser.objects.in_bulk([pk for pk, _ in found['hits']])
+    total_count = found['total']
     
-    users_data = []
-    for user in users:
-        # Exclude current user from results
-        if current_user and user.id == current_user.id:
-            continue
-        user_data = user.to_profile_dict(requesting_user=current_user)
-        users_data.append(user_data)
+    # Exclude current user from results
+    ranked = [
+        users[pk] for pk, _ in found['hits']
+        if pk in users and not (current_user and pk == current_user.id)
+    ]
+    users_data = UserSerializer(context={'requesting_user': current_user}).many(ranked)
     
     return JsonResponse({
         "users": users_data,
         "total_count": total_count,
+        "total_is_estimate": found['estimated'],
         "page": page,
         "page_size": page_size,
         "has_more": total_count > offset + page_size
@@ -2046,10 +2394,7 @@ def get_suggested_users(request):
         followers_count=models.Count('followers')
     ).order_by('-followers_count')[:20]
     
-    users_data = []
-    for user in suggested_users:
-        user_data = user.to_profile_dict(requesting_user=current_user)
-        users_data.append(user_data)
+    users_data = AppUser.to_profile_dicts(suggested_users, requesting_user=current_user)
     
     return JsonResponse({"suggested_users": users_data})
 
@@ -2085,10 +2430,7 @@ def get_mutual_followers(request, user_id):
     
     mutual_users = AppUser.objects.filter(id__in=mutual_ids)
     
-    users_data = []
-    for user in mutual_users:
-        user_data = user.to_profile_dict(requesting_user=current_user)
-        users_data.append(user_data)
+    users_data = AppUser.to_profile_dicts(mutual_users, requesting_user=current_user)
     
     return JsonResponse({
         "mutual_followers": users_data,
@@ -2408,7 +2750,7 @@ def get_conversations(request):
         Q(user1=current_user) | Q(user2=current_user)
     ).select_related('user1', 'user2')
     
-    conversations_data = [conv.to_dict(current_user.id) for conv in conversations]
+    conversations_data = Conversation.to_dicts(conversations, current_user.id)
     
     return JsonResponse({"conversations": conversations_data})
 
@@ -2495,18 +2837,23 @@ def get_messages(request, conversation_id):
     if conversation.user1.id != current_user.id and conversation.user2.id != current_user.id:
         return JsonResponse({"error": "Access denied"}, status=403)
     
+    try:
+        serializer = MessageSerializer.from_request(request)
+    except ProjectionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
     # Get messages with pagination
     page = int(request.GET.get('page', 1))
     page_size = int(request.GET.get('page_size', 50))
     offset = (page - 1) * page_size
     
-    messages = Message.objects.filter(
-        conversation=conversation
-    ).select_related('sender').order_by('created_at')[offset:offset + page_size]
+    messages = serializer.prepare(
+        Message.objects.filter(conversation=conversation).order_by('created_at')
+    )[offset:offset + page_size]
     
     total_count = Message.objects.filter(conversation=conversation).count()
     
-    messages_data = [msg.to_dict() for msg in messages]
+    messages_data = serializer.many(messages)
     
     # Mark messages as read
     Message.objects.filter(
@@ -2514,7 +2861,7 @@ def get_messages(request, conversation_id):
         is_read=False
     ).exclude(sender=current_user).update(is_read=True)
     
-    return JsonResponse({
+    return render({
         "messages": messages_data,
         "total_count": total_count,
         "page": page,
@@ -2786,6 +3133,11 @@ def share_product(request):
     })
 
 
+def _products_by_id(product_ids, as_map=False):
+    """Product dicts by id from the catalog snapshot, keeping the given order."""
+    return catalog.get_snapshot().products_for(product_ids, as_map=as_map)
+
+
 @csrf_exempt
 def check_product_allergies(request, product_id):
     """Check if a product contains any allergens for the current user."""
@@ -2809,45 +3161,21 @@ def check_product_allergies(request, product_id):
     except Product.DoesNotExist:
         return JsonResponse({"error": "Product not found"}, status=404)
     
-    # Check for allergen matches
-    user_allergies = [allergy.lower().strip() for allergy in user.allergies]
-    product_ingredients = [ing.lower().strip() for ing in product.ingredients]
-    
-    allergens_found = []
-    for allergy in user_allergies:
-        for ingredient in product_ingredients:
-            if allergy in ingredient or ingredient in allergy:
-                allergens_found.append(ingredient)
-    
+    # Match against the precomputed ingredient tokens with the user's compiled matcher
+    index = allergens.get_index()
+    allergens_found = allergens.find_allergens(product, user.allergies, index=index)
     has_allergens = len(allergens_found) > 0
     
-    # Find alternative products if allergens found
+    # Find alternative products in the same category without the allergens
     alternative_products = []
     if has_allergens:
-        # Find products in same category without the allergens
-        all_products = Product.objects.filter(category=product.category).exclude(pk=product_id)
-        
-        for alt_product in all_products:
-            alt_ingredients = [ing.lower().strip() for ing in alt_product.ingredients]
-            has_user_allergen = False
-            
-            for allergy in user_allergies:
-                for ing in alt_ingredients:
-                    if allergy in ing or ing in allergy:
-                        has_user_allergen = True
-                        break
-                if has_user_allergen:
-                    break
-            
-            if not has_user_allergen:
-                alternative_products.append(alt_product.to_dict())
-                if len(alternative_products) >= 3:  # Limit to 3 alternatives
-                    break
+        alternative_ids = index.alternatives(product.category, user.allergies, exclude_id=product.id, limit=3)
+        alternative_products = _products_by_id(alternative_ids)
     
     return JsonResponse({
         "has_allergens": has_allergens,
         "allergens_found": allergens_found,
-        "product": product.to_dict(),
+        "product": product_cards.get(product.id),
         "alternatives": alternative_products
     })
 
@@ -2886,61 +3214,47 @@ def check_cart_allergies(request):
         
         if not product_ids:
             return JsonResponse({"error": "No products provided"}, status=400)
-        
-        # Get user allergies
-        user_allergies = [allergy.lower().strip() for allergy in user.allergies]
-        
-        if not user_allergies:
+        # Ids may arrive as strings ("5"); in_bulk() keys are ints
+        try:
+            if not isinstance(product_ids, list):
+                raise TypeError
+            product_ids = [int(pid) for pid in product_ids]
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "product_ids must be a list of integers"}, status=400)
+        
+        # Compile the user's allergies once
+        if not allergens.get_matcher(user.allergies):
             return JsonResponse({
                 "has_allergens": False,
                 "products_with_allergens": []
             })
         
-        # Check each product for allergens
-        products_with_allergens = []
-        
+        # Check each product for allergens against the precomputed ingredient index
+        index = allergens.get_index()
+        products = Product.objects.in_bulk(product_ids)
+        flagged = []
         for product_id in product_ids:
-            try:
-                product = Product.objects.get(pk=product_id)
-                product_ingredients = [ing.lower().strip() for ing in product.ingredients]
-                
-                allergens_found = []
-                for allergy in user_allergies:
-                    for ingredient in product_ingredients:
-                        if allergy in ingredient or ingredient in allergy:
-                            if ingredient not in allergens_found:
-                                allergens_found.append(ingredient)
-                
-                if allergens_found:
-                    # Find alternative products
-                    alternative_products = []
-                    all_products = Product.objects.filter(category=product.category).exclude(pk=product_id)
-                    
-                    for alt_product in all_products:
-                        alt_ingredients = [ing.lower().strip() for ing in alt_product.ingredients]
-                        has_user_allergen = False
-                        
-                        for allergy in user_allergies:
-                            for ing in alt_ingredients:
-                                if allergy in ing or ing in allergy:
-                                    has_user_allergen = True
-                                    break
-                            if has_user_allergen:
-                                break
-                        
-                        if not has_user_allergen:
-                            alternative_products.append(alt_product.to_dict())
-                            if len(alternative_products) >= 3:
-                                break
-                    
-                    products_with_allergens.append({
-                        "product": product.to_dict(),
-                        "allergens_found": allergens_found,
-                        "alternatives": alternative_products
-                    })
-            
-            except Product.DoesNotExist:
+            product = products.get(product_id)
+            if product is None:
                 continue
+            allergens_found = allergens.find_allergens(product, user.allergies, index=index)
+            if allergens_found:
+                alternative_ids = index.alternatives(product.category, user.allergies, exclude_id=product.id, limit=3)
+                flagged.append((product, allergens_found, alternative_ids))
+        
+        # Serialize all alternatives with one query
+        alternatives_by_id = _products_by_id(
+            [pid for _, _, alternative_ids in flagged for pid in alternative_ids], as_map=True
+        )
+        cards = product_cards.get_many([product.id for product, _, _ in flagged])
+        products_with_allergens = [
+            {
+                "product": cards[product.id],
+                "allergens_found": allergens_found,
+                "alternatives": [alternatives_by_id[pid] for pid in alternative_ids if pid in alternatives_by_id]
+            }
+            for product, allergens_found, alternative_ids in flagged
+        ]
         
         return JsonResponse({
             "has_allergens": len(products_with_allergens) > 0,
@@ -2953,6 +3267,51 @@ def check_cart_allergies(request):
         return JsonResponse({"error": "Invalid JSON"}, status=400)
 
 
+def check_batch_allergies(request):
+    """
+    GET /api/allergies/check-batch/?ids=1,2,3
+    Allergy flags for many products at once (one pass over the ingredient index).
+    """
+    if request.method != "GET":
+        return HttpResponseBadRequest()
+    
+    allergies = _request_allergies(request)
+    if allergies is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    
+    try:
+        product_ids = [int(pid) for pid in request.GET.get("ids", "").split(",") if pid.strip()]
+    except ValueError:
+        return JsonResponse({"error": "ids must be a comma-separated list of integers"}, status=400)
+    if not product_ids:
+        return JsonResponse({"error": "No products provided"}, status=400)
+    
+    index = allergens.get_index()
+    found = index.allergens_found(product_ids, allergies)
+    
+    # Products newer than the index are matched from their stored ingredients
+    missing = [pid for pid, tokens in zip(product_ids, found) if tokens is None]
+    if missing:
+        matcher = allergens.get_matcher(allergies)
+        stored = dict(Product.objects.filter(pk__in=missing).values_list('id', 'ingredients'))
+        found = [
+            tokens if tokens is not None
+            else matcher.found(allergens.tokenize(stored[pid])) if pid in stored
+            else None
+            for pid, tokens in zip(product_ids, found)
+        ]
+    
+    products = [
+        {"id": pid, "allergens_found": tokens}
+        for pid, tokens in zip(product_ids, found)
+        if tokens is not None
+    ]
+    return JsonResponse({
+        "has_allergens": any(p["allergens_found"] for p in products),
+        "products": products
+    })
+
+
 @csrf_exempt
 def update_user_allergies(request):
     """Update user's allergy information."""
@@ -2985,24 +3344,33 @@ def update_user_allergies(request):
     user.allergies = sanitized_allergies
     user.save()
     
+    # Cached recommendations were filtered against the old allergy list
+    from .recommender_facade import invalidate_user_recommendation_cache
+    invalidate_user_recommendation_cache(user.id)
+    
     return JsonResponse({
         "success": True,
         "user": user.to_dict()
     })
 
 
+def _banners_etag(request):
+    return f"banners-{compression.version('banners')}-{http_cache.variant(request)}"
+
+
+@http_cache.public(etag=_banners_etag)
 def get_banners(request):
     """Get active banners, optionally filtered by type"""
     banner_type = request.GET.get('type', None)
     
-    banners = Banner.objects.filter(is_active=True)
+    def build():
+        banners = Banner.objects.filter(is_active=True)
+        if banner_type:
+            banners = banners.filter(banner_type=banner_type)
+        return dumps({"banners": [banner.to_dict() for banner in banners]})
     
-    if banner_type:
-        banners = banners.filter(banner_type=banner_type)
-    
-    return JsonResponse({
-        "banners": [banner.to_dict() for banner in banners]
-    })
+    # Cached with its compressed variants until a banner changes (api.signals)
+    return compression.cached_response('banners', build, variant=banner_type or '')
 
 
 # ============================================================================
@@ -3102,12 +3470,13 @@ def get_wallet_transactions(request):
     wallet, created = Wallet.objects.get_or_create(user=current_user)
     
     # Get transactions
-    transactions = WalletTransaction.objects.filter(wallet=wallet)
+    transactions = WalletTransaction.objects.filter(wallet=wallet).select_related('order')
     
-    return JsonResponse({
-        "transactions": [t.to_dict() for t in transactions],
-        "wallet_balance": float(wallet.balance)
-    })
+    return stream(
+        (t.to_dict() for t in transactions.iterator(chunk_size=STREAM_CHUNK_SIZE)),
+        key="transactions",
+        extra={"wallet_balance": float(wallet.balance)},
+    )
 
 
 @csrf_exempt
@@ -3171,7 +3540,7 @@ def create_order_with_wallet(request):
             # Clear cart
             try:
                 cart = Cart.objects.get(user=current_user)
-                cart_items = CartItem.objects.filter(cart=cart)
+                cart_items = CartItem.objects.filter(cart=cart).select_related('product')
                 
                 # Create order items
                 for item in cart_items:
@@ -3304,7 +3673,7 @@ def create_payment_order(request):
         
         # Get cart items
         cart = Cart.objects.get(user=current_user)
-        cart_items = CartItem.objects.filter(cart=cart)
+        cart_items = CartItem.objects.filter(cart=cart).select_related('product')
         
         if not cart_items.exists():
             return JsonResponse({"error": "Cart is empty"}, status=400)
@@ -3786,22 +4155,19 @@ def get_user_orders(request):
         return JsonResponse({"error": "Invalid token"}, status=401)
     
     try:
-        orders = Order.objects.filter(user=current_user).order_by('-created_at')
-        
-        orders_data = []
-        for order in orders:
-            order_dict = order.to_dict()
-            
-            # Add payment info if exists
-            payment = Payment.objects.filter(order=order).first()
-            if payment:
-                order_dict['payment'] = payment.to_dict()
-            
-            orders_data.append(order_dict)
+        serializer = OrderSerializer.from_request(
+            request, context={'product_view': request.GET.get('product_view', 'detail')}
+        )
+    except ProjectionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
+    try:
+        # Items and the latest payment are loaded for the whole page at once
+        orders = serializer.prepare(Order.objects.filter(user=current_user).order_by('-created_at'))
         
-        return JsonResponse({
+        return render({
             "success": True,
-            "orders": orders_data
+            "orders": serializer.many(orders)
         })
         
     except Exception as e:
@@ -3826,18 +4192,18 @@ def get_order_detail(request, order_id):
         return JsonResponse({"error": "Invalid token"}, status=401)
     
     try:
-        order = Order.objects.get(id=order_id, user=current_user)
-        
-        order_dict = order.to_dict()
-        
-        # Add payment info
-        payment = Payment.objects.filter(order=order).first()
-        if payment:
-            order_dict['payment'] = payment.to_dict()
+        serializer = OrderSerializer.from_request(
+            request, context={'product_view': request.GET.get('product_view', 'detail')}
+        )
+    except ProjectionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
+    try:
+        order = serializer.prepare(Order.objects.all()).get(id=order_id, user=current_user)
         
-        return JsonResponse({
+        return render({
             "success": True,
-            "order": order_dict
+            "order": serializer.one(order)
         })
         
     except Order.DoesNotExist:
@@ -3908,15 +4274,17 @@ def get_friends_purchased(request, product_id):
 
 
 # ========== AI RECOMMENDATIONS ==========
-from .recommender import (
+# Lazy proxies: the numeric stack is imported on the first recommendation request
+from .recommender_facade import (
     ContentBasedRecommender,
     CollaborativeFilteringRecommender,
     SocialRecommender,
     HybridRecommender,
-    DataExporter
+    DataExporter,
+    has_interaction_history
 )
+from . import popularity
 from django.views.decorators.cache import cache_page
-from django.core.cache import cache
 
 
 @csrf_exempt
@@ -3953,31 +4321,36 @@ def get_personalized_recommendations(request):
         limit = min(max(limit, 1), 50)  # Between 1 and 50
         
         # Check cache first
-        cache_key = f'recommendations_user_{user_id}_limit_{limit}'
-        cached_result = cache.get(cache_key)
+        cache_key = f'limit_{limit}'
+        cached_result = caching.recommendations.get(cache_key, scope=user_id)
         
         if cached_result:
             return JsonResponse(cached_result)
         
-        # Check if user has any interaction history
-        user_history = DataExporter.get_user_history(user_id)
+        # New user - serve the pre-serialized cold-start cards from the popularity snapshot
+        if not has_interaction_history(user_id):
+            count, cards = popularity.cold_start_json(top_n=limit, allergies=user.allergies)
+            return HttpResponse(
+                f'{{"success": true, "count": {count}, "recommendations": {cards}, "user_has_history": false}}',
+                content_type='application/json'
+            )
         
-        if not user_history['all']:
-            # New user - use cold start recommendations
-            recommendations = HybridRecommender.get_cold_start_recommendations(top_n=limit)
-        else:
-            # Existing user - use personalized recommendations
-            recommendations = HybridRecommender.get_personalized_recommendations(user_id, top_n=limit)
+        # Existing user - use personalized recommendations
+        recommendations = HybridRecommender.get_personalized_recommendations(
+            user_id, top_n=limit, allergies=user.allergies
+        )
+        
+        allergens.annotate([r['product'] for r in recommendations], user.allergies)
         
         result = {
             "success": True,
             "count": len(recommendations),
             "recommendations": recommendations,
-            "user_has_history": bool(user_history['all'])
+            "user_has_history": True
         }
         
         # Cache for 1 hour (3600 seconds)
-        cache.set(cache_key, result, 3600)
+        caching.recommendations.set(cache_key, result, 3600, scope=user_id)
         
         return JsonResponse(result)
         
@@ -3985,7 +4358,29 @@ def get_personalized_recommendations(request):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+def _with_allergy_flags(request, result, key):
+    """Annotate the products under `result[key]` for the requesting user (shared cache entries stay unflagged)."""
+    allergies = _request_allergies(request)
+    if allergies is not None:
+        allergens.annotate([item['product'] for item in result[key]], allergies)
+    return result
+
+
+def _similar_products_etag(request, product_id):
+    # Cached results are rebuilt from the catalog and the published feature vectors
+    from .recommender_artifacts import feature_store
+
+    snapshot = catalog.get_snapshot()
+    if product_id not in snapshot:
+        return None
+    return (
+        f'similar-{product_id}-{snapshot.version}-{feature_store.current_version()}-'
+        f'{http_cache.variant(request)}'
+    )
+
+
 @csrf_exempt
+@http_cache.public(etag=_similar_products_etag, personal=True)
 def get_similar_products(request, product_id):
     """
     GET /api/recommendations/similar/<product_id>/
@@ -4004,26 +4399,22 @@ def get_similar_products(request, product_id):
         limit = min(max(limit, 1), 20)  # Between 1 and 20
         
         # Check cache first
-        cache_key = f'similar_products_{product_id}_limit_{limit}'
-        cached_result = cache.get(cache_key)
+        cache_key = f'limit_{limit}'
+        cached_result = caching.similar_products.get(cache_key, scope=product_id)
         
         if cached_result:
-            return JsonResponse(cached_result)
+            return JsonResponse(_with_allergy_flags(request, cached_result, 'similar_products'))
         
         # Get similar products
         similar_items = ContentBasedRecommender.get_similar_products(product_id, top_n=limit)
         
         # Get full product details
-        recommendations = []
-        for item in similar_items:
-            try:
-                similar_product = Product.objects.get(id=item['product_id'])
-                recommendations.append({
-                    'product': similar_product.to_dict(),
-                    'similarity_score': item['similarity_score']
-                })
-            except Product.DoesNotExist:
-                continue
+        products = _products_by_id([item['product_id'] for item in similar_items], as_map=True)
+        recommendations = [
+            {'product': products[item['product_id']], 'similarity_score': item['similarity_score']}
+            for item in similar_items
+            if item['product_id'] in products
+        ]
         
         result = {
             "success": True,
@@ -4034,9 +4425,9 @@ def get_similar_products(request, product_id):
         }
         
         # Cache for 24 hours (86400 seconds) - similar products change less frequently
-        cache.set(cache_key, result, 86400)
+        caching.similar_products.set(cache_key, result, 86400, scope=product_id)
         
-        return JsonResponse(result)
+        return JsonResponse(_with_allergy_flags(request, result, 'similar_products'))
         
     except Product.DoesNotExist:
         return JsonResponse({"error": "Product not found"}, status=404)
@@ -4078,8 +4469,8 @@ def get_friends_trending(request):
         limit = min(max(limit, 1), 30)  # Between 1 and 30
         
         # Check cache first
-        cache_key = f'friends_trending_user_{user_id}_limit_{limit}'
-        cached_result = cache.get(cache_key)
+        cache_key = f'limit_{limit}'
+        cached_result = caching.friends_trending.get(cache_key, scope=user_id)
         
         if cached_result:
             return JsonResponse(cached_result)
@@ -4095,20 +4486,18 @@ def get_friends_trending(request):
                 "trending_products": []
             }
             # Cache empty results for 30 minutes
-            cache.set(cache_key, result, 1800)
+            caching.friends_trending.set(cache_key, result, 1800, scope=user_id)
             return JsonResponse(result)
         
         # Get full product details
-        recommendations = []
-        for item in trending_items:
-            try:
-                product = Product.objects.get(id=item['product_id'])
-                recommendations.append({
-                    'product': product.to_dict(),
-                    'trending_score': item['score']
-                })
-            except Product.DoesNotExist:
-                continue
+        products = _products_by_id([item['product_id'] for item in trending_items], as_map=True)
+        recommendations = [
+            {'product': products[item['product_id']], 'trending_score': item['score']}
+            for item in trending_items
+            if item['product_id'] in products
+        ]
+        
+        allergens.annotate([r['product'] for r in recommendations], user.allergies)
         
         result = {
             "success": True,
@@ -4117,7 +4506,7 @@ def get_friends_trending(request):
         }
         
         # Cache for 30 minutes (1800 seconds) - trending changes more frequently
-        cache.set(cache_key, result, 1800)
+        caching.friends_trending.set(cache_key, result, 1800, scope=user_id)
         
         return JsonResponse(result)
         
@@ -4156,12 +4545,14 @@ def get_recommendation_stats(request):
             return JsonResponse({"error": "Admin access required"}, status=403)
         
         # Get recommendation stats
-        from .recommender import get_recommendation_stats
+        from .recommender_facade import get_recommendation_stats
         stats = get_recommendation_stats()
         
         return JsonResponse({
             "success": True,
-            "stats": stats
+            "stats": stats,
+            "cache": caching.stats(),
+            "product_cards": product_cards.stats()
         })
         
     except AppUser.DoesNotExist:
@@ -4174,7 +4565,7 @@ def get_recommendation_stats(request):
 def refresh_recommendation_cache(request):
     """
     POST /api/recommendations/refresh-cache/
-    Rebuild feature vectors and clear cache.
+    Rebuild and publish feature vectors and the interaction matrix, then clear cache.
     Admin only.
     """
     if request.method != "POST":
@@ -4201,11 +4592,14 @@ def refresh_recommendation_cache(request):
             return JsonResponse({"error": "Admin access required"}, status=403)
         
         # Rebuild feature vectors
-        from .recommender import ProductFeatureVector
-        from django.core.cache import cache
+        from .recommender_facade import ProductFeatureVector, InteractionMatrix
         
         ProductFeatureVector.build_feature_vectors()
-        cache.clear()
+        InteractionMatrix.build()
+        # Only recommendation entries are dropped; the cache is shared with other domains
+        for namespace in caching.RECOMMENDATION_NAMESPACES:
+            namespace.clear()
+        popularity.invalidate()
         
         return JsonResponse({
             "success": True,
@@ -21,13 +21,15 @@ INSTALLED_APPS = [
     "rest_framework",
     "corsheaders",
 
-    # Use AppConfig to run startup tasks (demo seeding)
     "api.apps.ApiConfig",
 ]
 
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.RequestMetricsMiddleware",  # Outermost API middleware, so its timing covers the rest
+    "api.middleware.APICompressionMiddleware",  # Compresses the final body, so it runs last on the way out
+    "api.middleware.ProfilerMiddleware",  # Inside compression, so profiles cover the view and the rest of the stack
     "corsheaders.middleware.CorsMiddleware",  # CORS should be early
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,6 +80,52 @@ DATABASES = {
     }
 }
 
+# Recommender artifacts (feature matrices, neighbour tables, interaction matrix)
+# are published here as memory-mapped .npy files shared by all worker processes.
+RECOMMENDER_ARTIFACT_DIR = os.getenv('RECOMMENDER_ARTIFACT_DIR', str(BASE_DIR / 'var' / 'recommender'))
+
+# Shared cache tier: all workers see the same entries and invalidations (see api.caching).
+# Multi-worker deployments should set REDIS_URL. Without it, a file-based cache on local disk
+# is used, which suits a single host.
+#
+# The `versions` alias holds the version and generation keys that tell workers when to rebuild
+# their process-local snapshots and indexes. A culled or evicted version key makes every worker
+# rebuild at once, so these keys are kept apart from ordinary entries:
+# - On Redis they share the server. Configure it with a volatile-* maxmemory-policy (the
+#   default is noeviction), so memory pressure only evicts keys that have a timeout. Version
+#   keys have none.
+# - On disk they get their own directory. FileBasedCache culls a third of its files, chosen
+#   without regard to age, whenever MAX_ENTRIES is reached, so the limit there is set out of
+#   reach. The ordinary tier's limit is sized well above the expected key count (one product
+#   card per product plus per-user recommendation entries), so culls stay rare.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'skincare',
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'skincare-versions',
+        },
+    }
+else:
+    CACHE_DIR = os.getenv('CACHE_DIR', str(BASE_DIR / 'var' / 'cache'))
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'OPTIONS': {'MAX_ENTRIES': 200000},
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR + '-versions',
+            'OPTIONS': {'MAX_ENTRIES': 10 ** 9},
+        },
+    }
+
 JWT_SECRET = os.getenv("JWT_SECRET", "jwt-secret")
 JWT_ALGORITHM = "HS256"
 
@@ -1,3 +1,5 @@
+import tempfile
+
 from .settings import *
 
 # Use in-memory SQLite for tests to avoid needing Postgres permissions
@@ -10,3 +12,19 @@ DATABASES = {
 
 # Keep DEBUG True for tests
 DEBUG = True
+
+# Each test run gets its own in-memory cache instead of the shared tier. Both aliases
+# share one store, so cache.clear() in a test also resets version keys.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+    },
+}
+
+# Keep published recommender artifacts out of the source tree
+RECOMMENDER_ARTIFACT_DIR = tempfile.mkdtemp(prefix='recommender-artifacts-')